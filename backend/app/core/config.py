@@ -30,23 +30,126 @@ ALLOWED_EXTS = [e.strip().lower() for e in (os.getenv("ALLOWED_EXTS", "pdf,txt,p
 PART_SIZE_MB = int(os.getenv("PART_SIZE_MB", "10"))
 PART_SIZE_BYTES = PART_SIZE_MB * 1024 * 1024
 
+# upload nhiều file / zip trong 1 request
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "1000"))
+
+# upload trực tiếp lên MinIO bằng presigned URL: thời hạn của intent/URL (phút)
+UPLOAD_INTENT_EXPIRE_MINUTES = int(os.getenv("UPLOAD_INTENT_EXPIRE_MINUTES", "60"))
+# job dọn intent quá hạn (huỷ multipart dở, xoá key tạm): chu kỳ (phút) + số intent tối đa mỗi lượt
+UPLOAD_INTENT_SWEEP_MINUTES = int(os.getenv("UPLOAD_INTENT_SWEEP_MINUTES", "15"))
+UPLOAD_INTENT_SWEEP_LIMIT = int(os.getenv("UPLOAD_INTENT_SWEEP_LIMIT", "500"))
+# intent kẹt ở 'completing' quá N phút (process chết giữa lúc complete) -> sweep trả về pending
+UPLOAD_INTENT_COMPLETING_TIMEOUT_MINUTES = int(os.getenv("UPLOAD_INTENT_COMPLETING_TIMEOUT_MINUTES", "10"))
+
+# cache bucket_exists (giây)
+MINIO_BUCKET_CACHE_TTL = int(os.getenv("MINIO_BUCKET_CACHE_TTL", "300"))
+
+# upload MinIO chạy trên thread pool riêng (không chặn event loop)
+MINIO_UPLOAD_WORKERS = int(os.getenv("MINIO_UPLOAD_WORKERS", "8"))
+
+# stat hàng loạt khi list: số request MinIO chạy song song + ngưỡng chuyển sang list_objects
+MINIO_STAT_CONCURRENCY = int(os.getenv("MINIO_STAT_CONCURRENCY", "16"))
+MINIO_STAT_SWEEP_MIN = int(os.getenv("MINIO_STAT_SWEEP_MIN", "8"))
+
 # ===== PostgreSQL =====
 PG_HOST = os.getenv("PG_HOST", "localhost")
 PG_PORT = int(os.getenv("PG_PORT", "5432"))
 PG_DB = os.getenv("PG_DB", "Data")
 PG_USER = os.getenv("PG_USER", "postgres")
 PG_PASSWORD = os.getenv("PG_PASSWORD", "")
+# pool theo từng worker: workers * PG_POOL_MAX_SIZE phải < max_connections của Postgres
+# min_size connection được mở sẵn lúc startup (login đầu tiên không phải chờ bắt tay TCP + auth)
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+# chờ connection quá lâu (pool cạn) -> 503 thay vì treo request
+PG_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("PG_ACQUIRE_TIMEOUT_SECONDS", "10"))
+PG_COMMAND_TIMEOUT_SECONDS = float(os.getenv("PG_COMMAND_TIMEOUT_SECONDS", "30"))
 
 # ===== MongoDB =====
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB = os.getenv("MONGO_DB", "kltn")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "minio_files")
+# pool của Motor (mỗi worker 1 client); MONGO_MIN_POOL_SIZE connection được mở sẵn lúc startup
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "4"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+# doc thiếu trong documents_index -> dò từng collection (dữ liệu cũ). Chạy xong
+# `python -m app.scripts.backfill_documents_index` thì đặt false: id không tồn tại chỉ tốn 1 lần đọc
+DOCUMENTS_INDEX_PROBE_FALLBACK = _to_bool(os.getenv("DOCUMENTS_INDEX_PROBE_FALLBACK", "true"), default=True)
+
+# ===== Ingest (tách text lesson -> chunks) =====
+INGEST_ENABLED = _to_bool(os.getenv("INGEST_ENABLED", "true"), default=True)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1500"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "200"))
+
+# ===== Keyword (TF-IDF trên chunks) =====
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", "10"))
+KEYWORD_MAX_DF = float(os.getenv("KEYWORD_MAX_DF", "0.5"))
+# sau ingest: chờ rồi mới chạy job keyword (gom nhiều lesson upload liền nhau thành 1 lần)
+KEYWORD_JOB_DELAY_SECONDS = int(os.getenv("KEYWORD_JOB_DELAY_SECONDS", "30"))
+
+# ===== Job nền (collection jobs trong Mongo) =====
+# false -> process này chỉ enqueue, không chạy job (để process worker khác chạy)
+JOBS_ENABLED = _to_bool(os.getenv("JOBS_ENABLED", "true"), default=True)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "5"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "600"))
+# job running quá lease mà không gia hạn (process chết) -> được nhận lại
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+# job done tự xoá sau N ngày (TTL index)
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+# ===== Full-text (inverted index BM25 trong RAM cho content chunks) =====
+FULLTEXT_ENABLED = _to_bool(os.getenv("FULLTEXT_ENABLED", "true"), default=True)
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# index nằm trong RAM từng process -> poll chunks theo updated_at để thấy chunk process khác ghi
+# (0 = tắt); đọc lùi LAG giây phòng lệch giờ giữa các process / ghi commit muộn
+FULLTEXT_SYNC_SECONDS = float(os.getenv("FULLTEXT_SYNC_SECONDS", "2"))
+FULLTEXT_SYNC_LAG_SECONDS = float(os.getenv("FULLTEXT_SYNC_LAG_SECONDS", "10"))
+
+# ===== GET /admin/documents/{id}/content (proxy file MinIO) =====
+# cache RAM cho object nhỏ hay xem lại; object lớn hơn -> stream thẳng từ MinIO
+CONTENT_CACHE_BYTES = int(os.getenv("CONTENT_CACHE_MB", "64")) * 1024 * 1024
+CONTENT_CACHE_MAX_OBJECT_BYTES = int(os.getenv("CONTENT_CACHE_MAX_OBJECT_MB", "8")) * 1024 * 1024
+CONTENT_STREAM_CHUNK_BYTES = int(os.getenv("CONTENT_STREAM_CHUNK_KB", "256")) * 1024
+
+# ===== Cache response GET /admin/documents (list + detail) =====
+RESPONSE_CACHE_ENABLED = _to_bool(os.getenv("RESPONSE_CACHE_ENABLED", "true"), default=True)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+# nhiều worker uvicorn: đồng bộ invalidation qua Mongo (collection cache_generations), trễ tối đa SYNC giây
+RESPONSE_CACHE_SHARED = _to_bool(os.getenv("RESPONSE_CACHE_SHARED", "false"), default=False)
+RESPONSE_CACHE_SYNC_SECONDS = float(os.getenv("RESPONSE_CACHE_SYNC_SECONDS", "1"))
+
+# GET /admin/tree: số node tối đa mỗi level
+TREE_MAX_NODES = int(os.getenv("TREE_MAX_NODES", "5000"))
+
+# list type_name=all: số collection query song song
+LIST_FANOUT_CONCURRENCY = int(os.getenv("LIST_FANOUT_CONCURRENCY", "5"))
+
+# GET /admin/documents/export (NDJSON): số doc mỗi batch cursor Mongo (= mỗi lần ghi ra response)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
 
 # ===== JWT =====
 JWT_SECRET = os.getenv("JWT_SECRET", "change_me")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
 
+# cache token đã verify (LRU, hết hạn theo claim exp); tắt -> jwt.decode mỗi request
+JWT_CACHE_ENABLED = _to_bool(os.getenv("JWT_CACHE_ENABLED", "true"), default=True)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
+
+# bcrypt (hash/verify) chạy trên thread pool riêng, giới hạn số luồng
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+# ===== Metrics (GET /metrics, định dạng Prometheus) =====
+METRICS_ENABLED = _to_bool(os.getenv("METRICS_ENABLED", "true"), default=True)
+
 # ===== CORS =====
 _CORS_RAW = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173")
 CORS_ORIGINS = [x.strip() for x in _CORS_RAW.split(",") if x.strip()] or ["*"]
@@ -1,4 +1,10 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import minio
 from minio import Minio
+from minio.datatypes import Part
 from minio.error import S3Error
 from fastapi import HTTPException
 
@@ -8,6 +14,7 @@ from app.core.config import (
     MINIO_SECRET_KEY,
     MINIO_SECURE,
     MINIO_PUBLIC_BASE_URL,
+    MINIO_BUCKET_CACHE_TTL,
 )
 
 minio_client = Minio(
@@ -17,13 +24,106 @@ minio_client = Minio(
     secure=MINIO_SECURE,
 )
 
-def ensure_bucket(bucket: str) -> None:
-    try:
+
+class BucketRegistry:
+    """
+    Cache (theo process) kết quả bucket_exists có TTL.
+    Bucket theo lớp (class-10/11/12) gần như không đổi -> bỏ 1 round trip MinIO mỗi upload/list.
+    Gặp NoSuchBucket thì invalidate() để lần sau hỏi lại MinIO.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._known: Dict[str, Tuple[bool, float]] = {}
+
+    def _get(self, bucket: str):
+        with self._lock:
+            hit = self._known.get(bucket)
+            if hit is None:
+                return None
+            exists, expires_at = hit
+            if expires_at < time.monotonic():
+                self._known.pop(bucket, None)
+                return None
+            return exists
+
+    def _set(self, bucket: str, exists: bool) -> None:
+        with self._lock:
+            self._known[bucket] = (exists, time.monotonic() + self.ttl)
+
+    def invalidate(self, bucket: str | None = None) -> None:
+        with self._lock:
+            if bucket is None:
+                self._known.clear()
+            else:
+                self._known.pop(bucket, None)
+
+    def exists(self, bucket: str) -> bool:
+        cached = self._get(bucket)
+        if cached is not None:
+            return cached
+        exists = minio_client.bucket_exists(bucket)
+        self._set(bucket, exists)
+        return exists
+
+    def ensure(self, bucket: str) -> None:
+        if self._get(bucket):
+            return
         if not minio_client.bucket_exists(bucket):
             minio_client.make_bucket(bucket)
+        self._set(bucket, True)
+
+    def warm(self) -> int:
+        """Nạp sẵn danh sách bucket bằng 1 lần list_buckets (gọi lúc startup)."""
+        buckets = minio_client.list_buckets()
+        for b in buckets:
+            self._set(b.name, True)
+        return len(buckets)
+
+
+bucket_registry = BucketRegistry(MINIO_BUCKET_CACHE_TTL)
+
+
+def ensure_bucket(bucket: str) -> None:
+    try:
+        bucket_registry.ensure(bucket)
     except S3Error as e:
+        bucket_registry.invalidate(bucket)
         raise HTTPException(status_code=500, detail=f"MinIO bucket error: {e.code} - {e.message}")
 
+class MultipartUploads:
+    """
+    Multipart upload thủ công cho presigned PUT từng part. minio-py không có API public cho
+    create/complete/abort -> chỉ chỗ này gọi hàm private của SDK (đã kiểm với bản pin trong
+    requirements.txt). SDK đổi tên hàm -> `available` = False, upload intent chuyển sang 1 URL PUT.
+    """
+
+    PINNED_VERSION = "7.2.7"
+    _METHODS = ("_create_multipart_upload", "_complete_multipart_upload", "_abort_multipart_upload")
+
+    def __init__(self, client: Minio) -> None:
+        self._client = client
+        self.available = all(callable(getattr(client, m, None)) for m in self._METHODS)
+        if minio.__version__ != self.PINNED_VERSION:
+            print(
+                f"MultipartUploads: minio {minio.__version__} khác bản đã kiểm ({self.PINNED_VERSION}),"
+                f" multipart {'vẫn bật' if self.available else 'tắt'}"
+            )
+
+    def create(self, bucket: str, object_name: str, content_type: str) -> str:
+        return self._client._create_multipart_upload(bucket, object_name, {"Content-Type": content_type})
+
+    def complete(self, bucket: str, object_name: str, upload_id: str, parts: List[Part]):
+        return self._client._complete_multipart_upload(bucket, object_name, upload_id, parts)
+
+    def abort(self, bucket: str, object_name: str, upload_id: str) -> None:
+        self._client._abort_multipart_upload(bucket, object_name, upload_id)
+
+
+multipart_uploads = MultipartUploads(minio_client)
+
+
 def build_public_url(bucket: str, obj: str) -> str | None:
     if not MINIO_PUBLIC_BASE_URL:
         return None
@@ -1,22 +1,156 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from app.core.config import MONGO_URI, MONGO_DB
+from pymongo import monitoring
 
-_client = AsyncIOMotorClient(MONGO_URI)
-_db: AsyncIOMotorDatabase = _client[MONGO_DB]
+from app.core.config import (
+    MONGO_URI,
+    MONGO_DB,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+)
+from app.utils.metrics import CallbackMetric
 
+# ✅ client tạo lúc cần (lifespan của app hoặc lần đầu get_mongo_db trong script),
+# không tạo lúc import -> mỗi worker uvicorn/gunicorn có client + pool riêng sau khi fork
+_client: Optional[AsyncIOMotorClient] = None
+_db: Optional[AsyncIOMotorDatabase] = None
 
-def get_mongo_db() -> AsyncIOMotorDatabase:
+
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """
+    Thời gian chờ lấy connection từ pool của pymongo (chạy trên thread của Motor):
+    checkout_started -> checked_out cùng 1 thread nên đo bằng threading.local.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.waiting = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failed = 0
+        self.created = 0
+        self.closed = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.t0 = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event) -> None:
+        waited = time.perf_counter() - getattr(self._local, "t0", time.perf_counter())
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failed += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.created += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.closed += 1
+
+    # các event còn lại của ConnectionPoolListener: không cần
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connected": _client is not None,
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "open": self.created - self.closed,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failed": self.checkout_failed,
+                "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+mongo_pool_stats = MongoPoolStats()
+
+
+def connect_mongo() -> AsyncIOMotorDatabase:
+    global _client, _db
+    if _db is None:
+        _client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE),
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[mongo_pool_stats],
+        )
+        _db = _client[MONGO_DB]
     return _db
 
 
+def get_mongo_db() -> AsyncIOMotorDatabase:
+    return _db if _db is not None else connect_mongo()
+
+
 def get_collection(name: str):
-    return _db[name]
+    return get_mongo_db()[name]
 
 
 async def ping_mongo() -> None:
     # ✅ ping để kiểm tra Mongo sống
-    await _db.command("ping")
+    await get_mongo_db().command("ping")
+
+
+async def warm_mongo(connections: int = MONGO_MIN_POOL_SIZE) -> None:
+    """Mở sẵn connection: N ping song song (mỗi ping giữ 1 connection) thay vì chờ request đầu tiên."""
+    db = get_mongo_db()
+    await asyncio.gather(*(db.command("ping") for _ in range(max(1, connections))))
 
 
 def close_mongo():
-    _client.close()
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client = None
+    _db = None
+
+
+CallbackMetric("kltn_mongo_pool_checked_out", "Connection Mongo đang được dùng", lambda: [({}, mongo_pool_stats.checked_out)])
+CallbackMetric("kltn_mongo_pool_waiting", "Thao tác đang chờ connection Mongo", lambda: [({}, mongo_pool_stats.waiting)])
+CallbackMetric(
+    "kltn_mongo_pool_wait_seconds_total",
+    "Tổng thời gian chờ connection Mongo",
+    lambda: [({}, mongo_pool_stats.wait_seconds_total)],
+    type_name="counter",
+)
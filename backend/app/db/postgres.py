@@ -1,25 +1,120 @@
-from typing import Optional
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
 import asyncpg
+from fastapi import HTTPException
+
+from app.core.config import (
+    PG_HOST,
+    PG_PORT,
+    PG_DB,
+    PG_USER,
+    PG_PASSWORD,
+    PG_POOL_MIN_SIZE,
+    PG_POOL_MAX_SIZE,
+    PG_ACQUIRE_TIMEOUT_SECONDS,
+    PG_COMMAND_TIMEOUT_SECONDS,
+)
+from app.utils.metrics import CallbackMetric, stage_timer
+
+# query ở hot path: prepare sẵn trên mỗi connection mới (asyncpg giữ trong statement cache
+# theo connection) -> login không tốn thêm round trip Parse/Describe
+USER_BY_USERNAME_SQL = """
+SELECT user_id, username, full_name, role::text AS role, password_hash
+FROM users
+WHERE username = $1
+"""
+PREPARED_STATEMENTS = (USER_BY_USERNAME_SQL,)
+
+# login thành công bằng mật khẩu dạng thường (tài khoản cũ) -> thay bằng bcrypt;
+# chỉ ghi nếu password_hash chưa bị đổi xen giữa
+UPGRADE_PASSWORD_HASH_SQL = """
+UPDATE users SET password_hash = $2
+WHERE user_id = $1 AND password_hash = $3
+"""
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    for sql in PREPARED_STATEMENTS:
+        try:
+            # chạy 1 lần với tham số rỗng = prepare + đưa vào statement cache của connection
+            await conn.fetchrow(sql, "")
+        except asyncpg.PostgresError:
+            # DB mới chưa có bảng -> bỏ qua, statement sẽ được prepare ở lần dùng đầu
+            pass
 
-from app.core.config import PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASSWORD
 
 class Postgres:
     def __init__(self) -> None:
         self.pool: Optional[asyncpg.Pool] = None
+        # thống kê chờ connection (pool cạn = waiting tăng, avg/max_wait_ms tăng)
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
 
     async def connect(self) -> None:
         if self.pool is not None:
             return
+        # create_pool mở sẵn min_size connection (+ _init_connection) trước khi nhận request
         self.pool = await asyncpg.create_pool(
             host=PG_HOST,
             port=PG_PORT,
             database=PG_DB,
             user=PG_USER,
             password=PG_PASSWORD,
-            min_size=1,
-            max_size=10,
+            min_size=min(PG_POOL_MIN_SIZE, PG_POOL_MAX_SIZE),
+            max_size=PG_POOL_MAX_SIZE,
+            command_timeout=PG_COMMAND_TIMEOUT_SECONDS,
+            init=_init_connection,
         )
 
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Mượn 1 connection (có đo thời gian chờ); pool cạn quá PG_ACQUIRE_TIMEOUT_SECONDS -> 503."""
+        if self.pool is None:
+            raise HTTPException(status_code=500, detail="Postgres pool chưa được khởi tạo")
+
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            with stage_timer("pg_acquire"):
+                conn = await self.pool.acquire(timeout=PG_ACQUIRE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(status_code=503, detail="Postgres đang quá tải, thử lại sau")
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - t0
+        self.acquired += 1
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "connected": self.pool is not None,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+        if self.pool is not None:
+            out.update(
+                size=self.pool.get_size(),
+                idle=self.pool.get_idle_size(),
+                min_size=self.pool.get_min_size(),
+                max_size=self.pool.get_max_size(),
+            )
+        return out
+
     async def close(self) -> None:
         if self.pool is None:
             return
@@ -27,3 +122,10 @@ class Postgres:
         self.pool = None
 
 pg = Postgres()
+
+# độ bão hoà pool: size - idle = connection đang bị giữ
+CallbackMetric("kltn_pg_pool_size", "Số connection Postgres đang mở", lambda: [({}, pg.pool.get_size())] if pg.pool else [])
+CallbackMetric("kltn_pg_pool_idle", "Số connection Postgres rảnh", lambda: [({}, pg.pool.get_idle_size())] if pg.pool else [])
+CallbackMetric("kltn_pg_pool_max", "max_size của pool Postgres", lambda: [({}, pg.pool.get_max_size())] if pg.pool else [])
+CallbackMetric("kltn_pg_pool_waiting", "Request đang chờ connection Postgres", lambda: [({}, pg.waiting)])
+CallbackMetric("kltn_pg_pool_timeouts_total", "Lần chờ connection Postgres quá hạn", lambda: [({}, pg.timeouts)], type_name="counter")
@@ -3,7 +3,7 @@ from typing import Dict, Any, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.security import decode_access_token
+from app.security import decode_access_token_cached
 
 _bearer = HTTPBearer(auto_error=False)
 
@@ -14,7 +14,7 @@ def get_current_claims(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
 
     try:
-        return decode_access_token(cred.credentials)
+        return decode_access_token_cached(cred.credentials)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
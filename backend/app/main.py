@@ -1,40 +1,102 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.core.config import CORS_ORIGINS
+from app.core.config import CORS_ORIGINS, JOBS_ENABLED, METRICS_ENABLED
 from app.db.postgres import pg
 import app.db.mongo_client as mongo_client  # ✅ import module
+from app.db.minio_client import bucket_registry
+from app.services.mongo_index_service import ensure_indexes
+from app.services.minio_service import upload_pool
+from app.security import password_pool
+from app.services.ingest_service import shutdown_ingest_pool
+from app.services.fulltext_service import fulltext_sync, schedule_fulltext_load
+from app.services.job_service import job_dispatcher, schedule_intent_sweep
+from app.services.response_cache import response_cache
+from app.utils.metrics import MetricsMiddleware, render_metrics
 
 from app.routers.auth import router as auth_router
 from app.routers.admin_minio_upload_file import router as upload_router
 from app.routers.admin_documents import router as documents_router
+from app.routers.admin_indexes import router as indexes_router
+from app.routers.admin_tree import router as tree_router
+from app.routers.admin_keywords import router as keywords_router
+from app.routers.admin_search import router as search_router
+from app.routers.admin_jobs import router as jobs_router
+from app.routers.admin_pools import router as pools_router
 
-app = FastAPI(title="KLTN API")
+async def _warm_buckets() -> None:
+    # ✅ nạp sẵn cache bucket; MinIO chưa chạy thì bỏ qua (sẽ hỏi lại khi upload/list)
+    try:
+        await anyio.to_thread.run_sync(bucket_registry.warm)
+    except Exception as e:
+        print("bucket_registry.warm failed:", e)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-@app.on_event("startup")
-async def on_startup():
-    await pg.connect()
-    await mongo_client.ping_mongo()  # ✅ gọi theo module
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ client/pool mở ở đây (mỗi worker sau khi fork), mở sẵn connection song song -> request đầu không chờ
+    await asyncio.gather(pg.connect(), mongo_client.warm_mongo(), _warm_buckets())
+    await ensure_indexes()
+    # ✅ inverted index full-text nạp nền từ chunks
+    schedule_fulltext_load()
+    # ✅ chunk do process khác ghi (worker khác, job ingest) -> poll theo updated_at
+    fulltext_sync.start()
+    # ✅ job nền (ingest, keyword, hash...) lưu trong Mongo
+    if JOBS_ENABLED:
+        job_dispatcher.start()
+        # dọn upload intent quá hạn theo chu kỳ (job tự hẹn lượt sau)
+        await schedule_intent_sweep()
+    # ✅ RESPONSE_CACHE_SHARED=true: theo dõi invalidation của worker khác
+    response_cache.start()
 
-@app.on_event("shutdown")
-async def on_shutdown():
+    yield
+
+    await job_dispatcher.stop()
+    await fulltext_sync.stop()
+    await response_cache.stop()
     await pg.close()
+    upload_pool.shutdown()
+    password_pool.shutdown()
+    shutdown_ingest_pool()
     # ✅ guard để shutdown không làm app crash
     try:
         mongo_client.close_mongo()
     except Exception as e:
         print("close_mongo failed:", e)
 
+
+app = FastAPI(title="KLTN API", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ✅ đếm request + thời gian theo route (xem GET /metrics)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router)
 app.include_router(upload_router)
 app.include_router(documents_router)
+app.include_router(indexes_router)
+app.include_router(tree_router)
+app.include_router(keywords_router)
+app.include_router(search_router)
+app.include_router(jobs_router)
+app.include_router(pools_router)
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/")
 def root():
@@ -1,84 +1,254 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
+from app.core.config import DOCUMENTS_INDEX_PROBE_FALLBACK, LIST_FANOUT_CONCURRENCY
 from app.deps import require_admin
 from app.db.mongo_client import get_mongo_db
-from app.services.mongo_metadata_service import COLLECTION_MAP
-from app.services.document_view_service import build_list_item, build_detail_item
+from app.services.mongo_metadata_service import COLLECTION_MAP, index_documents, lookup_document_type
+from app.services.document_view_service import (
+    build_detail_item,
+    build_list_item,
+    doc_url,
+    stat_many_from_public_urls,
+    stored_stat,
+)
+from app.services.content_service import resolve_object, serve_object
+from app.services.export_service import export_types, iter_export, parse_fields
+from app.services.response_cache import response_cache, scope_key
+from app.services.search_service import build_search_filter, normalize_text
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.metrics import stage_timer
 
 router = APIRouter(prefix="/admin/documents", tags=["Documents (Mongo)"])
 
 
+def _bson_rank(v: Any) -> int:
+    """Thứ tự kiểu khi Mongo sort: null/thiếu < số < chuỗi < object < array < binary < ObjectId < bool < Date."""
+    if v is None:
+        return 0
+    if isinstance(v, bool):
+        return 7
+    if isinstance(v, (int, float)):
+        return 1
+    if isinstance(v, str):
+        return 2
+    if isinstance(v, dict):
+        return 3
+    if isinstance(v, list):
+        return 4
+    if isinstance(v, bytes):
+        return 5
+    if isinstance(v, ObjectId):
+        return 6
+    if isinstance(v, datetime):
+        return 8
+    return 0
+
+
+def _sort_key(entry: Tuple[Dict[str, Any], str]) -> Tuple[int, Any, ObjectId]:
+    """
+    Khoá merge giữa các collection phải khớp thứ tự sort của Mongo trong từng collection
+    (so kiểu BSON trước rồi mới so giá trị), nếu không trang sau bị sót/lặp doc.
+    updated_at nên luôn là Date (ghi mới luôn là Date; dữ liệu cũ: scripts/backfill_updated_at.py).
+    """
+    doc = entry[0]
+    updated_at = doc.get("updated_at")
+    rank = _bson_rank(updated_at)
+    # cùng kiểu mới so giá trị; object/array/binary không so được trong Python -> coi như bằng nhau
+    value = updated_at if rank in (1, 2, 6, 7, 8) else 0
+    return rank, value, doc["_id"]
+
+
+# _bson_rank của giá trị cursor -> các kiểu BSON nhỏ hơn (ngoài null), nằm sau cursor khi sort giảm
+_LOWER_TYPES = {
+    8: ["bool", "objectId", "binData", "array", "object", "string", "number"],
+    2: ["number"],
+    1: [],
+}
+
+
+def _after_filter(after_value: Any, after_id: ObjectId) -> Dict[str, Any]:
+    """Điều kiện 'đứng sau (after_value, after_id)' khi sort (updated_at, _id) giảm dần, theo thứ tự kiểu BSON."""
+    if after_value is None:
+        return {"updated_at": None, "_id": {"$lt": after_id}}
+    # $lt/$eq của Mongo chỉ so trong cùng nhóm kiểu -> các kiểu nhỏ hơn + null/thiếu liệt kê riêng
+    return {
+        "$or": [
+            {"updated_at": {"$lt": after_value}},
+            {"updated_at": after_value, "_id": {"$lt": after_id}},
+            *({"updated_at": {"$type": t}} for t in _LOWER_TYPES[_bson_rank(after_value)]),
+            {"updated_at": None},
+        ]
+    }
+
+
+async def _find_one_type(
+    t: str,
+    *,
+    class_id: str,
+    kw: str,
+    limit: int,
+    after: Optional[Tuple[Any, ObjectId]],
+    sem: asyncio.Semaphore,
+) -> List[Tuple[Dict[str, Any], str]]:
+    """Query 1 collection; kết quả đã sort theo (updated_at, _id) giảm dần."""
+    db = get_mongo_db()
+    coll = db[COLLECTION_MAP[t]]
+
+    flt: Dict[str, Any] = {
+        "type_name": t,
+        "status": {"$ne": "deleted"},
+    }
+
+    # ✅ class_id = all -> không lọc
+    if class_id.strip().lower() != "all":
+        flt["class_id"] = str(class_id)
+
+    conds: List[Dict[str, Any]] = []
+
+    # ✅ search: prefix trên token đã bỏ dấu (có index), không dùng $regex quét toàn bộ
+    # q chỉ có ký tự đặc biệt -> filter khớp rỗng (trước đây trả None = liệt kê tất cả)
+    if kw:
+        conds.append(build_search_filter(kw))
+
+    # ✅ keyset: chỉ lấy doc đứng sau cursor theo (updated_at, _id)
+    if after is not None:
+        conds.append(_after_filter(*after))
+
+    if conds:
+        flt["$and"] = conds
+
+    async with sem:
+        with stage_timer("mongo_find"):
+            cursor = coll.find(flt).sort([("updated_at", -1), ("_id", -1)]).limit(int(limit))
+            docs = await cursor.to_list(length=int(limit))
+
+    return [(doc, t) for doc in docs]
+
+
 @router.get("")
 async def list_documents(
+    request: Request,
     class_id: str = Query(..., description="10/11/12/all"),
     type_name: str = Query(..., description="subject|topic|lesson|chunk|keyword|all"),
-    q: str = Query("", description="search theo name/url"),
-    limit: int = Query(500, ge=1, le=5000),
+    q: str = Query("", description="search theo name/tên file (không dấu, khớp đầu từ)"),
+    limit: int = Query(500, ge=1, le=5000, description="số item mỗi trang"),
+    cursor: str = Query("", description="next_cursor của trang trước (rỗng = trang đầu)"),
+    verify: bool = Query(False, description="true -> stat lại MinIO thay vì dùng size đã lưu trong Mongo"),
     _claims=Depends(require_admin),
 ):
-    db = get_mongo_db()
-
-    class_id_norm = (class_id or "").strip().lower()
     type_name_norm = (type_name or "").strip().lower()
+    if type_name_norm != "all" and type_name_norm not in COLLECTION_MAP:
+        raise HTTPException(status_code=400, detail="type_name không hợp lệ")
+    class_norm = (class_id or "").strip()
     kw = (q or "").strip()
+    cursor = (cursor or "").strip()
 
-    # ✅ types cần query
-    if type_name_norm == "all":
-        types_to_query = list(COLLECTION_MAP.keys())
-    elif type_name_norm in COLLECTION_MAP:
-        types_to_query = [type_name_norm]
-    else:
-        raise HTTPException(status_code=400, detail="type_name không hợp lệ")
+    # (không dùng @timed: wrapper đổi __globals__, FastAPI không resolve được annotation Request)
+    with stage_timer("list_documents"):
+        # verify=true là muốn số liệu mới từ MinIO -> không qua cache
+        if verify:
+            return await _list_page(class_norm, type_name_norm, kw, limit, cursor, verify=True)
 
-    all_items: List[Dict[str, Any]] = []
+        # ✅ cache theo tham số đã chuẩn hoá; upload/upsert metadata của class/type -> entry hết hạn
+        key = ("list", class_norm.lower(), type_name_norm, " ".join(normalize_text(kw).split()), limit, cursor)
 
-    for t in types_to_query:
-        coll = db[COLLECTION_MAP[t]]
-        name_key = f"{t}_name"
-        url_key = f"{t}_url"
+        async def build():
+            page = await _list_page(class_norm, type_name_norm, kw, limit, cursor, verify=False)
+            return page, scope_key(class_norm, type_name_norm)
 
-        flt: Dict[str, Any] = {
-            "type_name": t,
-            "status": {"$ne": "deleted"},
-        }
+        return await response_cache.respond(request, key, build)
 
-        # ✅ class_id = all -> không lọc
-        if class_id_norm != "all":
-            flt["class_id"] = str(class_id)
 
-        # ✅ search
-        if kw:
-            flt["$or"] = [
-                {name_key: {"$regex": kw, "$options": "i"}},
-                {url_key: {"$regex": kw, "$options": "i"}},
-            ]
+async def _list_page(
+    class_id: str, type_name_norm: str, kw: str, limit: int, cursor: str, *, verify: bool
+) -> Dict[str, Any]:
+    after = decode_cursor(cursor) if cursor else None
 
-        cursor = coll.find(flt).sort("updated_at", -1).limit(int(limit))
+    # ✅ types cần query
+    types_to_query = list(COLLECTION_MAP.keys()) if type_name_norm == "all" else [type_name_norm]
 
-        async for doc in cursor:
-            it = await build_list_item(doc, t)
-            if it:
-                # ✅ để FE biết item thuộc loại nào (quan trọng khi type_name=all)
-                it["type_name"] = t
-                all_items.append(it)
+    # ✅ query các collection song song (giới hạn LIST_FANOUT_CONCURRENCY), mỗi collection lấy limit+1
+    sem = asyncio.Semaphore(max(1, LIST_FANOUT_CONCURRENCY))
+    streams = await asyncio.gather(
+        *(
+            _find_one_type(t, class_id=class_id or "", kw=kw, limit=limit + 1, after=after, sem=sem)
+            for t in types_to_query
+        )
+    )
 
-    # ✅ sort chung theo last_updated (ISO string) mới nhất
-    all_items.sort(key=lambda x: x.get("last_updated") or "", reverse=True)
+    # ✅ mỗi stream đã sort sẵn -> k-way merge, chỉ giữ đúng 1 trang (+1 để biết còn trang sau)
+    page = list(islice(heapq.merge(*streams, key=_sort_key, reverse=True), limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
 
-    return {"count": len(all_items), "items": all_items}
+    # ✅ chỉ stat MinIO (theo lô) cho doc chưa có `object` trong Mongo, hoặc khi verify=true
+    stats = await stat_many_from_public_urls(
+        doc_url(doc, t) for doc, t in page if verify or stored_stat(doc) is None
+    )
 
+    items: List[Dict[str, Any]] = []
+    for doc, t in page:
+        url = doc_url(doc, t)
+        stat = stats.get(url) if url in stats else stored_stat(doc)
+        it = await build_list_item(doc, t, stat or (None, None))
+        if it:
+            # ✅ để FE biết item thuộc loại nào (quan trọng khi type_name=all)
+            it["type_name"] = t
+            items.append(it)
 
-@router.get("/{doc_id}")
-async def get_document_detail(
-    doc_id: str,
-    type_name: str = Query("", description="subject|topic|lesson|chunk|keyword (rỗng sẽ tự dò)"),
+    next_cursor = None
+    if has_more and page:
+        last_doc = page[-1][0]
+        next_cursor = encode_cursor(last_doc.get("updated_at"), last_doc["_id"])
+
+    return {"count": len(items), "items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_documents(
+    class_id: str = Query("all", description="10/11/12/all"),
+    type_name: str = Query("all", description="subject|topic|lesson|chunk|keyword|all"),
+    fields: str = Query("", description="field cần lấy, cách nhau dấu phẩy (vd chunk_name,content); rỗng = tất cả"),
+    include_deleted: bool = Query(False, description="true -> lấy cả doc status=deleted"),
+    gzip: bool = Query(False, description="true -> file .ndjson.gz"),
     _claims=Depends(require_admin),
 ):
+    """
+    Dump metadata ra NDJSON (1 doc/dòng) stream thẳng từ cursor Mongo cho job phân tích offline:
+    bộ nhớ cố định theo batch, không stat MinIO. Khai báo trước /{doc_id} để không bị nuốt route.
+    """
+    types = export_types(type_name)
+    projection = parse_fields(fields)
+    safe_class = "".join(ch for ch in (class_id or "") if ch.isalnum()) or "all"
+    name = f"documents_{safe_class}_{types[0] if len(types) == 1 else 'all'}.ndjson"
+    if gzip:
+        name += ".gz"
+
+    return StreamingResponse(
+        iter_export(
+            class_id=class_id or "all",
+            types=types,
+            projection=projection,
+            include_deleted=include_deleted,
+            compress=gzip,
+        ),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "Cache-Control": "no-store"},
+    )
+
+
+async def _load_document(doc_id: str, type_name: str) -> Tuple[Dict[str, Any], str]:
+    """(doc, type_name) theo _id; không có type_name -> documents_index rồi mới dò từng collection."""
     db = get_mongo_db()
 
     try:
@@ -96,13 +266,61 @@ async def get_document_detail(
         doc = await coll.find_one({"_id": oid})
         if not doc:
             raise HTTPException(status_code=404, detail="Không tìm thấy tài liệu")
-        return await build_detail_item(doc, tn)
+        return doc, tn
+
+    # ✅ không truyền type_name -> tra documents_index (1 lần đọc theo _id)
+    t = await lookup_document_type(oid)
+    if t:
+        doc = await db[COLLECTION_MAP[t]].find_one({"_id": oid})
+        if doc:
+            return doc, t
+
+    if not DOCUMENTS_INDEX_PROBE_FALLBACK:
+        raise HTTPException(status_code=404, detail="Không tìm thấy tài liệu")
 
-    # ✅ không truyền type_name -> dò tất cả collection
+    # doc cũ chưa có trong documents_index -> dò từng collection, tìm thấy thì bổ sung index
     for k, coll_name in COLLECTION_MAP.items():
+        if k == t:
+            continue
         coll = db[coll_name]
         doc = await coll.find_one({"_id": oid})
         if doc:
-            return await build_detail_item(doc, k)
+            await index_documents(k, str(doc.get("class_id") or ""), [oid])
+            return doc, k
 
     raise HTTPException(status_code=404, detail="Không tìm thấy tài liệu")
+
+
+@router.get("/{doc_id}")
+async def get_document_detail(
+    doc_id: str,
+    request: Request,
+    type_name: str = Query("", description="subject|topic|lesson|chunk|keyword (rỗng sẽ tự dò)"),
+    verify: bool = Query(False, description="true -> stat lại MinIO"),
+    _claims=Depends(require_admin),
+):
+    if verify:
+        doc, t = await _load_document(doc_id, type_name)
+        return await build_detail_item(doc, t, verify=True)
+
+    async def build():
+        doc, t = await _load_document(doc_id, type_name)
+        return await build_detail_item(doc, t), scope_key(doc.get("class_id"), t)
+
+    return await response_cache.respond(request, ("detail", doc_id, (type_name or "").strip().lower()), build)
+
+
+@router.get("/{doc_id}/content")
+async def get_document_content(
+    doc_id: str,
+    request: Request,
+    type_name: str = Query("", description="subject|topic|lesson|chunk|keyword (rỗng sẽ tự dò)"),
+    download: bool = Query(False, description="true -> Content-Disposition: attachment"),
+    _claims=Depends(require_admin),
+):
+    """
+    File của tài liệu qua API (không cần bucket public): stream từ MinIO, hỗ trợ Range (PDF viewer
+    tua trang), ETag/Last-Modified + 304, object nhỏ dùng chung cache RAM.
+    """
+    doc, t = await _load_document(doc_id, type_name)
+    return await serve_object(request, await resolve_object(doc, t), download=download)
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.deps import require_admin
+from app.services.mongo_index_service import ensure_indexes, index_report
+
+router = APIRouter(prefix="/admin/indexes", tags=["Indexes (Mongo)"])
+
+
+@router.get("")
+async def get_index_report(_claims=Depends(require_admin)):
+    return await index_report()
+
+
+@router.post("/ensure")
+async def post_ensure_indexes(_claims=Depends(require_admin)):
+    created = await ensure_indexes()
+    return {"created": created}
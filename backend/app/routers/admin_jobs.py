@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.deps import require_admin
+from app.services.job_service import (
+    JOB_HANDLERS,
+    JOB_STATUSES,
+    get_job,
+    job_counts,
+    job_dispatcher,
+    list_jobs,
+    retry_job,
+)
+
+router = APIRouter(prefix="/admin/jobs", tags=["Jobs"])
+
+
+@router.get("")
+async def get_jobs(
+    status: Optional[str] = Query(None, description="queued/running/done/failed"),
+    kind: Optional[str] = Query(None, description="ingest_lesson/extract_keywords/hash_object/sweep_upload_intents"),
+    limit: int = Query(50, ge=1, le=500),
+    _claims=Depends(require_admin),
+):
+    if status and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail="status phải là queued/running/done/failed")
+    if kind and kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"kind không hợp lệ: {kind}")
+    items = await list_jobs(status=status, kind=kind, limit=limit)
+    return {"count": len(items), "items": items}
+
+
+@router.get("/stats")
+async def get_job_stats(_claims=Depends(require_admin)):
+    """Số job theo kind/status + dispatcher của process này."""
+    return {"counts": await job_counts(), "dispatcher": job_dispatcher.stats()}
+
+
+@router.get("/{job_id}")
+async def get_job_detail(job_id: str, _claims=Depends(require_admin)):
+    return await get_job(job_id)
+
+
+@router.post("/{job_id}/retry")
+async def post_job_retry(job_id: str, _claims=Depends(require_admin)):
+    return await retry_job(job_id)
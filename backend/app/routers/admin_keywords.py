@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.config import KEYWORD_TOP_K
+from app.deps import require_admin
+from app.services.keyword_service import extract_class_keywords
+
+router = APIRouter(prefix="/admin/keywords", tags=["Keywords (TF-IDF)"])
+
+ALLOWED_CLASSES = {"10", "11", "12"}
+
+
+@router.post("/extract")
+async def post_extract_keywords(
+    class_id: str = Query(..., description="10/11/12"),
+    top_k: int = Query(KEYWORD_TOP_K, ge=1, le=50),
+    full: bool = Query(False, description="true -> tính lại cho mọi chunk, không chỉ chunk mới/đổi"),
+    _claims=Depends(require_admin),
+):
+    class_id = (class_id or "").strip()
+    if class_id not in ALLOWED_CLASSES:
+        raise HTTPException(status_code=400, detail="class phải là 10/11/12")
+    return await extract_class_keywords(class_id, top_k=top_k, full=full)
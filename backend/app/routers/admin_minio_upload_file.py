@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 
 from app.deps import require_admin
+from app.schemas.upload import UploadIntentComplete, UploadIntentRequest
+from app.services.bulk_upload_service import bulk_upload, entries_from_archive
 from app.services.minio_paths import TypeName
-from app.services.minio_service import upload_one
+from app.services.content_index_service import upload_deduplicated
+from app.services.ingest_service import enqueue_ingest
+from app.services.minio_service import upload_pool
 from app.services.mongo_metadata_service import parse_metadata, upsert_entity_metadata
+from app.services.upload_intent_service import (
+    abort_upload_intent,
+    complete_upload_intent,
+    create_upload_intent,
+)
 from app.utils.validators import validate_extension, validate_size
 
 router = APIRouter(prefix="/admin/minio", tags=["MinIO"])
@@ -56,6 +65,14 @@ def slim_doc(doc: Dict[str, Any], type_name: str) -> Dict[str, Any]:
     return out
 
 
+def validate_target(class_id: str, type_name: str) -> None:
+    if class_id not in ALLOWED_CLASSES:
+        raise HTTPException(status_code=400, detail="class phải là 10/11/12")
+
+    if type_name not in ALLOWED_TYPES:
+        raise HTTPException(status_code=400, detail="type phải là subject/topic/lesson/chunk")
+
+
 @router.post("/file")
 async def upload_admin_file(
     # format mới
@@ -75,11 +92,7 @@ async def upload_admin_file(
     final_type = (type_ or type_name or "").strip().lower()
     raw_metadata = metadata if metadata is not None else (metadata_json if metadata_json is not None else "{}")
 
-    if final_class not in ALLOWED_CLASSES:
-        raise HTTPException(status_code=400, detail="class phải là 10/11/12")
-
-    if final_type not in ALLOWED_TYPES:
-        raise HTTPException(status_code=400, detail="type phải là subject/topic/lesson/chunk")
+    validate_target(final_class, final_type)
 
     if not file.filename:
         raise HTTPException(status_code=400, detail="File rỗng hoặc không hợp lệ")
@@ -96,8 +109,8 @@ async def upload_admin_file(
 
     validate_size(size_bytes)
 
-    # 1) upload minio
-    minio_res = upload_one(
+    # 1) upload minio (thread pool riêng, bỏ qua ghi nếu nội dung đã có -> minio.deduplicated)
+    minio_res = await upload_deduplicated(
         class_id=final_class,
         type_name=final_type,
         filename=filename,
@@ -127,4 +140,132 @@ async def upload_admin_file(
             "collection": mongo_res["collection"],
             "document": slim,  # ✅ response gọn như bạn muốn
         },
+        "ingest": await enqueue_ingest(
+            class_id=final_class,
+            type_name=final_type,
+            minio_info=minio_res,
+            doc=full_doc,
+            created_by=str(_claims.get("sub") or "admin"),
+        ),
+    }
+
+
+@router.post("/files")
+async def upload_admin_files(
+    class_: Optional[str] = Form(None, alias="class"),
+    type_: Optional[TypeName] = Form(None, alias="type"),
+    metadata: Optional[str] = Form(None, alias="metadata"),
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    _claims=Depends(require_admin),
+):
+    """
+    Upload nhiều file 1 lần:
+    - `files` (nhiều file, cùng `type`), hoặc
+    - `archive`: 1 file zip, type suy ra từ đường dẫn (vd subjects/topics/lessons/bai1.pdf -> lesson)
+    `metadata`: JSON object {tên file hoặc đường dẫn trong zip: {...metadata}}.
+    """
+    final_class = (class_ or "").strip()
+    if final_class not in ALLOWED_CLASSES:
+        raise HTTPException(status_code=400, detail="class phải là 10/11/12")
+
+    metadata_by_name = parse_metadata(metadata)
+
+    if archive is not None:
+        entries = entries_from_archive(archive.file, allowed_types=ALLOWED_TYPES)
+    else:
+        final_type = (type_ or "").strip().lower()
+        validate_target(final_class, final_type)
+        entries = []
+        for f in files or []:
+            if not f.filename:
+                continue
+            f.file.seek(0, 2)
+            size_bytes = f.file.tell()
+            f.file.seek(0)
+            entries.append(
+                {
+                    "name": f.filename,
+                    "filename": f.filename,
+                    "type_name": final_type,
+                    "size_bytes": size_bytes,
+                    "content_type": f.content_type or "",
+                    "open": (lambda fo=f.file: fo),
+                }
+            )
+
+    return await bulk_upload(
+        class_id=final_class,
+        entries=entries,
+        metadata_by_name=metadata_by_name,
+        created_by=str(_claims.get("sub") or "admin"),
+    )
+
+
+@router.post("/upload-intents")
+async def post_upload_intent(payload: UploadIntentRequest, _claims=Depends(require_admin)):
+    """
+    Bước 1 của upload trực tiếp: kiểm tra class/type/đuôi/size rồi trả presigned PUT URL
+    (file lớn -> multipart, mỗi part 1 URL). Browser PUT thẳng lên MinIO, không qua API.
+    """
+    final_class = payload.class_id.strip()
+    final_type = payload.type_name.strip().lower()
+    validate_target(final_class, final_type)
+    validate_extension(payload.filename)
+    validate_size(payload.size_bytes)
+
+    return await create_upload_intent(
+        class_id=final_class,
+        type_name=final_type,
+        filename=payload.filename,
+        size_bytes=payload.size_bytes,
+        content_type=payload.content_type,
+        metadata=dict(payload.metadata),
+        created_by=str(_claims.get("sub") or "admin"),
+    )
+
+
+@router.post("/upload-intents/{intent_id}/complete")
+async def post_upload_intent_complete(
+    intent_id: str,
+    payload: UploadIntentComplete,
+    _claims=Depends(require_admin),
+):
+    """Bước 2: chốt object (multipart) + upsert metadata Mongo. Response giống POST /file."""
+    res = await complete_upload_intent(
+        intent_id,
+        parts=[p.model_dump() for p in payload.parts] if payload.parts else None,
+        completed_by=str(_claims.get("sub") or "admin"),
+    )
+    mongo_res = res["mongo"]
+    final_type = res["minio"]["type_name"]
+
+    full_doc = mongo_res.get("document") or {}
+
+    return {
+        "minio": res["minio"],
+        "mongo": {
+            "collection": mongo_res["collection"],
+            "document": slim_doc(full_doc, final_type),
+        },
+        "ingest": await enqueue_ingest(
+            class_id=str(full_doc.get("class_id") or ""),
+            type_name=final_type,
+            minio_info=res["minio"],
+            doc=full_doc,
+            created_by=str(_claims.get("sub") or "admin"),
+        ),
+        "jobs": res["jobs"],
     }
+
+
+@router.delete("/upload-intents/{intent_id}")
+async def delete_upload_intent(intent_id: str, _claims=Depends(require_admin)):
+    await abort_upload_intent(intent_id)
+    return {"status": "aborted"}
+
+
+@router.get("/upload-queue")
+async def get_upload_queue(_claims=Depends(require_admin)):
+    """Độ sâu hàng đợi upload: queued = đang chờ worker, active = đang put_object."""
+    return upload_pool.stats()
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.db.mongo_client import mongo_pool_stats
+from app.db.postgres import pg
+from app.deps import require_admin
+from app.security import password_pool
+from app.services.minio_service import upload_pool
+
+router = APIRouter(prefix="/admin/pools", tags=["Pools"])
+
+
+@router.get("")
+async def get_pools(_claims=Depends(require_admin)):
+    """
+    Độ bão hoà các pool của worker này: waiting/avg_wait_ms/max_wait_ms tăng = pool cạn
+    (tăng PG_POOL_MAX_SIZE / MONGO_MAX_POOL_SIZE hoặc số worker thread).
+    """
+    return {
+        "postgres": pg.stats(),
+        "mongo": mongo_pool_stats.stats(),
+        "minio_upload": upload_pool.stats(),
+        "bcrypt": password_pool.stats(),
+    }
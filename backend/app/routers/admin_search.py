@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.config import FULLTEXT_ENABLED
+from app.deps import require_admin
+from app.services.fulltext_service import fulltext_index, fulltext_sync, load_fulltext_index, search_chunks
+
+router = APIRouter(prefix="/admin/search", tags=["Search (full-text)"])
+
+
+def _require_enabled() -> None:
+    if not FULLTEXT_ENABLED:
+        raise HTTPException(status_code=404, detail="Full-text search đang tắt (FULLTEXT_ENABLED=false)")
+
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, description="từ khoá (có/không dấu đều được)"),
+    class_id: str = Query("all", description="10/11/12/all"),
+    limit: int = Query(20, ge=1, le=100),
+    _claims=Depends(require_admin),
+):
+    """Tìm trong nội dung chunks (BM25), kèm lesson/topic chứa chunk."""
+    _require_enabled()
+    class_id = (class_id or "").strip()
+    return await search_chunks(q, class_id=None if class_id in ("", "all") else class_id, limit=limit)
+
+
+@router.get("/stats")
+async def search_stats(_claims=Depends(require_admin)):
+    _require_enabled()
+    return {**fulltext_index.stats(), "sync": fulltext_sync.stats()}
+
+
+@router.post("/reload")
+async def search_reload(_claims=Depends(require_admin)):
+    """Dựng lại index từ Mongo (vd sau khi sửa chunks trực tiếp trong DB)."""
+    _require_enabled()
+    return await load_fulltext_index()
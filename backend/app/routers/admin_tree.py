@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.deps import require_admin
+from app.services.mongo_metadata_service import HIERARCHY, lookup_document_type
+from app.services.tree_service import build_tree
+
+router = APIRouter(prefix="/admin/tree", tags=["Tree (Mongo)"])
+
+
+@router.get("")
+async def get_tree(
+    class_id: str = Query(..., description="10/11/12/all"),
+    root_id: str = Query("", description="_id của node cần mở rộng (rỗng = từ subject)"),
+    depth: int = Query(2, ge=1, le=len(HIERARCHY), description="số level trả về"),
+    _claims=Depends(require_admin),
+):
+    root_oid = None
+    root_type = None
+    if (root_id or "").strip():
+        try:
+            root_oid = ObjectId(root_id.strip())
+        except Exception:
+            raise HTTPException(status_code=400, detail="root_id không hợp lệ")
+        root_type = await lookup_document_type(root_oid)
+        if root_type is None:
+            raise HTTPException(status_code=404, detail="Không tìm thấy node")
+
+    return await build_tree(class_id=class_id or "", root_id=root_oid, root_type=root_type, depth=depth)
@@ -1,8 +1,20 @@
-from fastapi import APIRouter, HTTPException, status
+import hmac
+
+import asyncpg
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
-from app.db.postgres import pg
-from app.auth import verify_password, create_access_token
+from app.db.postgres import UPGRADE_PASSWORD_HASH_SQL, USER_BY_USERNAME_SQL, pg
+from app.auth import create_access_token
+from app.deps import require_admin
+from app.security import (
+    hash_password_async,
+    is_password_hash,
+    password_pool,
+    token_cache,
+    verify_password_async,
+)
+from app.utils.metrics import stage_timer, timed
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -17,21 +29,32 @@ class TokenResponse(BaseModel):
     full_name: str
 
 @router.post("/login", response_model=TokenResponse)
+@timed("login")
 async def login(payload: LoginRequest) -> TokenResponse:
-    if pg.pool is None:
-        raise HTTPException(status_code=500, detail="Postgres pool chưa được khởi tạo")
-
-    async with pg.pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT user_id, username, full_name, role::text AS role, password_hash
-            FROM users
-            WHERE username = $1
-            """,
-            payload.username,
-        )
-
-    if row is None or not verify_password(payload.password, row["password_hash"]):
+    # pg.acquire đo thời gian chờ connection (pool bão hoà, xem GET /admin/pools);
+    # USER_BY_USERNAME_SQL đã được prepare sẵn trên mỗi connection của pool
+    async with pg.acquire() as conn:
+        with stage_timer("pg_fetch"):
+            row = await conn.fetchrow(USER_BY_USERNAME_SQL, payload.username)
+
+    ok = False
+    if row is not None:
+        stored = row["password_hash"] or ""
+        if is_password_hash(stored):
+            # ✅ bcrypt chạy trên password_pool, không chặn event loop
+            try:
+                with stage_timer("bcrypt_verify"):
+                    ok = await verify_password_async(payload.password, stored)
+            except ValueError:
+                # hash hỏng / mật khẩu bcrypt không nhận -> sai mật khẩu, không phải lỗi 500
+                ok = False
+        elif stored:
+            # tài khoản cũ còn lưu mật khẩu dạng thường: so sánh thời gian hằng, đúng thì đổi sang bcrypt
+            ok = hmac.compare_digest(payload.password.encode("utf-8"), stored.encode("utf-8"))
+            if ok:
+                await _upgrade_password_hash(row["user_id"], payload.password, stored)
+
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sai tài khoản hoặc mật khẩu")
 
     claims = {
@@ -47,3 +70,25 @@ async def login(payload: LoginRequest) -> TokenResponse:
         role=row["role"],
         full_name=row["full_name"],
     )
+
+
+async def _upgrade_password_hash(user_id, password: str, stored: str) -> None:
+    """Ghi bcrypt thay mật khẩu dạng thường; lỗi không làm hỏng lần login này (lần sau thử lại)."""
+    try:
+        new_hash = await hash_password_async(password)
+        async with pg.acquire() as conn:
+            await conn.execute(UPGRADE_PASSWORD_HASH_SQL, user_id, new_hash, stored)
+    except (asyncpg.PostgresError, ValueError) as e:
+        print("upgrade password hash failed:", user_id, e)
+
+
+@router.get("/password-pool")
+async def get_password_pool(_claims=Depends(require_admin)):
+    """Độ sâu hàng đợi bcrypt: queued = đang chờ worker, avg_wait_ms = thời gian chờ trung bình."""
+    return password_pool.stats()
+
+
+@router.get("/token-cache")
+async def get_token_cache(_claims=Depends(require_admin)):
+    """Hit/miss của cache token đã verify (hit = không phải jwt.decode)."""
+    return token_cache.stats()
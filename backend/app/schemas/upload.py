@@ -0,0 +1,22 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UploadIntentRequest(BaseModel):
+    class_id: str = Field(..., min_length=1)
+    type_name: str = Field(..., min_length=1)
+    filename: str = Field(..., min_length=1)
+    size_bytes: int = Field(..., gt=0)
+    content_type: str = ""
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class UploadedPart(BaseModel):
+    part_number: int = Field(..., ge=1)
+    etag: str = Field(..., min_length=1)
+
+
+class UploadIntentComplete(BaseModel):
+    # chỉ cần khi upload multipart: etag trả về (header ETag) của từng PUT part
+    parts: Optional[List[UploadedPart]] = None
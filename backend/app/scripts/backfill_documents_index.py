@@ -0,0 +1,39 @@
+import asyncio
+
+from app.db.mongo_client import get_mongo_db, close_mongo
+from app.services.mongo_metadata_service import COLLECTION_MAP, index_documents
+
+BATCH_SIZE = 1000
+
+
+async def backfill_collection(type_name: str, coll_name: str) -> int:
+    """Ghi documents_index (_id -> type/collection) cho mọi doc đang có."""
+    coll = get_mongo_db()[coll_name]
+    total = 0
+    batch = {}
+
+    async for doc in coll.find({}, {"class_id": 1}):
+        batch.setdefault(str(doc.get("class_id") or ""), []).append(doc["_id"])
+        total += 1
+        if total % BATCH_SIZE == 0:
+            for class_id, ids in batch.items():
+                await index_documents(type_name, class_id, ids)
+            batch = {}
+
+    for class_id, ids in batch.items():
+        await index_documents(type_name, class_id, ids)
+
+    return total
+
+
+async def main():
+    try:
+        for type_name, coll_name in COLLECTION_MAP.items():
+            n = await backfill_collection(type_name, coll_name)
+            print(f"{coll_name}: index {n} document")
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+
+import anyio
+from minio.error import S3Error
+
+from app.db.minio_client import minio_client
+from app.db.mongo_client import get_mongo_db, close_mongo
+from app.services.document_view_service import parse_minio_public_url
+from app.services.mongo_metadata_service import COLLECTION_MAP
+
+
+async def backfill_collection(type_name: str, coll_name: str) -> int:
+    """Gắn field `object` (bucket/object_name/size/etag/content_type/last_modified) cho doc cũ."""
+    coll = get_mongo_db()[coll_name]
+    url_key = f"{type_name}_url"
+    updated = 0
+
+    cursor = coll.find({"object": {"$exists": False}}, {url_key: 1, "url": 1})
+    async for doc in cursor:
+        url = doc.get(url_key) or doc.get("url")
+        bucket, obj = parse_minio_public_url(url or "")
+        if not bucket or not obj:
+            continue
+
+        try:
+            stat = await anyio.to_thread.run_sync(minio_client.stat_object, bucket, obj)
+        except S3Error as e:
+            print(f"[{coll_name}] skip {doc['_id']}: {e.code}")
+            continue
+
+        await coll.update_one(
+            {"_id": doc["_id"]},
+            {
+                "$set": {
+                    "object": {
+                        "bucket": bucket,
+                        "object_name": obj,
+                        "size_bytes": stat.size,
+                        "etag": stat.etag,
+                        "content_type": stat.content_type,
+                        "last_modified": stat.last_modified,
+                    }
+                }
+            },
+        )
+        updated += 1
+
+    return updated
+
+
+async def main():
+    try:
+        for type_name, coll_name in COLLECTION_MAP.items():
+            n = await backfill_collection(type_name, coll_name)
+            print(f"{coll_name}: backfill {n} document")
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.db.mongo_client import get_mongo_db, close_mongo
+from app.services.mongo_index_service import ensure_indexes
+from app.services.mongo_metadata_service import COLLECTION_MAP
+from app.services.search_service import SEARCH_FIELD, build_search_tokens
+
+BATCH_SIZE = 1000
+
+
+async def backfill_collection(type_name: str, coll_name: str) -> int:
+    """Tính lại search_tokens (bỏ dấu) cho doc cũ, ghi theo lô bằng bulk_write."""
+    coll = get_mongo_db()[coll_name]
+    name_key = f"{type_name}_name"
+    url_key = f"{type_name}_url"
+    updated = 0
+    ops = []
+
+    cursor = coll.find({}, {name_key: 1, "name": 1, "source_object": 1, url_key: 1, "url": 1})
+    async for doc in cursor:
+        # url của doc đã khử trùng lặp là key theo hash -> lấy tên file từ source_object
+        source = doc.get("source_object") or doc.get(url_key) or doc.get("url")
+        tokens = build_search_tokens(doc.get(name_key) or doc.get("name"), source)
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {SEARCH_FIELD: tokens}}))
+        if len(ops) >= BATCH_SIZE:
+            await coll.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    return updated
+
+
+async def main():
+    try:
+        await ensure_indexes()
+        for type_name, coll_name in COLLECTION_MAP.items():
+            n = await backfill_collection(type_name, coll_name)
+            print(f"{coll_name}: backfill {n} document")
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+from app.db.mongo_client import get_mongo_db, close_mongo
+from app.services.mongo_metadata_service import COLLECTION_MAP
+
+BATCH_SIZE = 1000
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Chuỗi ISO / epoch (giây hoặc ms) -> datetime UTC naive như Mongo trả về; không đọc được -> None."""
+    try:
+        if isinstance(value, datetime):
+            dt = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            dt = datetime.fromtimestamp(value / 1000 if value > 1e11 else value, tz=timezone.utc)
+        elif isinstance(value, str) and value.strip():
+            dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        else:
+            return None
+    except (ValueError, OverflowError, OSError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def normalized_updated_at(doc: Dict[str, Any]) -> datetime:
+    return (
+        to_datetime(doc.get("updated_at"))
+        or to_datetime(doc.get("created_at"))
+        # doc rất cũ không có cả 2: thời điểm tạo _id
+        or doc["_id"].generation_time.replace(tzinfo=None)
+    )
+
+
+async def backfill_collection(coll_name: str) -> int:
+    """
+    updated_at không phải Date (thiếu, null, chuỗi, số) -> Date. List keyset theo (updated_at, _id)
+    và k-way merge giữa các collection chỉ đúng khi mọi doc cùng kiểu Date.
+    """
+    coll = get_mongo_db()[coll_name]
+    updated = 0
+    ops = []
+
+    async for doc in coll.find({"updated_at": {"$not": {"$type": "date"}}}, {"updated_at": 1, "created_at": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"updated_at": normalized_updated_at(doc)}}))
+        if len(ops) >= BATCH_SIZE:
+            await coll.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    return updated
+
+
+async def main():
+    try:
+        for coll_name in COLLECTION_MAP.values():
+            n = await backfill_collection(coll_name)
+            print(f"{coll_name}: chuẩn hoá updated_at cho {n} document")
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+
+from app.db.mongo_client import close_mongo
+from app.services.ingest_service import shutdown_ingest_pool
+from app.services.keyword_service import extract_class_keywords
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Tính keyword TF-IDF cho chunks (chỉ chunk mới/đổi, trừ khi --full)")
+    ap.add_argument("class_ids", nargs="*", default=["10", "11", "12"])
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--full", action="store_true")
+    args = ap.parse_args()
+
+    try:
+        for class_id in args.class_ids:
+            print(await extract_class_keywords(class_id, top_k=args.top_k, full=args.full))
+    finally:
+        shutdown_ingest_pool()
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
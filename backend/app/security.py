@@ -1,19 +1,44 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from app.core.config import JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    JWT_SECRET,
+    JWT_ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PASSWORD_HASH_WORKERS,
+    JWT_CACHE_ENABLED,
+    JWT_CACHE_SIZE,
+)
+from app.utils.metrics import register_cache, stage_timer
+from app.utils.pool import BoundedPool
 
 _pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt tốn vài chục ms CPU mỗi lần -> chạy trên pool riêng, login dồn dập không chặn event loop
+password_pool = BoundedPool("bcrypt", PASSWORD_HASH_WORKERS)
+
 def hash_password(password: str) -> str:
     return _pwd.hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
     return _pwd.verify(password, password_hash)
 
+def is_password_hash(value: str) -> bool:
+    return bool(value) and _pwd.identify(value) is not None
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await password_pool.run(verify_password, password, password_hash)
+
 def create_access_token(claims: Dict[str, Any], expires_minutes: Optional[int] = None) -> str:
     payload = dict(claims)
     exp = datetime.utcnow() + timedelta(minutes=expires_minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -22,6 +47,77 @@ def create_access_token(claims: Dict[str, Any], expires_minutes: Optional[int] =
 
 def decode_access_token(token: str) -> Dict[str, Any]:
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        with stage_timer("jwt_decode"):
+            return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except JWTError as e:
         raise ValueError("Invalid or expired token") from e
+
+
+class TokenCache:
+    """
+    LRU: sha256(token) -> claims đã verify. Hit -> bỏ qua jwt.decode (không verify chữ ký lại).
+    Entry tự hết hạn theo claim exp của token.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(1, maxsize)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[1] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return dict(hit[0])
+            if hit is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._data[key] = (dict(claims), float(exp))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": JWT_CACHE_ENABLED,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+token_cache = TokenCache(JWT_CACHE_SIZE)
+register_cache("jwt", token_cache.stats)
+
+def decode_access_token_cached(token: str) -> Dict[str, Any]:
+    if not JWT_CACHE_ENABLED:
+        return decode_access_token(token)
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = decode_access_token(token)
+        token_cache.put(token, claims)
+    return claims
@@ -0,0 +1,195 @@
+import asyncio
+import mimetypes
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import BULK_UPLOAD_MAX_FILES
+from app.services.minio_paths import TYPE_PREFIX
+from app.db.mongo_client import get_mongo_db
+from app.services.content_index_service import upload_deduplicated
+from app.services.ingest_service import enqueue_ingest, is_ingestable
+from app.services.mongo_metadata_service import COLLECTION_MAP, bulk_upsert_entity_metadata
+from app.utils.validators import validate_extension, validate_size
+
+
+def type_from_archive_path(path: str) -> Optional[str]:
+    """
+    'subjects/topics/lessons/bai1.pdf' -> 'lesson' (thư mục chứa file khớp TYPE_PREFIX).
+    Cho phép có thư mục gốc bọc ngoài: 'export/subjects/topics/x.pdf' -> 'topic'.
+    """
+    if "/" not in path:
+        return None
+    folder = "/" + path.rsplit("/", 1)[0] + "/"
+    best = None
+    for t, prefix in TYPE_PREFIX.items():
+        if folder.endswith("/" + prefix) and (best is None or len(prefix) > len(TYPE_PREFIX[best])):
+            best = t
+    return best
+
+
+def entries_from_archive(fileobj, *, allowed_types: Iterable[str]) -> List[Dict[str, Any]]:
+    """Mỗi file trong zip -> 1 entry; đọc stream từ zip lúc upload (không giải nén ra đĩa)."""
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="File zip không hợp lệ")
+
+    allowed = set(allowed_types)
+    entries: List[Dict[str, Any]] = []
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        path = info.filename
+        t = type_from_archive_path(path)
+        entry = {
+            "name": path,
+            "filename": path.rsplit("/", 1)[-1],
+            "type_name": t,
+            "size_bytes": info.file_size,
+            "content_type": mimetypes.guess_type(path)[0] or "",
+            "open": (lambda i=info: zf.open(i)),
+        }
+        if t is None or t not in allowed:
+            entry["error"] = "Đường dẫn trong zip không khớp thư mục nào của TYPE_PREFIX"
+        entries.append(entry)
+    return entries
+
+
+async def _upload_entry(class_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    opener: Callable[[], Any] = entry["open"]
+    f = opener()
+    try:
+        return await upload_deduplicated(
+            class_id=class_id,
+            type_name=entry["type_name"],
+            filename=entry["filename"],
+            fileobj=f,
+            content_type=entry["content_type"],
+            size_bytes=entry["size_bytes"],
+        )
+    finally:
+        f.close()
+
+
+async def _upload_or_error(class_id: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if entry.get("error"):
+        return None
+    try:
+        validate_extension(entry["filename"])
+        if entry["size_bytes"] <= 0:
+            raise HTTPException(status_code=400, detail="File rỗng hoặc không hợp lệ")
+        validate_size(entry["size_bytes"])
+        return await _upload_entry(class_id, entry)
+    except HTTPException as e:
+        entry["error"] = e.detail
+    except Exception as e:
+        entry["error"] = str(e)
+    return None
+
+
+async def _enqueue_ingests(
+    class_id: str, items: List[Tuple[Dict[str, Any], Dict[str, Any]]], created_by: str
+) -> None:
+    """Đọc _id lesson vừa upsert theo source_object (1 find $in) rồi enqueue ingest_lesson cho từng lesson."""
+    sources = [minio_res["source_object"] for _, minio_res in items]
+    docs = {
+        d["source_object"]: d
+        async for d in get_mongo_db()[COLLECTION_MAP["lesson"]].find(
+            {"class_id": class_id, "type_name": "lesson", "source_object": {"$in": sources}},
+            {"_id": 1, "lesson_name": 1, "source_object": 1},
+        )
+    }
+    for item, minio_res in items:
+        doc = docs.get(minio_res["source_object"])
+        if doc is not None:
+            item["ingest"] = await enqueue_ingest(
+                class_id=class_id, type_name="lesson", minio_info=minio_res, doc=doc, created_by=created_by
+            )
+
+
+async def bulk_upload(
+    *,
+    class_id: str,
+    entries: List[Dict[str, Any]],
+    metadata_by_name: Dict[str, Any],
+    created_by: str,
+) -> Dict[str, Any]:
+    """
+    Upload nhiều file song song qua upload_pool (số luồng = MINIO_UPLOAD_WORKERS, có khử trùng lặp),
+    sau đó ghi metadata bằng 1 bulk_write mỗi collection. Lỗi từng file không làm hỏng cả lô.
+    Lesson pdf/docx/txt -> enqueue ingest_lesson như upload lẻ (item.ingest = job_id).
+    """
+    if not entries:
+        raise HTTPException(status_code=400, detail="Không có file nào để upload")
+    if len(entries) > BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Tối đa {BULK_UPLOAD_MAX_FILES} file mỗi lần")
+
+    t0 = time.perf_counter()
+    minio_results = await asyncio.gather(*(_upload_or_error(class_id, e) for e in entries))
+
+    results: List[Dict[str, Any]] = []
+    to_upsert: List[Dict[str, Any]] = []
+    # lesson pdf/docx/txt -> enqueue ingest sau khi có _id (bulk_write không trả _id doc đã có)
+    to_ingest: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    bytes_uploaded = 0
+    bytes_deduplicated = 0
+
+    for entry, minio_res in zip(entries, minio_results):
+        item = {"name": entry["name"], "type_name": entry.get("type_name")}
+        if minio_res is None:
+            item.update({"status": "error", "detail": entry.get("error")})
+        else:
+            if minio_res.get("deduplicated"):
+                bytes_deduplicated += int(minio_res.get("size_bytes") or 0)
+            else:
+                bytes_uploaded += int(minio_res.get("size_bytes") or 0)
+            item.update(
+                {
+                    "status": "ok",
+                    "object_name": minio_res["object_name"],
+                    "public_url": minio_res["public_url"],
+                    "size_bytes": minio_res["size_bytes"],
+                    "deduplicated": bool(minio_res.get("deduplicated")),
+                }
+            )
+            meta = metadata_by_name.get(entry["name"]) or metadata_by_name.get(entry["filename"]) or {}
+            to_upsert.append(
+                {
+                    "type_name": entry["type_name"],
+                    "metadata": dict(meta) if isinstance(meta, dict) else {},
+                    "minio_info": minio_res,
+                }
+            )
+            if is_ingestable(entry["type_name"], minio_res["object_name"]):
+                to_ingest.append((item, minio_res))
+        results.append(item)
+
+    upload_seconds = time.perf_counter() - t0
+
+    mongo_res = {}
+    if to_upsert:
+        mongo_res = await bulk_upsert_entity_metadata(class_id=class_id, entries=to_upsert, created_by=created_by)
+    if to_ingest:
+        await _enqueue_ingests(class_id, to_ingest, created_by)
+
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for r in results if r["status"] == "ok")
+
+    return {
+        "count": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "items": results,
+        "mongo": mongo_res,
+        "stats": {
+            "bytes_uploaded": bytes_uploaded,
+            "bytes_deduplicated": bytes_deduplicated,
+            "upload_seconds": round(upload_seconds, 3),
+            "total_seconds": round(elapsed, 3),
+            "throughput_mb_s": round(bytes_uploaded / 1024 / 1024 / upload_seconds, 2) if upload_seconds > 0 else None,
+            "files_per_s": round(ok / elapsed, 2) if elapsed > 0 else None,
+        },
+    }
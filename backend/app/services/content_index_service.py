@@ -0,0 +1,224 @@
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from minio.error import S3Error
+
+from app.db.minio_client import minio_client, build_public_url
+from app.db.mongo_client import get_mongo_db
+from app.services.minio_paths import (
+    bucket_from_class_id,
+    content_object_name,
+    is_content_object,
+    is_intent_object,
+    make_object_name,
+    staging_object_name,
+    TYPE_PREFIX,
+    TypeName,
+)
+from app.services.minio_service import copy_object, upload_one, upload_pool, sha256_fileobj
+from app.services.mongo_metadata_service import COLLECTION_MAP
+from app.services.response_cache import response_cache
+from app.utils.metrics import BYTES
+
+CONTENT_INDEX_COLLECTION = "content_index"
+
+
+async def find_content(bucket: str, sha256: str) -> Optional[Dict[str, Any]]:
+    return await get_mongo_db()[CONTENT_INDEX_COLLECTION].find_one({"sha256": sha256, "bucket": bucket})
+
+
+async def register_content(minio_info: Dict[str, Any]) -> None:
+    """Ghi sha256 -> object vào content_index. Chỉ nhận object theo hash (bất biến, xem content_object_name)."""
+    bucket, object_name, sha256 = minio_info["bucket"], minio_info["object_name"], minio_info["sha256"]
+    if not is_content_object(object_name):
+        raise ValueError(f"content_index chỉ trỏ tới object theo hash: {object_name}")
+
+    await get_mongo_db()[CONTENT_INDEX_COLLECTION].update_one(
+        {"sha256": sha256, "bucket": bucket},
+        {
+            "$set": {
+                "object_name": object_name,
+                "size_bytes": minio_info.get("size_bytes"),
+                "etag": minio_info.get("etag"),
+                "content_type": minio_info.get("content_type"),
+                "last_modified": minio_info.get("last_modified"),
+            },
+            "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
+        },
+        upsert=True,
+    )
+
+
+def _sha256_object(bucket: str, object_name: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 của object đã nằm trên MinIO (đọc stream, không giữ cả file trong RAM)."""
+    h = hashlib.sha256()
+    resp = minio_client.get_object(bucket, object_name)
+    try:
+        for data in resp.stream(chunk_size):
+            h.update(data)
+    finally:
+        resp.close()
+        resp.release_conn()
+    return h.hexdigest()
+
+
+async def hash_stored_object(*, type_name: str, doc_id: str, bucket: str, object_name: str) -> Dict[str, Any]:
+    """
+    Job hash_object: object upload thẳng lên MinIO (presigned) không đi qua API nên chưa có sha256
+    -> băm lại từ MinIO, chuyển doc sang object theo hash (dùng lại object đã có cùng nội dung,
+    chưa có thì copy phía server) -> các upload sau trùng nội dung sẽ dùng chung; object riêng của
+    intent không còn ai dùng thì xoá.
+    """
+    coll = get_mongo_db()[COLLECTION_MAP[type_name]]
+    doc = await coll.find_one({"_id": ObjectId(doc_id)}, {"object": 1, "class_id": 1, "source_object": 1})
+    descriptor = (doc or {}).get("object") or {}
+    if descriptor.get("bucket") != bucket or descriptor.get("object_name") != object_name:
+        # doc đã bị xoá / trỏ sang object khác từ lúc enqueue
+        await _drop_intent_object(bucket, object_name)
+        return {"status": "skipped"}
+
+    sha256 = await upload_pool.run(_sha256_object, bucket, object_name)
+    hit = await find_content(bucket, sha256)
+    deduplicated = bool(hit) and await _object_alive(hit)
+    if not deduplicated:
+        filename = (doc.get("source_object") or object_name).rsplit("/", 1)[-1]
+        content_object = content_object_name(type_name, sha256, filename)
+        res = await upload_pool.run(copy_object, bucket, object_name, content_object)
+        hit = {
+            **descriptor,
+            "object_name": content_object,
+            "etag": getattr(res, "etag", None) or descriptor.get("etag"),
+            "last_modified": getattr(res, "last_modified", None) or datetime.now(timezone.utc),
+            "sha256": sha256,
+        }
+        await register_content(hit)
+
+    new_descriptor = {
+        **descriptor,
+        "object_name": hit["object_name"],
+        "size_bytes": hit.get("size_bytes", descriptor.get("size_bytes")),
+        "etag": hit.get("etag"),
+        "last_modified": hit.get("last_modified"),
+        "sha256": sha256,
+    }
+    res = await coll.update_one(
+        {"_id": doc["_id"], "object.object_name": object_name},
+        {"$set": {"object": new_descriptor, f"{type_name}_url": build_public_url(bucket, hit["object_name"])}},
+    )
+    if res.modified_count:
+        await response_cache.invalidate(doc.get("class_id"), type_name)
+    await _drop_intent_object(bucket, object_name)
+    return {"status": "done", "sha256": sha256, "object_name": hit["object_name"], "deduplicated": deduplicated}
+
+
+async def _drop_intent_object(bucket: str, object_name: str) -> None:
+    # object của 1 upload intent chỉ doc của intent đó dùng -> doc đã sang object theo hash thì xoá
+    if is_intent_object(object_name):
+        await upload_pool.run(minio_client.remove_object, bucket, object_name)
+
+
+async def _object_alive(hit: Dict[str, Any]) -> bool:
+    # entry cũ trỏ tới object theo tên file: upload sau cùng tên ghi đè được -> không dùng chung nữa
+    if not is_content_object(hit["object_name"]):
+        await get_mongo_db()[CONTENT_INDEX_COLLECTION].delete_one({"_id": hit["_id"]})
+        return False
+    try:
+        await upload_pool.run(minio_client.stat_object, hit["bucket"], hit["object_name"])
+        return True
+    except S3Error:
+        await get_mongo_db()[CONTENT_INDEX_COLLECTION].delete_one({"_id": hit["_id"]})
+        return False
+
+
+def _info_from_hit(
+    hit: Dict[str, Any],
+    *,
+    type_name: str,
+    filename: str,
+    source_object: str,
+) -> Dict[str, Any]:
+    """minio_info trỏ tới object đã có sẵn (cùng nội dung) thay vì object mới."""
+    return {
+        "bucket": hit["bucket"],
+        "type_name": type_name,
+        "prefix": TYPE_PREFIX[type_name],
+        "object_name": hit["object_name"],
+        "source_object": source_object,
+        "original_filename": filename,
+        "content_type": hit.get("content_type") or "application/octet-stream",
+        "size_bytes": hit.get("size_bytes"),
+        "etag": hit.get("etag"),
+        "last_modified": hit.get("last_modified"),
+        "sha256": hit["sha256"],
+        "public_url": build_public_url(hit["bucket"], hit["object_name"]),
+        "deduplicated": True,
+        "status": "ok",
+    }
+
+
+async def upload_deduplicated(
+    *,
+    class_id: str,
+    type_name: TypeName,
+    filename: str,
+    fileobj,
+    content_type: str,
+    size_bytes: int,
+) -> Dict[str, Any]:
+    """
+    Upload có khử trùng lặp theo SHA-256 trong cùng bucket (lớp). Byte luôn nằm ở object theo hash
+    (content_object_name), không ở TYPE_PREFIX/filename -> upload lại cùng tên không đổi nội dung
+    của document khác đang dùng chung.
+    - file seekable (UploadFile, entry zip): băm trước (đọc local) -> đã có -> bỏ qua put_object,
+      chưa có -> put thẳng vào key theo hash
+    - còn lại: băm trong lúc gửi vào key tạm của request -> trùng thì bỏ, không thì copy sang key theo hash
+    Mọi thao tác MinIO chạy trên upload_pool.
+    """
+    bucket = bucket_from_class_id(class_id)
+    source_object = make_object_name(type_name, filename)
+    upload = dict(
+        class_id=class_id,
+        type_name=type_name,
+        filename=filename,
+        fileobj=fileobj,
+        content_type=content_type,
+        size_bytes=size_bytes,
+    )
+
+    if getattr(fileobj, "seekable", lambda: False)():
+        sha256 = await upload_pool.run(sha256_fileobj, fileobj)
+        hit = await find_content(bucket, sha256)
+        if hit and await _object_alive(hit):
+            BYTES.inc(size_bytes or 0, direction="dedup")
+            return _info_from_hit(hit, type_name=type_name, filename=filename, source_object=source_object)
+        minio_res = await upload_pool.run(
+            upload_one, **upload, object_name=content_object_name(type_name, sha256, filename)
+        )
+    else:
+        staging = staging_object_name(uuid.uuid4().hex)
+        minio_res = await upload_pool.run(upload_one, **upload, object_name=staging)
+        try:
+            hit = await find_content(bucket, minio_res["sha256"])
+            if hit and await _object_alive(hit):
+                return _info_from_hit(hit, type_name=type_name, filename=filename, source_object=source_object)
+            content_object = content_object_name(type_name, minio_res["sha256"], filename)
+            res = await upload_pool.run(copy_object, bucket, staging, content_object)
+            minio_res.update(
+                {
+                    "object_name": content_object,
+                    "etag": getattr(res, "etag", None) or minio_res["etag"],
+                    "last_modified": getattr(res, "last_modified", None) or minio_res["last_modified"],
+                    "public_url": build_public_url(bucket, content_object),
+                }
+            )
+        finally:
+            # key tạm chỉ request này biết -> xoá được
+            await upload_pool.run(minio_client.remove_object, bucket, staging)
+
+    minio_res["source_object"] = source_object
+    await register_content(minio_res)
+    minio_res["deduplicated"] = False
+    return minio_res
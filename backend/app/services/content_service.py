@@ -0,0 +1,266 @@
+import asyncio
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from minio.error import S3Error
+
+from app.core.config import CONTENT_CACHE_BYTES, CONTENT_CACHE_MAX_OBJECT_BYTES, CONTENT_STREAM_CHUNK_BYTES
+from app.db.minio_client import minio_client
+from app.services.document_view_service import doc_url, parse_minio_public_url
+from app.utils.metrics import BYTES, CallbackMetric, register_cache, stage_timer
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ObjectCache:
+    """
+    LRU (theo tổng byte) cho object nhỏ hay được xem lại (PDF bài học), khoá (bucket, object, etag)
+    -> object bị ghi đè có etag mới, entry cũ tự trôi ra. Nhiều người xem cùng lúc 1 object chưa
+    có trong cache chỉ kéo từ MinIO 1 lần (các request sau chờ chung 1 future).
+    """
+
+    def __init__(self, max_bytes: int, max_object_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self._data: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def accepts(self, size: Optional[int]) -> bool:
+        return self.max_bytes > 0 and size is not None and 0 < size <= self.max_object_bytes
+
+    async def get(self, key: Tuple[str, str, str], loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = self._data.get(key)
+        if data is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return data
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.shared += 1
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            data = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # không ai chờ thì cũng không cảnh báo "exception never retrieved"
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        fut.set_result(data)
+        self._put(key, data)
+        return data
+
+    def _put(self, key: Tuple[str, str, str], data: bytes) -> None:
+        if key in self._data:
+            return
+        self._data[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes and self._data:
+            _, old = self._data.popitem(last=False)
+            self._size -= len(old)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "max_object_bytes": self.max_object_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+        }
+
+
+object_cache = ObjectCache(CONTENT_CACHE_BYTES, CONTENT_CACHE_MAX_OBJECT_BYTES)
+register_cache("object", object_cache.stats)
+CallbackMetric("kltn_object_cache_bytes", "Tổng byte object đang cache", lambda: [({}, object_cache.stats()["bytes"])])
+
+
+def _utc(dt: Any) -> Optional[datetime]:
+    if isinstance(dt, str):
+        try:
+            dt = datetime.fromisoformat(dt.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(dt, datetime):
+        return None
+    # Mongo trả datetime naive (UTC)
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+async def resolve_object(doc: Dict[str, Any], type_name: str) -> Dict[str, Any]:
+    """bucket/object/size/etag của file gắn với doc: lấy từ descriptor `object`; doc cũ -> stat MinIO theo url."""
+    obj = doc.get("object")
+    if isinstance(obj, dict) and obj.get("bucket") and obj.get("object_name") and obj.get("size_bytes") is not None and obj.get("etag"):
+        info = {
+            "bucket": obj["bucket"],
+            "object_name": obj["object_name"],
+            "size": int(obj["size_bytes"]),
+            "etag": str(obj["etag"]).strip('"'),
+            "last_modified": _utc(obj.get("last_modified")),
+            "content_type": obj.get("content_type"),
+        }
+    else:
+        bucket, object_name = parse_minio_public_url(doc_url(doc, type_name) or "")
+        if not bucket or not object_name:
+            raise HTTPException(status_code=404, detail="Tài liệu không có file")
+        try:
+            stat = await anyio.to_thread.run_sync(minio_client.stat_object, bucket, object_name)
+        except S3Error:
+            raise HTTPException(status_code=404, detail="File không còn trên MinIO")
+        info = {
+            "bucket": bucket,
+            "object_name": object_name,
+            "size": int(stat.size or 0),
+            "etag": str(stat.etag or "").strip('"'),
+            "last_modified": _utc(stat.last_modified),
+            "content_type": stat.content_type,
+        }
+
+    info["content_type"] = info["content_type"] or "application/octet-stream"
+    # tên file upload (source_object) thay vì object đã khử trùng lặp
+    info["filename"] = (doc.get("source_object") or info["object_name"]).rsplit("/", 1)[-1]
+    return info
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    'bytes=a-b' | 'bytes=a-' | 'bytes=-n' -> (start, end) (end tính cả). Header sai cú pháp hoặc
+    nhiều range -> None (trả cả file, RFC 9110 cho phép bỏ qua Range). Ngoài kích thước -> 416.
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+        if m.group(2) and end < start:
+            return None
+    else:
+        start, end = max(0, size - int(m.group(2))), size - 1
+
+    if start >= size or end < 0:
+        raise HTTPException(
+            status_code=416, detail="Range không hợp lệ", headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/").strip('"') == etag for t in tags)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm:
+        return etag_matches(inm, etag)
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _read_object(bucket: str, object_name: str) -> bytes:
+    with stage_timer("minio_get"):
+        resp = minio_client.get_object(bucket, object_name)
+        try:
+            return resp.read()
+        finally:
+            resp.close()
+            resp.release_conn()
+
+
+def _open_object(bucket: str, object_name: str, offset: int, length: int):
+    return minio_client.get_object(bucket, object_name, offset=offset, length=length)
+
+
+def _iter_response(resp, chunk_size: int):
+    """Iterator sync -> Starlette tự chạy trên threadpool; client ngắt giữa chừng thì finally vẫn trả connection."""
+    try:
+        for data in resp.stream(chunk_size):
+            BYTES.inc(len(data), direction="served")
+            yield data
+    finally:
+        resp.close()
+        resp.release_conn()
+
+
+async def serve_object(request: Request, info: Dict[str, Any], *, download: bool = False) -> Response:
+    """Trả file: 304 nếu client đã có bản mới nhất, 206 cho Range, object nhỏ lấy từ cache, còn lại stream."""
+    size, etag = info["size"], info["etag"]
+    disposition = "attachment" if download else "inline"
+    headers = {
+        "ETag": f'"{etag}"',
+        "Accept-Ranges": "bytes",
+        # luôn hỏi lại (URL theo doc_id, file có thể bị thay) nhưng hỏi lại chỉ tốn 1 lần 304
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"{disposition}; filename*=UTF-8''{quote(info['filename'])}",
+    }
+    if info["last_modified"]:
+        headers["Last-Modified"] = format_datetime(info["last_modified"], usegmt=True)
+
+    if is_not_modified(request, etag, info["last_modified"]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range and not etag_matches(if_range, etag) and if_range != headers.get("Last-Modified"):
+        byte_range = None  # client giữ bản cũ -> gửi cả file mới
+
+    start, end = byte_range or (0, size - 1)
+    status_code = 206 if byte_range else 200
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    bucket, object_name = info["bucket"], info["object_name"]
+    try:
+        if object_cache.accepts(size):
+            data = await object_cache.get(
+                (bucket, object_name, etag),
+                lambda: anyio.to_thread.run_sync(_read_object, bucket, object_name),
+            )
+            BYTES.inc(end + 1 - start, direction="served")
+            return Response(data[start : end + 1], status_code=status_code, headers=headers, media_type=info["content_type"])
+
+        if size == 0:
+            return Response(b"", status_code=200, headers=headers, media_type=info["content_type"])
+
+        # mở response MinIO trước khi gửi header -> object mất thì còn trả được 404
+        resp = await anyio.to_thread.run_sync(_open_object, bucket, object_name, start, end - start + 1)
+    except S3Error:
+        raise HTTPException(status_code=404, detail="File không còn trên MinIO")
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_response(resp, CONTENT_STREAM_CHUNK_BYTES),
+        status_code=status_code,
+        headers=headers,
+        media_type=info["content_type"],
+    )
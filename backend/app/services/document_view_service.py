@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse, unquote
 
 import anyio
 from minio.error import S3Error
 
+from app.core.config import MINIO_STAT_CONCURRENCY, MINIO_STAT_SWEEP_MIN
 from app.db.minio_client import minio_client
+from app.utils.metrics import stage_timer, timed
+
+StatResult = Tuple[Optional[int], Optional[datetime]]
 
 
 def file_ext_from_url(url: str) -> str:
@@ -36,14 +40,16 @@ def parse_minio_public_url(url: str) -> Tuple[Optional[str], Optional[str]]:
     return bucket, obj
 
 
-async def stat_from_public_url(url: str) -> Tuple[Optional[int], Optional[datetime]]:
+@timed("stat_from_public_url")
+async def stat_from_public_url(url: str) -> StatResult:
     """Lấy size + last_modified từ MinIO (stat_object) dựa trên public_url."""
     bucket, obj = parse_minio_public_url(url)
     if not bucket or not obj:
         return None, None
 
     try:
-        stat = await anyio.to_thread.run_sync(minio_client.stat_object, bucket, obj)
+        with stage_timer("minio_stat"):
+            stat = await anyio.to_thread.run_sync(minio_client.stat_object, bucket, obj)
         size = getattr(stat, "size", None)
         last_modified = getattr(stat, "last_modified", None)
         return size, last_modified
@@ -53,6 +59,73 @@ async def stat_from_public_url(url: str) -> Tuple[Optional[int], Optional[dateti
         return None, None
 
 
+def _sweep_prefix(bucket: str, prefix: str, wanted: set) -> Dict[str, StatResult]:
+    """1 lần list_objects (không đệ quy) cho cả prefix, chỉ giữ object cần."""
+    found: Dict[str, StatResult] = {}
+    for obj in minio_client.list_objects(bucket, prefix=prefix, recursive=False):
+        if getattr(obj, "is_dir", False):
+            continue
+        name = obj.object_name
+        if name in wanted:
+            found[name] = (getattr(obj, "size", None), getattr(obj, "last_modified", None))
+            if len(found) >= len(wanted):
+                break
+    return found
+
+
+async def stat_many_from_public_urls(urls: Iterable[str]) -> Dict[str, StatResult]:
+    """
+    Lấy size + last_modified cho nhiều URL cùng lúc:
+    - gom theo (bucket, prefix thư mục)
+    - nhóm đông -> 1 lần list_objects cho cả prefix
+    - nhóm ít -> stat_object song song (giới hạn MINIO_STAT_CONCURRENCY)
+    URL không parse được / không tìm thấy -> (None, None).
+    """
+    result: Dict[str, StatResult] = {}
+    groups: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+
+    for url in urls:
+        if not url or url in result:
+            continue
+        result[url] = (None, None)
+        bucket, obj = parse_minio_public_url(url)
+        if not bucket or not obj:
+            continue
+        prefix = obj.rsplit("/", 1)[0] + "/" if "/" in obj else ""
+        groups.setdefault((bucket, prefix), {}).setdefault(obj, []).append(url)
+
+    limiter = anyio.CapacityLimiter(max(1, MINIO_STAT_CONCURRENCY))
+
+    async def _sweep(bucket: str, prefix: str, objs: Dict[str, List[str]]) -> None:
+        try:
+            with stage_timer("minio_list"):
+                found = await anyio.to_thread.run_sync(_sweep_prefix, bucket, prefix, set(objs), limiter=limiter)
+        except Exception:
+            return
+        for obj, stat in found.items():
+            for url in objs[obj]:
+                result[url] = stat
+
+    async def _stat_one(bucket: str, obj: str, obj_urls: List[str]) -> None:
+        try:
+            with stage_timer("minio_stat"):
+                stat = await anyio.to_thread.run_sync(minio_client.stat_object, bucket, obj, limiter=limiter)
+        except Exception:
+            return
+        for url in obj_urls:
+            result[url] = (getattr(stat, "size", None), getattr(stat, "last_modified", None))
+
+    async with anyio.create_task_group() as tg:
+        for (bucket, prefix), objs in groups.items():
+            if len(objs) >= MINIO_STAT_SWEEP_MIN:
+                tg.start_soon(_sweep, bucket, prefix, objs)
+            else:
+                for obj, obj_urls in objs.items():
+                    tg.start_soon(_stat_one, bucket, obj, obj_urls)
+
+    return result
+
+
 def _dt_to_iso(dt: Any) -> Optional[str]:
     if dt is None:
         return None
@@ -85,12 +158,35 @@ def _sanitize(obj: Any) -> Any:
     return obj
 
 
-async def build_list_item(doc: Dict[str, Any], type_name: str) -> Optional[Dict[str, Any]]:
+def stored_stat(doc: Dict[str, Any]) -> Optional[StatResult]:
+    """size + last_modified đã lưu trong Mongo lúc upload (field `object`), None nếu chưa có."""
+    obj = doc.get("object")
+    if not isinstance(obj, dict) or obj.get("size_bytes") is None:
+        return None
+    last_modified = obj.get("last_modified")
+    if isinstance(last_modified, str):
+        try:
+            last_modified = datetime.fromisoformat(last_modified.replace("Z", "+00:00"))
+        except Exception:
+            last_modified = None
+    return obj.get("size_bytes"), last_modified
+
+
+def doc_url(doc: Dict[str, Any], type_name: str) -> Optional[str]:
+    type_name = (type_name or "").strip().lower()
+    return doc.get(f"{type_name}_url") or doc.get("url")
+
+
+async def build_list_item(
+    doc: Dict[str, Any],
+    type_name: str,
+    stat: Optional[StatResult] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Output cho FE list:
     - name: lấy từ mongo theo key <type>_name (vd subject_name)
     - file_type: theo đuôi url
-    - size_bytes: stat minio
+    - size_bytes: `stat` truyền vào > field `object` trong Mongo > stat minio
     - last_updated: ưu tiên doc.updated_at, fallback minio last_modified
     """
     type_name = (type_name or "").strip().lower()
@@ -99,9 +195,15 @@ async def build_list_item(doc: Dict[str, Any], type_name: str) -> Optional[Dict[
 
     url = doc.get(url_key) or doc.get("url")
     if not url:
-        return None
+        # keyword do job TF-IDF sinh ra không có file -> vẫn liệt kê (không url/size);
+        # type khác thiếu url = doc hỏng -> bỏ như trước
+        if type_name != "keyword":
+            return None
+        stat = (None, None)
 
-    size_bytes, last_modified = await stat_from_public_url(url)
+    if stat is None:
+        stat = stored_stat(doc) or await stat_from_public_url(url)
+    size_bytes, last_modified = stat
 
     updated_at_iso = _dt_to_iso(doc.get("updated_at")) or _dt_to_iso(last_modified)
     name = doc.get(name_key) or doc.get("name") or ""
@@ -110,19 +212,24 @@ async def build_list_item(doc: Dict[str, Any], type_name: str) -> Optional[Dict[
         "id": str(doc.get("_id")),
         "name": name,
         "url": url,
-        "file_type": file_ext_from_url(url),
+        "file_type": file_ext_from_url(url or ""),
         "size_bytes": size_bytes,
         "last_updated": updated_at_iso,
     }
 
 
-async def build_detail_item(doc: Dict[str, Any], type_name: str) -> Dict[str, Any]:
+async def build_detail_item(doc: Dict[str, Any], type_name: str, verify: bool = False) -> Dict[str, Any]:
+    """verify=True -> bỏ qua field `object` đã lưu, stat lại MinIO."""
     type_name = (type_name or "").strip().lower()
     name_key = f"{type_name}_name"
     url_key = f"{type_name}_url"
 
     url = doc.get(url_key) or doc.get("url")
-    size_bytes, last_modified = await stat_from_public_url(url) if url else (None, None)
+    stat = None if verify else stored_stat(doc)
+    if stat is None:
+        stat = await stat_from_public_url(url) if url else (None, None)
+    size_bytes, last_modified = stat
+    obj_info = doc.get("object") if isinstance(doc.get("object"), dict) else {}
 
     updated_at_iso = _dt_to_iso(doc.get("updated_at")) or _dt_to_iso(last_modified)
     created_at_iso = _dt_to_iso(doc.get("created_at"))
@@ -134,6 +241,7 @@ async def build_detail_item(doc: Dict[str, Any], type_name: str) -> Dict[str, An
         "url": url,
         "file_type": file_ext_from_url(url or ""),
         "size_bytes": size_bytes,
+        "etag": obj_info.get("etag"),
         "last_updated": updated_at_iso,
         "created_at": created_at_iso,
         "mongo": _sanitize(doc),
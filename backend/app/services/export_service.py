@@ -0,0 +1,100 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.config import EXPORT_BATCH_SIZE, EXPORT_GZIP_LEVEL
+from app.db.mongo_client import get_mongo_db
+from app.services.mongo_metadata_service import COLLECTION_MAP
+from app.services.search_service import SEARCH_FIELD
+from app.utils.metrics import BYTES
+
+
+def _json_default(v: Any) -> Any:
+    # json.dumps chỉ gọi hàm này cho giá trị không phải kiểu JSON -> không phải duyệt đệ quy cả doc như _sanitize
+    if isinstance(v, ObjectId):
+        return str(v)
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, bytes):
+        return v.hex()
+    return str(v)
+
+
+def parse_fields(fields: str) -> Optional[Dict[str, int]]:
+    """'a,b.c' -> projection {a:1, b.c:1} (luôn có _id, type_name); rỗng -> mọi field trừ search_tokens."""
+    names = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    if not names:
+        return None
+    for f in names:
+        if f.startswith("$") or ".." in f or f.endswith("."):
+            raise HTTPException(status_code=400, detail=f"field không hợp lệ: {f}")
+    # 'object' + 'object.size_bytes' -> Mongo báo path collision giữa chừng stream; giữ field cha
+    names = [f for f in names if not any(f.startswith(p + ".") for p in names if p != f)]
+    return {**{f: 1 for f in names}, "_id": 1, "type_name": 1}
+
+
+def export_types(type_name: str) -> List[str]:
+    t = (type_name or "").strip().lower()
+    if t == "all":
+        return list(COLLECTION_MAP.keys())
+    if t in COLLECTION_MAP:
+        return [t]
+    raise HTTPException(status_code=400, detail="type_name không hợp lệ")
+
+
+async def iter_export(
+    *,
+    class_id: str,
+    types: List[str],
+    projection: Optional[Dict[str, int]],
+    include_deleted: bool = False,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Gọi export_types/parse_fields trước (lỗi 400 phải trả trước khi bắt đầu stream).
+    NDJSON (1 doc/dòng) đọc thẳng từ cursor Mongo theo batch: bộ nhớ chỉ giữ 1 batch, không stat MinIO.
+    compress=True -> gzip nén dần theo từng batch.
+    """
+    db = get_mongo_db()
+    gz = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+    def out(data: bytes) -> bytes:
+        data = gz.compress(data) if gz is not None else data
+        BYTES.inc(len(data), direction="export")
+        return data
+
+    for t in types:
+        flt: Dict[str, Any] = {"type_name": t}
+        if class_id.strip().lower() != "all":
+            flt["class_id"] = str(class_id).strip()
+        if not include_deleted:
+            flt["status"] = {"$ne": "deleted"}
+
+        # sort _id: dùng index mặc định, export chạy lại cho cùng thứ tự
+        cursor = db[COLLECTION_MAP[t]].find(
+            flt, projection if projection is not None else {SEARCH_FIELD: 0}, batch_size=EXPORT_BATCH_SIZE
+        ).sort("_id", 1)
+
+        lines: List[str] = []
+        async for doc in cursor:
+            doc.setdefault("type_name", t)
+            lines.append(encoder.encode(doc))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                data = out(("\n".join(lines) + "\n").encode("utf-8"))
+                lines = []
+                if data:
+                    yield data
+        if lines:
+            data = out(("\n".join(lines) + "\n").encode("utf-8"))
+            if data:
+                yield data
+
+    if gz is not None:
+        tail = gz.flush()
+        BYTES.inc(len(tail), direction="export")
+        yield tail
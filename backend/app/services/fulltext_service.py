@@ -0,0 +1,529 @@
+import asyncio
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.core.config import (
+    BM25_B,
+    BM25_K1,
+    FULLTEXT_ENABLED,
+    FULLTEXT_SYNC_LAG_SECONDS,
+    FULLTEXT_SYNC_SECONDS,
+)
+from app.services.search_service import tokenize
+from app.utils.metrics import CallbackMetric
+
+# cắt tf về uint16 (postings tf lưu array('H'))
+_MAX_TF = 65535
+
+# term có df > 1/_DENSE_RATIO số doc: giữ thêm vector tf đặc (uint16 theo docno) -> chấm điểm
+# liền mạch trên cả mảng thay vì gather/scatter theo posting; tối đa _DENSE_CACHE_TERMS term (LRU)
+_DENSE_RATIO = 8
+_DENSE_CACHE_TERMS = 64
+
+_CHUNK_PROJECTION = {"content": 1, "class_id": 1, "status": 1, "ancestors": 1, "parent_id": 1, "updated_at": 1}
+
+
+class InvertedIndex:
+    """
+    Inverted index trong RAM cho content của chunks, chấm điểm BM25.
+
+    - postings mỗi term = 2 mảng liền (array('I') docno, array('H') tf) -> numpy đọc thẳng
+      buffer (np.frombuffer, không copy), cộng điểm vector hoá theo cả posting list.
+    - docno tăng dần; cập nhật doc = đánh dấu docno cũ chết (tombstone) + thêm docno mới.
+      Doc chết nhiều hơn doc sống -> compact() dựng lại postings.
+    - df lấy theo độ dài posting (gồm cả doc chết chưa compact) -> idf xấp xỉ, chấp nhận được.
+
+    Chỉ dùng trên event loop (không thread-safe); các hàm đều đồng bộ, ngắn.
+    """
+
+    def __init__(self) -> None:
+        self._terms: Dict[str, int] = {}
+        self._post_docs: List[array] = []
+        self._post_tfs: List[array] = []
+
+        self._doc_ids: List[Optional[ObjectId]] = []
+        self._doc_len = array("I")
+        self._alive = array("B")
+        self._doc_class = array("H")  # mã lớp (uint16): "B" tràn ở lớp thứ 256
+        self._doc_ancestors: List[tuple] = []
+
+        self._classes: Dict[str, int] = {}
+        self._docno_by_id: Dict[ObjectId, int] = {}
+        # updated_at của bản đang index -> sync giữa process bỏ qua chunk đã đúng phiên bản
+        self._version: Dict[ObjectId, Any] = {}
+        self._total_len = 0
+        # BM25: k1 * (1 - b + b * dl / avgdl) theo docno, tính lại khi index đổi
+        self._norm: Optional[np.ndarray] = None
+        # tid -> (số posting đã chép, vector tf đặc)
+        self._dense: "OrderedDict[int, Tuple[int, np.ndarray]]" = OrderedDict()
+
+        self.loaded = False
+        self.loading = False
+
+    # ---------- ghi ----------
+
+    def _class_code(self, class_id: str) -> int:
+        if class_id not in self._classes:
+            self._classes[class_id] = len(self._classes) + 1  # 0 = không có lớp
+        return self._classes[class_id]
+
+    def add_many(self, items: Iterable[Tuple[ObjectId, str, str, tuple]]) -> None:
+        """
+        Thêm/cập nhật nhiều chunk (chunk_id, class_id, content, ancestors).
+        Gom postings của cả lô, sort theo term rồi nối vào mỗi posting list 1 lần.
+        """
+        terms = self._terms
+        tid_parts: List[np.ndarray] = []
+        tf_parts: List[np.ndarray] = []
+        doc_parts: List[np.ndarray] = []
+
+        for chunk_id, class_id, content, ancestors in items:
+            self._drop(chunk_id)
+            tokens = tokenize(content)
+            if not tokens:
+                continue
+            ids = np.fromiter((terms.setdefault(t, len(terms)) for t in tokens), dtype=np.uint32, count=len(tokens))
+            tids, tfs = np.unique(ids, return_counts=True)
+
+            docno = len(self._doc_ids)
+            tid_parts.append(tids)
+            tf_parts.append(np.minimum(tfs, _MAX_TF).astype(np.uint16))
+            doc_parts.append(np.full(tids.size, docno, dtype=np.uint32))
+
+            self._doc_ids.append(chunk_id)
+            self._doc_len.append(len(tokens))
+            self._alive.append(1)
+            self._doc_class.append(self._class_code(class_id or ""))
+            self._doc_ancestors.append(ancestors)
+            self._docno_by_id[chunk_id] = docno
+            self._total_len += len(tokens)
+
+        while len(self._post_docs) < len(terms):
+            self._post_docs.append(array("I"))
+            self._post_tfs.append(array("H"))
+
+        if tid_parts:
+            tids = np.concatenate(tid_parts)
+            order = np.argsort(tids, kind="stable")  # stable -> docno trong posting vẫn tăng dần
+            tids, tfs, docs = tids[order], np.concatenate(tf_parts)[order], np.concatenate(doc_parts)[order]
+            bounds = np.flatnonzero(np.diff(tids)) + 1
+            for a, b in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [tids.size]))):
+                tid = int(tids[a])
+                self._post_docs[tid].frombytes(docs[a:b].tobytes())
+                self._post_tfs[tid].frombytes(tfs[a:b].tobytes())
+
+        self._norm = None
+        self._maybe_compact()
+
+    def add(self, chunk_id: ObjectId, class_id: str, content: str, ancestors: tuple = ()) -> None:
+        self.add_many([(chunk_id, class_id, content, ancestors)])
+
+    def _drop(self, chunk_id: ObjectId) -> bool:
+        docno = self._docno_by_id.pop(chunk_id, None)
+        if docno is None:
+            return False
+        self._version.pop(chunk_id, None)
+        self._alive[docno] = 0
+        self._doc_ids[docno] = None
+        self._doc_ancestors[docno] = ()
+        self._total_len -= self._doc_len[docno]
+        self._norm = None
+        return True
+
+    def _maybe_compact(self) -> None:
+        dead = len(self._doc_ids) - len(self._docno_by_id)
+        if dead > max(1000, len(self._docno_by_id)):
+            self.compact()
+
+    def remove(self, chunk_id: ObjectId) -> None:
+        if self._drop(chunk_id):
+            self._maybe_compact()
+
+    @staticmethod
+    def _item(doc: Dict[str, Any]) -> Optional[Tuple[ObjectId, str, str, tuple]]:
+        content = doc.get("content")
+        if doc.get("status") == "deleted" or not isinstance(content, str) or not content.strip():
+            return None
+        return doc["_id"], doc.get("class_id") or "", content, tuple(doc.get("ancestors") or ())
+
+    def add_docs(self, docs: List[Dict[str, Any]]) -> None:
+        """doc chunk từ Mongo -> thêm/cập nhật; doc đã xoá hoặc không có content -> bỏ khỏi index."""
+        items = []
+        for doc in docs:
+            item = self._item(doc)
+            if item is None:
+                self.remove(doc["_id"])
+            else:
+                items.append(item)
+        if items:
+            self.add_many(items)
+            for doc in docs:
+                if doc["_id"] in self._docno_by_id:
+                    self._version[doc["_id"]] = doc.get("updated_at")
+
+    def needs_update(self, doc: Dict[str, Any]) -> bool:
+        """doc chunk đọc từ Mongo có khác bản đang index không (bản cũ hơn bản đã index -> không)."""
+        indexed = doc["_id"] in self._docno_by_id
+        if self._item(doc) is None:
+            return indexed
+        if not indexed:
+            return True
+        current, ts = self._version.get(doc["_id"]), doc.get("updated_at")
+        if isinstance(current, datetime) and isinstance(ts, datetime):
+            return ts > current
+        return current != ts
+
+    def add_doc(self, doc: Dict[str, Any]) -> None:
+        self.add_docs([doc])
+
+    def compact(self) -> None:
+        """Bỏ docno chết khỏi postings, đánh số lại docno liền nhau."""
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        new_no = (np.cumsum(alive) - 1).astype(np.uint32)
+
+        terms: Dict[str, int] = {}
+        post_docs: List[array] = []
+        post_tfs: List[array] = []
+        for term, tid in self._terms.items():
+            d = np.frombuffer(self._post_docs[tid], dtype=np.uint32)
+            keep = alive[d]
+            if not keep.any():
+                continue
+            docs, tfs = array("I"), array("H")
+            docs.frombytes(new_no[d[keep]].tobytes())
+            tfs.frombytes(np.frombuffer(self._post_tfs[tid], dtype=np.uint16)[keep].tobytes())
+            terms[term] = len(post_docs)
+            post_docs.append(docs)
+            post_tfs.append(tfs)
+
+        idx = np.flatnonzero(alive)
+        doc_len, doc_class = array("I"), array("H")
+        doc_len.frombytes(np.frombuffer(self._doc_len, dtype=np.uint32)[idx].tobytes())
+        doc_class.frombytes(np.frombuffer(self._doc_class, dtype=np.uint16)[idx].tobytes())
+
+        self._terms, self._post_docs, self._post_tfs = terms, post_docs, post_tfs
+        self._doc_ids = [self._doc_ids[i] for i in idx]
+        self._doc_ancestors = [self._doc_ancestors[i] for i in idx]
+        self._doc_len, self._doc_class = doc_len, doc_class
+        self._alive = array("B", b"\x01" * len(idx))
+        self._docno_by_id = {oid: i for i, oid in enumerate(self._doc_ids)}
+        self._norm = None
+        self._dense.clear()
+
+    def clear(self) -> None:
+        self.__init__()
+
+    # ---------- đọc ----------
+
+    def search(self, q: str, *, class_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        n_live = len(self._docno_by_id)
+        words = list(dict.fromkeys(tokenize(q)))
+        tids = [self._terms[w] for w in words if w in self._terms]
+        if not n_live or not tids:
+            return []
+
+        class_code = None
+        if class_id:
+            class_code = self._classes.get(class_id)
+            if class_code is None:
+                return []
+
+        n_docs = len(self._doc_ids)
+        if self._norm is None:
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+            avgdl = self._total_len / n_live
+            self._norm = (BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / avgdl)).astype(np.float32)
+        norms = self._norm
+        scores = np.zeros(n_docs, dtype=np.float32)
+
+        for tid in tids:
+            df = len(self._post_docs[tid])
+            idf = np.float32(np.log(1.0 + (n_live - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1.0))
+            if df * _DENSE_RATIO > n_docs:
+                tf = self._dense_tf(tid, n_docs).astype(np.float32)
+                scores += idf * tf / (tf + norms)
+            else:
+                d = np.frombuffer(self._post_docs[tid], dtype=np.uint32)
+                tf = np.frombuffer(self._post_tfs[tid], dtype=np.uint16).astype(np.float32)
+                # docno trong 1 posting list là duy nhất -> cộng vector trực tiếp được
+                scores[d] += idf * tf / (tf + norms[d])
+
+        hits = self._top(scores, limit, class_code)
+        return [
+            {"chunk_id": self._doc_ids[i], "score": round(float(scores[i]), 4), "ancestors": self._doc_ancestors[i]}
+            for i in hits
+        ]
+
+    def _top(self, scores: np.ndarray, limit: int, class_code: Optional[int]) -> np.ndarray:
+        """
+        Top `limit` docno (đã lọc doc chết/khác lớp), xếp giảm dần.
+        Query từ phổ biến có thể cho điểm > 0 ở gần hết corpus -> argpartition trên cả mảng chậm;
+        lấy ngưỡng từ mẫu thưa (~8k phần tử) sao cho còn vài trăm ứng viên, chỉ xếp hạng số đó.
+        Doc ngoài ứng viên có điểm < ngưỡng nên kết quả vẫn chính xác; thiếu ứng viên -> hạ ngưỡng.
+        """
+        alive = np.frombuffer(self._alive, dtype=np.uint8)
+        doc_class = np.frombuffer(self._doc_class, dtype=np.uint16)
+        target = limit * 4
+        while True:
+            thr = 0.0
+            if scores.size > target * 8:
+                sample = scores[:: max(1, scores.size // 8192)]
+                k = min(sample.size - 1, target * sample.size // scores.size + 1)
+                thr = float(np.partition(sample, sample.size - 1 - k)[sample.size - 1 - k])
+            hits = np.flatnonzero(scores >= thr) if thr > 0 else np.flatnonzero(scores)
+            keep = alive[hits] == 1
+            if class_code is not None:
+                keep &= doc_class[hits] == class_code
+            hits = hits[keep]
+            if hits.size >= limit or thr <= 0:
+                break
+            target *= 8
+
+        if hits.size > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        return hits[np.argsort(-scores[hits], kind="stable")]
+
+    def _dense_tf(self, tid: int, n_docs: int) -> np.ndarray:
+        """Vector tf đặc của 1 term; postings chỉ nối thêm (docno tăng) nên cache cập nhật phần đuôi."""
+        copied, dense = self._dense.pop(tid, (0, np.zeros(0, dtype=np.uint16)))
+        if dense.size < n_docs:
+            dense = np.concatenate((dense, np.zeros(max(n_docs - dense.size, n_docs // 8), dtype=np.uint16)))
+        posting_len = len(self._post_docs[tid])
+        if copied < posting_len:
+            d = np.frombuffer(self._post_docs[tid], dtype=np.uint32)[copied:]
+            dense[d] = np.frombuffer(self._post_tfs[tid], dtype=np.uint16)[copied:]
+        self._dense[tid] = (posting_len, dense)
+        while len(self._dense) > _DENSE_CACHE_TERMS:
+            self._dense.popitem(last=False)
+        return dense[:n_docs]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "loading": self.loading,
+            "chunks": len(self._docno_by_id),
+            "docnos": len(self._doc_ids),
+            "terms": len(self._terms),
+            "postings": sum(len(p) for p in self._post_docs),
+            "avgdl": round(self._total_len / len(self._docno_by_id), 1) if self._docno_by_id else 0,
+        }
+
+
+fulltext_index = InvertedIndex()
+CallbackMetric("kltn_fulltext_chunks", "Số chunk trong inverted index", lambda: [({}, len(fulltext_index._docno_by_id))])
+
+
+async def load_fulltext_index(batch_size: int = 1000) -> Dict[str, Any]:
+    """Nạp index từ chunks trong Mongo (chạy nền lúc startup; nhả event loop sau mỗi batch)."""
+    from app.db.mongo_client import get_mongo_db
+    from app.services.mongo_metadata_service import COLLECTION_MAP
+
+    if not FULLTEXT_ENABLED:
+        return fulltext_index.stats()
+
+    t0 = time.perf_counter()
+    started = datetime.now(timezone.utc)
+    fulltext_index.clear()
+    fulltext_index.loading = True
+    try:
+        cursor = get_mongo_db()[COLLECTION_MAP["chunk"]].find(
+            {"status": {"$ne": "deleted"}, "content": {"$type": "string"}},
+            _CHUNK_PROJECTION,
+            batch_size=batch_size,
+        )
+        batch: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                fulltext_index.add_docs(batch)
+                batch = []
+                await asyncio.sleep(0)
+        fulltext_index.add_docs(batch)
+        fulltext_index.loaded = True
+        # chunk ghi trong lúc nạp (có thể đã lọt khỏi cursor) -> sync đọc lại từ mốc bắt đầu nạp
+        fulltext_sync.reset(started)
+    finally:
+        fulltext_index.loading = False
+
+    return {**fulltext_index.stats(), "seconds": round(time.perf_counter() - t0, 3)}
+
+
+async def refresh_chunks(flt: Dict[str, Any]) -> int:
+    """Đọc lại các chunk khớp flt (sau upsert/xoá) và cập nhật index."""
+    from app.db.mongo_client import get_mongo_db
+    from app.services.mongo_metadata_service import COLLECTION_MAP
+
+    if not FULLTEXT_ENABLED:
+        return 0
+    docs = await get_mongo_db()[COLLECTION_MAP["chunk"]].find(flt, _CHUNK_PROJECTION).to_list(length=None)
+    fulltext_index.add_docs(docs)
+    return len(docs)
+
+
+async def search_chunks(q: str, *, class_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """Xếp hạng chunk theo BM25 rồi gắn ngữ cảnh lesson/topic (đọc Mongo theo $in cho cả trang)."""
+    from app.db.mongo_client import get_mongo_db
+    from app.services.mongo_metadata_service import COLLECTION_MAP
+
+    t0 = time.perf_counter()
+    hits = fulltext_index.search(q, class_id=class_id, limit=limit)
+    took_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    items: List[Dict[str, Any]] = []
+    if hits:
+        db = get_mongo_db()
+        chunk_ids = [h["chunk_id"] for h in hits]
+        parent_ids = list({a for h in hits for a in h["ancestors"]})
+        chunks, topics, lessons = await asyncio.gather(
+            db[COLLECTION_MAP["chunk"]].find(
+                {"_id": {"$in": chunk_ids}}, {"chunk_name": 1, "chunk_index": 1, "content": 1, "chunk_url": 1}
+            ).to_list(length=None),
+            db[COLLECTION_MAP["topic"]].find({"_id": {"$in": parent_ids}}, {"topic_name": 1}).to_list(length=None),
+            db[COLLECTION_MAP["lesson"]].find({"_id": {"$in": parent_ids}}, {"lesson_name": 1}).to_list(length=None),
+        )
+        chunk_by_id = {c["_id"]: c for c in chunks}
+        topic_by_id = {t["_id"]: t for t in topics}
+        lesson_by_id = {l["_id"]: l for l in lessons}
+
+        for h in hits:
+            c = chunk_by_id.get(h["chunk_id"])
+            if not c:
+                continue
+            topic = next((topic_by_id[a] for a in h["ancestors"] if a in topic_by_id), None)
+            lesson = next((lesson_by_id[a] for a in h["ancestors"] if a in lesson_by_id), None)
+            items.append(
+                {
+                    "chunk_id": str(c["_id"]),
+                    "chunk_name": c.get("chunk_name"),
+                    "chunk_index": c.get("chunk_index"),
+                    "url": c.get("chunk_url"),
+                    "score": h["score"],
+                    "snippet": (c.get("content") or "")[:300],
+                    "lesson": {"id": str(lesson["_id"]), "name": lesson.get("lesson_name")} if lesson else None,
+                    "topic": {"id": str(topic["_id"]), "name": topic.get("topic_name")} if topic else None,
+                }
+            )
+
+    return {"q": q, "count": len(items), "took_ms": took_ms, "loading": fulltext_index.loading, "items": items}
+
+
+class FulltextSync:
+    """
+    Index nằm trong RAM của từng process: chunk do process khác ghi (worker uvicorn khác, process
+    chạy job ingest) không đi qua refresh_chunks của process này. Poll chunks theo updated_at mỗi
+    FULLTEXT_SYNC_SECONDS (index type_updated), đọc lùi FULLTEXT_SYNC_LAG_SECONDS; chunk đã đúng
+    phiên bản trong index thì bỏ qua. Mọi chỗ ghi chunk (kể cả đánh dấu deleted) phải đặt updated_at.
+    """
+
+    def __init__(self) -> None:
+        self._since: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.synced = 0
+        self.last_sync_at: Optional[datetime] = None
+
+    def reset(self, since: datetime) -> None:
+        # Mongo trả datetime naive (UTC) -> giữ mốc cùng dạng để so sánh
+        self._since = since.astimezone(timezone.utc).replace(tzinfo=None) if since.tzinfo else since
+
+    async def sync(self, batch_size: int = 1000) -> int:
+        """Áp các chunk đổi từ lần trước vào index; trả về số chunk đã cập nhật."""
+        from app.db.mongo_client import get_mongo_db
+        from app.services.mongo_metadata_service import COLLECTION_MAP
+
+        # chưa nạp xong lần đầu / đang nạp lại -> load_fulltext_index đặt mốc khi xong
+        if not FULLTEXT_ENABLED or self._since is None or fulltext_index.loading:
+            return 0
+
+        since = self._since
+        cursor = get_mongo_db()[COLLECTION_MAP["chunk"]].find(
+            {"type_name": "chunk", "updated_at": {"$gte": since - timedelta(seconds=FULLTEXT_SYNC_LAG_SECONDS)}},
+            _CHUNK_PROJECTION,
+            batch_size=batch_size,
+        )
+        newest = since
+        changed = 0
+        batch: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            ts = doc.get("updated_at")
+            if isinstance(ts, datetime) and ts > newest:
+                newest = ts
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                changed += self._apply(batch)
+                batch = []
+                await asyncio.sleep(0)
+        changed += self._apply(batch)
+
+        # reload chạy xen giữa -> giữ mốc mới của reload
+        if self._since == since:
+            self._since = newest
+        self.synced += changed
+        self.last_sync_at = datetime.now(timezone.utc)
+        return changed
+
+    @staticmethod
+    def _apply(docs: List[Dict[str, Any]]) -> int:
+        # lọc ngay trước khi ghi (không await xen giữa): upsert cục bộ có thể đã index bản mới hơn
+        todo = [d for d in docs if fulltext_index.needs_update(d)]
+        if todo and not fulltext_index.loading:
+            fulltext_index.add_docs(todo)
+            return len(todo)
+        return 0
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(FULLTEXT_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("fulltext sync failed:", e)
+
+    def start(self) -> None:
+        if FULLTEXT_ENABLED and FULLTEXT_SYNC_SECONDS > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "since": self._since,
+            "synced": self.synced,
+            "last_sync_at": self.last_sync_at,
+        }
+
+
+fulltext_sync = FulltextSync()
+
+
+_load_task: Optional[asyncio.Task] = None
+
+
+def schedule_fulltext_load() -> None:
+    """Startup: nạp index nền, API lên ngay (search trả 'loading': true trong lúc nạp)."""
+    global _load_task
+
+    async def _run() -> None:
+        try:
+            print("fulltext index loaded:", await load_fulltext_index())
+        except Exception as e:
+            print("fulltext index load failed:", e)
+
+    if FULLTEXT_ENABLED and (_load_task is None or _load_task.done()):
+        _load_task = asyncio.create_task(_run())
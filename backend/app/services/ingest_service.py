@@ -0,0 +1,318 @@
+import asyncio
+import io
+import multiprocessing
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from xml.etree import ElementTree
+
+from bson import ObjectId
+
+from app.core.config import (
+    INGEST_ENABLED,
+    INGEST_WORKERS,
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_OVERLAP,
+)
+
+INGEST_EXTS = {"pdf", "docx", "txt"}
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+# ===== phần thuần (không đụng MinIO/Mongo) -> chạy được trong process pool, dùng cho benchmark =====
+
+def _read_txt(fileobj) -> str:
+    data = fileobj.read()
+    # utf-16 không BOM giải mã được gần như mọi chuỗi byte độ dài chẵn -> chỉ thử khi có BOM,
+    # không thì file tiếng Việt cũ (cp1258) thành ký tự CJK rác
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1258", errors="replace")
+
+
+def _read_docx(fileobj) -> str:
+    """Đọc word/document.xml bằng iterparse (không cần python-docx)."""
+    parts: List[str] = []
+    with zipfile.ZipFile(fileobj) as zf, zf.open("word/document.xml") as xml:
+        buf: List[str] = []
+        for event, el in ElementTree.iterparse(xml, events=("end",)):
+            if el.tag == f"{_W_NS}t" and el.text:
+                buf.append(el.text)
+            elif el.tag == f"{_W_NS}tab":
+                buf.append("\t")
+            elif el.tag == f"{_W_NS}p":
+                parts.append("".join(buf))
+                buf = []
+                el.clear()
+    return "\n".join(parts)
+
+
+def _read_pdf(fileobj) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("Cần cài pypdf để tách text PDF") from e
+    reader = PdfReader(fileobj)
+    return "\n".join((page.extract_text() or "") for page in reader.pages)
+
+
+def extract_text(fileobj, ext: str) -> str:
+    ext = (ext or "").lower().lstrip(".")
+    if ext == "txt":
+        return _read_txt(fileobj)
+    if ext == "docx":
+        return _read_docx(fileobj)
+    if ext == "pdf":
+        return _read_pdf(fileobj)
+    raise ValueError(f"Không hỗ trợ tách text cho .{ext}")
+
+
+def split_text(text: str, chunk_size: int = INGEST_CHUNK_SIZE, overlap: int = INGEST_CHUNK_OVERLAP) -> List[str]:
+    """
+    Gom đoạn văn (rồi câu) thành chunk <= chunk_size ký tự; chunk sau lặp lại
+    ~overlap ký tự cuối của chunk trước để không mất ngữ cảnh ở ranh giới.
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n|\r?\n", text or "") if p.strip()]
+
+    pieces: List[str] = []
+    for p in paragraphs:
+        if len(p) <= chunk_size:
+            pieces.append(p)
+            continue
+        for sent in _SENTENCE_END_RE.split(p):
+            while len(sent) > chunk_size:
+                pieces.append(sent[:chunk_size])
+                sent = sent[chunk_size:]
+            if sent:
+                pieces.append(sent)
+
+    chunks: List[str] = []
+    cur = ""
+    for piece in pieces:
+        if cur and len(cur) + 1 + len(piece) > chunk_size:
+            chunks.append(cur)
+            tail = cur[-overlap:] if overlap > 0 else ""
+            if tail and " " in tail:
+                tail = tail.split(" ", 1)[1]
+            cur = f"{tail} {piece}".strip() if tail and len(tail) + 1 + len(piece) <= chunk_size else piece
+        else:
+            cur = f"{cur}\n{piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+# ===== worker (chạy trong process con) =====
+
+def process_lesson_object(
+    bucket: str,
+    object_name: str,
+    lesson_id: str,
+    chunk_size: int,
+    overlap: int,
+) -> List[Dict[str, Any]]:
+    """
+    Stream object lesson từ MinIO ra file tạm, tách text, chia chunk và ghi từng chunk
+    (.txt) vào chunks/<lesson_id>/. Trả về minio_info + nội dung mỗi chunk để process chính ghi Mongo.
+    """
+    from app.db.minio_client import minio_client, build_public_url
+    from app.services.minio_paths import chunk_object_name, TYPE_PREFIX
+
+    ext = object_name.rsplit(".", 1)[-1].lower() if "." in object_name else ""
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+        resp = minio_client.get_object(bucket, object_name)
+        try:
+            for data in resp.stream(1024 * 1024):
+                tmp.write(data)
+        finally:
+            resp.close()
+            resp.release_conn()
+        tmp.seek(0)
+        text = extract_text(tmp, ext)
+
+    out: List[Dict[str, Any]] = []
+    for i, chunk in enumerate(split_text(text, chunk_size, overlap), start=1):
+        # theo _id lesson, không theo tên file: object lesson giờ là key theo hash (nhiều lesson
+        # trùng nội dung dùng chung) và 2 lesson khác nhau có thể trùng tên file
+        chunk_object = chunk_object_name(lesson_id, i)
+        filename = f"{i:04d}.txt"
+        data = chunk.encode("utf-8")
+        res = minio_client.put_object(
+            bucket,
+            chunk_object,
+            io.BytesIO(data),
+            len(data),
+            content_type="text/plain; charset=utf-8",
+        )
+        out.append(
+            {
+                "index": i,
+                "content": chunk,
+                "minio_info": {
+                    "bucket": bucket,
+                    "type_name": "chunk",
+                    "prefix": TYPE_PREFIX["chunk"],
+                    "object_name": chunk_object,
+                    "original_filename": filename,
+                    "content_type": "text/plain; charset=utf-8",
+                    "size_bytes": len(data),
+                    "etag": getattr(res, "etag", None),
+                    "last_modified": datetime.now(timezone.utc),
+                    "public_url": build_public_url(bucket, chunk_object),
+                    "status": "ok",
+                },
+            }
+        )
+    return out
+
+
+# ===== process pool + điều phối (process chính) =====
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_ingest_pool() -> ProcessPoolExecutor:
+    """Tạo lazy; dùng spawn để process con không thừa hưởng event loop/connection của API."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, INGEST_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_ingest_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def is_ingestable(type_name: str, filename: str) -> bool:
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    return INGEST_ENABLED and type_name == "lesson" and ext in INGEST_EXTS
+
+
+async def enqueue_ingest(
+    *,
+    class_id: str,
+    type_name: str,
+    minio_info: Dict[str, Any],
+    doc: Dict[str, Any],
+    created_by: str,
+) -> Optional[Dict[str, str]]:
+    """Lesson pdf/docx/txt -> job tách chunks (chạy nền); trả job_id để FE theo dõi qua /admin/jobs."""
+    from app.services.job_service import enqueue_job
+
+    if not doc.get("_id") or not is_ingestable(type_name, minio_info.get("object_name") or ""):
+        return None
+    job_id = await enqueue_job(
+        "ingest_lesson",
+        {
+            "class_id": class_id,
+            "lesson_id": str(doc["_id"]),
+            "lesson_name": doc.get(f"{type_name}_name") or "",
+            "minio_info": minio_info,
+            "created_by": created_by,
+        },
+    )
+    return {"status": "queued", "job_id": job_id}
+
+
+async def ingest_lesson(
+    *,
+    class_id: str,
+    lesson_id: str,
+    lesson_name: str,
+    minio_info: Dict[str, Any],
+    created_by: str,
+) -> Dict[str, Any]:
+    """
+    Job ingest_lesson: tách lesson -> chunks (process pool), ghi metadata chunks 1 bulk_write,
+    đánh dấu chunk cũ thừa là deleted. Chạy lại nhiều lần vẫn cho cùng kết quả (upsert theo object).
+    """
+    from app.db.mongo_client import get_mongo_db
+    from app.services.fulltext_service import refresh_chunks
+    from app.services.mongo_metadata_service import COLLECTION_MAP, bulk_upsert_entity_metadata
+    from app.services.response_cache import response_cache
+
+    db = get_mongo_db()
+    lessons = db[COLLECTION_MAP["lesson"]]
+    lesson_oid = ObjectId(lesson_id)
+    await lessons.update_one({"_id": lesson_oid}, {"$set": {"ingest": {"status": "running"}}})
+    # detail lesson hiển thị trạng thái ingest -> bỏ bản đã cache mỗi lần đổi
+    await response_cache.invalidate(class_id, "lesson")
+
+    try:
+        # đọc object hiện tại của lesson (job hash_object có thể đã chuyển sang object theo hash
+        # từ lúc enqueue); object vừa bị xoá giữa chừng -> lỗi, job retry đọc lại
+        lesson = await lessons.find_one({"_id": lesson_oid}, {"object": 1})
+        obj = (lesson or {}).get("object") or minio_info
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(
+            get_ingest_pool(),
+            process_lesson_object,
+            obj["bucket"],
+            obj["object_name"],
+            lesson_id,
+            INGEST_CHUNK_SIZE,
+            INGEST_CHUNK_OVERLAP,
+        )
+
+        if chunks:
+            await bulk_upsert_entity_metadata(
+                class_id=class_id,
+                entries=[
+                    {
+                        "type_name": "chunk",
+                        "metadata": {
+                            "chunk_name": f"{lesson_name} - đoạn {c['index']}",
+                            "chunk_index": c["index"],
+                            "content": c["content"],
+                            "source": "ingest",
+                            "parent_id": lesson_id,
+                        },
+                        "minio_info": c["minio_info"],
+                    }
+                    for c in chunks
+                ],
+                created_by=created_by,
+            )
+
+        # lesson ngắn đi -> chunk ingest lần trước không còn
+        stale = {
+            "parent_id": lesson_oid,
+            "source": "ingest",
+            "source_object": {"$nin": [c["minio_info"]["object_name"] for c in chunks]},
+        }
+        # updated_at: process khác thấy chunk bị xoá qua fulltext_sync (poll theo updated_at)
+        await db[COLLECTION_MAP["chunk"]].update_many(
+            stale, {"$set": {"status": "deleted", "updated_at": datetime.now(timezone.utc)}}
+        )
+        await refresh_chunks(stale)
+        await response_cache.invalidate(class_id, "chunk")
+
+        result = {"status": "done", "chunks": len(chunks), "finished_at": datetime.now(timezone.utc)}
+    except Exception as e:
+        # ghi lỗi lên lesson cho FE thấy, rồi ném tiếp để job được retry (backoff)
+        await lessons.update_one(
+            {"_id": lesson_oid},
+            {"$set": {"ingest": {"status": "error", "detail": str(e), "finished_at": datetime.now(timezone.utc)}}},
+        )
+        await response_cache.invalidate(class_id, "lesson")
+        raise
+
+    await lessons.update_one({"_id": lesson_oid}, {"$set": {"ingest": result}})
+    await response_cache.invalidate(class_id, "lesson")
+    return result
+
@@ -0,0 +1,399 @@
+import asyncio
+import os
+import random
+import socket
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import (
+    JOB_BACKOFF_BASE_SECONDS,
+    JOB_BACKOFF_MAX_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_WORKERS,
+    JOBS_ENABLED,
+    KEYWORD_JOB_DELAY_SECONDS,
+    UPLOAD_INTENT_SWEEP_MINUTES,
+)
+from app.db.mongo_client import get_mongo_db
+from app.utils.metrics import CallbackMetric
+
+JOBS_COLLECTION = "jobs"
+
+# queued -> running -> done | (lỗi) queued lại sau backoff | failed khi hết lượt
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+# ===== handlers: kind -> async fn(**payload) (import lazy để không vòng import) =====
+
+async def _ingest_lesson(**payload: Any) -> Dict[str, Any]:
+    from app.services.ingest_service import ingest_lesson
+
+    result = await ingest_lesson(**payload)
+    # chunks mới -> tính lại keyword cả lớp; gom nhiều lesson trong KEYWORD_JOB_DELAY_SECONDS thành 1 job
+    await enqueue_job(
+        "extract_keywords",
+        {"class_id": payload["class_id"]},
+        dedupe_key=f"keywords:{payload['class_id']}",
+        delay_seconds=KEYWORD_JOB_DELAY_SECONDS,
+    )
+    return result
+
+
+async def _extract_keywords(**payload: Any) -> Dict[str, Any]:
+    from app.services.keyword_service import extract_class_keywords
+
+    return await extract_class_keywords(payload["class_id"], full=bool(payload.get("full")))
+
+
+async def _hash_object(**payload: Any) -> Dict[str, Any]:
+    from app.services.content_index_service import hash_stored_object
+
+    return await hash_stored_object(**payload)
+
+
+async def _sweep_upload_intents(**payload: Any) -> Dict[str, Any]:
+    from app.services.upload_intent_service import sweep_expired_intents
+
+    try:
+        return await sweep_expired_intents()
+    finally:
+        # job định kỳ: tự hẹn lượt sau (dedupe_key -> mọi process chỉ giữ 1 lượt đang chờ)
+        await schedule_intent_sweep(UPLOAD_INTENT_SWEEP_MINUTES * 60)
+
+
+JOB_HANDLERS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "ingest_lesson": _ingest_lesson,
+    "extract_keywords": _extract_keywords,
+    "hash_object": _hash_object,
+    "sweep_upload_intents": _sweep_upload_intents,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Lần thử thứ n lỗi -> chờ base * 2^(n-1) (tối đa JOB_BACKOFF_MAX_SECONDS), ±20% jitter."""
+    delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(job)
+    out["_id"] = str(out["_id"])
+    for k, v in out.items():
+        if isinstance(v, datetime):
+            out[k] = v.isoformat()
+    return out
+
+
+async def enqueue_job(
+    kind: str,
+    payload: Dict[str, Any],
+    *,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    delay_seconds: float = 0,
+    dedupe_key: Optional[str] = None,
+) -> str:
+    """
+    Ghi job vào Mongo (status queued) rồi đánh thức dispatcher.
+    dedupe_key: đã có job queued cùng key -> không tạo thêm, trả _id job đó.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"job kind không hợp lệ: {kind}")
+
+    coll = get_mongo_db()[JOBS_COLLECTION]
+    now = _now()
+    job = {
+        "kind": kind,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max(1, max_attempts),
+        "run_at": now + timedelta(seconds=delay_seconds),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+    if dedupe_key:
+        job["dedupe_key"] = dedupe_key
+        try:
+            res = await coll.find_one_and_update(
+                {"dedupe_key": dedupe_key, "status": "queued"},
+                {"$setOnInsert": job},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                projection={"_id": 1},
+            )
+            job_id = res["_id"]
+        except DuplicateKeyError:
+            # 2 request cùng upsert 1 lúc -> index unique (partial) chặn bản thứ 2
+            res = await coll.find_one({"dedupe_key": dedupe_key, "status": "queued"}, {"_id": 1})
+            job_id = res["_id"] if res else (await coll.insert_one(job)).inserted_id
+    else:
+        job_id = (await coll.insert_one(job)).inserted_id
+
+    job_dispatcher.wake()
+    return str(job_id)
+
+
+async def schedule_intent_sweep(delay_seconds: float = 0) -> str:
+    return await enqueue_job(
+        "sweep_upload_intents", {}, dedupe_key="sweep_upload_intents", delay_seconds=delay_seconds
+    )
+
+
+async def get_job(job_id: str) -> Dict[str, Any]:
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="job_id không hợp lệ")
+    job = await get_mongo_db()[JOBS_COLLECTION].find_one({"_id": oid})
+    if not job:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job")
+    return serialize_job(job)
+
+
+async def list_jobs(*, status: Optional[str], kind: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    flt: Dict[str, Any] = {}
+    if status:
+        flt["status"] = status
+    if kind:
+        flt["kind"] = kind
+    cursor = get_mongo_db()[JOBS_COLLECTION].find(flt).sort([("created_at", -1), ("_id", -1)]).limit(limit)
+    return [serialize_job(j) async for j in cursor]
+
+
+async def retry_job(job_id: str) -> Dict[str, Any]:
+    """Job failed -> chạy lại từ đầu (attempts = 0)."""
+    job = await get_job(job_id)
+    if job["status"] != "failed":
+        raise HTTPException(status_code=409, detail=f"Job đang ở trạng thái {job['status']}, chỉ retry được job failed")
+    now = _now()
+    await get_mongo_db()[JOBS_COLLECTION].update_one(
+        {"_id": ObjectId(job_id), "status": "failed"},
+        {"$set": {"status": "queued", "attempts": 0, "run_at": now, "updated_at": now}},
+    )
+    job_dispatcher.wake()
+    return await get_job(job_id)
+
+
+async def job_counts() -> Dict[str, Dict[str, int]]:
+    """{kind: {status: count}}"""
+    out: Dict[str, Dict[str, int]] = {}
+    pipeline = [{"$group": {"_id": {"kind": "$kind", "status": "$status"}, "n": {"$sum": 1}}}]
+    async for row in get_mongo_db()[JOBS_COLLECTION].aggregate(pipeline):
+        out.setdefault(row["_id"]["kind"], {})[row["_id"]["status"]] = row["n"]
+    return out
+
+
+# job còn lượt thử (job cũ thiếu max_attempts -> JOB_MAX_ATTEMPTS)
+_MAX_ATTEMPTS_EXPR = {"$ifNull": ["$max_attempts", JOB_MAX_ATTEMPTS]}
+_HAS_ATTEMPTS_LEFT = {"$lt": ["$attempts", _MAX_ATTEMPTS_EXPR]}
+
+
+class JobDispatcher:
+    """
+    Vòng asyncio: nhận job queued đến hạn (hoặc running quá hạn lease - process chết giữa chừng)
+    bằng find_one_and_update (an toàn khi chạy nhiều process API), chạy tối đa JOB_WORKERS job
+    cùng lúc. Việc nặng CPU nằm trong handler (process pool ingest), dispatcher chỉ điều phối.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = max(1, workers)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._sem = asyncio.Semaphore(self.workers)
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: Dict[Any, asyncio.Task] = {}
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._stopping = False
+            self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Ngừng nhận job; job đang chạy bị huỷ -> hết lease thì process khác/ lần sau nhận lại."""
+        self._stopping = True
+        self.wake()
+        tasks = list(self._running.values())
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "enabled": JOBS_ENABLED,
+            "workers": self.workers,
+            "active": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = _now()
+        return await get_mongo_db()[JOBS_COLLECTION].find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued", "run_at": {"$lte": now}},
+                    # hết lease nhưng còn lượt thử; hết lượt -> _fail_exhausted đánh failed
+                    {"status": "running", "locked_until": {"$lt": now}, "$expr": _HAS_ATTEMPTS_LEFT},
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": self.worker_id,
+                    "started_at": now,
+                    "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+                # đang chạy thì không còn giữ dedupe_key: enqueue mới cùng key sẽ tạo job queued mới
+                "$unset": {"dedupe_key": ""},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _fail_exhausted(self) -> None:
+        """Job hết lease (process chết giữa chừng) mà đã dùng hết max_attempts -> failed, không chạy lại."""
+        now = _now()
+        res = await get_mongo_db()[JOBS_COLLECTION].update_many(
+            {"status": "running", "locked_until": {"$lt": now}, "$expr": {"$gte": ["$attempts", _MAX_ATTEMPTS_EXPR]}},
+            {
+                "$set": {"status": "failed", "finished_at": now, "updated_at": now, "last_error": "lease expired"},
+                "$push": {"errors": {"$each": [{"at": now, "error": "lease expired"}], "$slice": -10}},
+                "$unset": {"locked_until": ""},
+            },
+        )
+        self.failed += res.modified_count
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            await self._sem.acquire()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                self._sem.release()
+                print("job claim failed:", e)
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                continue
+
+            if job is None:
+                self._sem.release()
+                try:
+                    await self._fail_exhausted()
+                except Exception as e:
+                    print("job fail_exhausted failed:", e)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run(job))
+            self._running[job["_id"]] = task
+
+    def _owned(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        # lease hết hạn và process khác đã nhận lại -> không ghi đè trạng thái của lượt chạy mới
+        return {"_id": job["_id"], "worker": self.worker_id, "status": "running", "attempts": job["attempts"]}
+
+    async def _renew_lease(self, job_id: Any) -> None:
+        coll = get_mongo_db()[JOBS_COLLECTION]
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await coll.update_one(
+                {"_id": job_id, "worker": self.worker_id, "status": "running"},
+                {"$set": {"locked_until": _now() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+            )
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        coll = get_mongo_db()[JOBS_COLLECTION]
+        renew = asyncio.create_task(self._renew_lease(job["_id"]))
+        try:
+            handler = JOB_HANDLERS.get(job["kind"])
+            if handler is None:
+                raise ValueError(f"job kind không hợp lệ: {job['kind']}")
+            result = await handler(**(job.get("payload") or {}))
+            now = _now()
+            res = await coll.update_one(
+                self._owned(job),
+                {
+                    "$set": {"status": "done", "result": result, "finished_at": now, "updated_at": now},
+                    "$unset": {"locked_until": ""},
+                },
+            )
+            if res.matched_count:
+                self.completed += 1
+            else:
+                print(f"job {job['_id']}: mất lease, không ghi kết quả")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            now = _now()
+            error = {"at": now, "attempt": job["attempts"], "error": f"{type(e).__name__}: {e}"}
+            retry = job["attempts"] < job.get("max_attempts", JOB_MAX_ATTEMPTS)
+            if retry:
+                update = {
+                    "status": "queued",
+                    "run_at": now + timedelta(seconds=backoff_seconds(job["attempts"])),
+                }
+            else:
+                update = {"status": "failed", "finished_at": now, "traceback": traceback.format_exc(limit=5)}
+            res = await coll.update_one(
+                self._owned(job),
+                {
+                    "$set": {**update, "last_error": error["error"], "updated_at": now},
+                    "$push": {"errors": {"$each": [error], "$slice": -10}},
+                    "$unset": {"locked_until": ""},
+                },
+            )
+            if not res.matched_count:
+                print(f"job {job['_id']}: mất lease, không ghi lỗi")
+            elif retry:
+                self.retried += 1
+            else:
+                self.failed += 1
+        finally:
+            renew.cancel()
+            self._running.pop(job["_id"], None)
+            self._sem.release()
+
+
+job_dispatcher = JobDispatcher(JOB_WORKERS)
+
+CallbackMetric("kltn_jobs_active", "Job đang chạy trong process này", lambda: [({}, job_dispatcher.stats()["active"])])
+CallbackMetric("kltn_jobs_workers", "Số job chạy song song tối đa", lambda: [({}, job_dispatcher.workers)])
+CallbackMetric(
+    "kltn_jobs_finished_total",
+    "Job đã xử lý theo kết quả",
+    lambda: [
+        ({"result": "done"}, job_dispatcher.completed),
+        ({"result": "retried"}, job_dispatcher.retried),
+        ({"result": "failed"}, job_dispatcher.failed),
+    ],
+    type_name="counter",
+)
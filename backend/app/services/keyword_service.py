@@ -0,0 +1,312 @@
+import asyncio
+import math
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import KEYWORD_TOP_K, KEYWORD_MAX_DF
+
+KEYWORD_SOURCE = "tfidf"
+
+# từ dừng tiếng Việt hay gặp (âm tiết); không dùng làm keyword, cũng cắt bigram tại đây
+VI_STOPWORDS = frozenset(
+    """
+    và là của có các những một được cho với trong khi này đó thì mà để không đã sẽ đang
+    ra vào lên xuống từ theo như về tại bị bởi nên vì nếu hay hoặc cũng rất nhiều ít hơn
+    nhất cả mỗi mọi ta ông bà anh chị em tôi chúng họ nó ai gì nào đâu sao bao nhiêu
+    thế vậy rồi còn lại chỉ đều đến qua trên dưới sau trước giữa ngoài bên người cái con
+    việc sự điều khác cùng thể phải làm nhau ở the of and to a in is for on
+    """.split()
+)
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_SPLIT_RE = re.compile(r"[.,;:!?()\[\]\"“”\n]+")
+
+
+def vi_terms(text: str) -> List[str]:
+    """
+    Tokenize tiếng Việt theo âm tiết (giữ dấu) + bigram âm tiết liền kề
+    ('đạo hàm', 'tích phân') vì từ tiếng Việt thường gồm 2 âm tiết.
+    Bigram không vắt qua dấu câu hoặc từ dừng.
+    """
+    out: List[str] = []
+    for segment in _SPLIT_RE.split((text or "").lower()):
+        prev = None
+        for w in _WORD_RE.findall(segment):
+            if w in VI_STOPWORDS or len(w) < 2:
+                prev = None
+                continue
+            out.append(w)
+            if prev is not None:
+                out.append(f"{prev} {w}")
+            prev = w
+    return out
+
+
+def compute_top_keywords(
+    texts: Sequence[str],
+    rows: Sequence[int],
+    top_k: int = KEYWORD_TOP_K,
+    max_df: float = KEYWORD_MAX_DF,
+) -> List[List[Tuple[str, float]]]:
+    """
+    TF-IDF trên cả corpus (ma trận thưa CSR), trả top_k (term, score) cho các dòng `rows`.
+    tf = 1 + log(count), idf = log((1+n)/(1+df)) + 1, chuẩn hoá L2 theo dòng;
+    bỏ term xuất hiện ở > max_df tỉ lệ document (quá phổ biến).
+    """
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    for text in texts:
+        for term in vi_terms(text):
+            indices.append(vocab.setdefault(term, len(vocab)))
+        indptr.append(len(indices))
+
+    n_docs = len(texts)
+    if n_docs == 0 or not vocab:
+        return [[] for _ in rows]
+
+    data = np.ones(len(indices), dtype=np.float32)
+    tf = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(n_docs, len(vocab)),
+    )
+    tf.sum_duplicates()  # count theo (doc, term)
+
+    df = np.bincount(tf.indices, minlength=len(vocab))
+    idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+    if n_docs > 1:
+        idf[df > max(1.0, max_df * n_docs)] = 0.0
+
+    tf.data = 1.0 + np.log(tf.data)
+    x = tf.multiply(idf.reshape(1, -1)).tocsr()
+    norms = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    x = sparse.diags(1.0 / norms).dot(x).tocsr()
+    x.eliminate_zeros()
+
+    terms = np.empty(len(vocab), dtype=object)
+    for term, idx in vocab.items():
+        terms[idx] = term
+
+    out: List[List[Tuple[str, float]]] = []
+    for r in rows:
+        start, end = x.indptr[r], x.indptr[r + 1]
+        scores = x.data[start:end]
+        if scores.size == 0:
+            out.append([])
+            continue
+        k = min(top_k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        cols = x.indices[start:end][top]
+        out.append([(terms[c], round(float(s), 4)) for c, s in zip(cols, scores[top])])
+    return out
+
+
+def count_terms(texts: Sequence[str]) -> List[Dict[str, int]]:
+    """term -> số lần xuất hiện, cho từng text (chạy trong process pool)."""
+    return [dict(Counter(vi_terms(t))) for t in texts]
+
+
+def score_top_keywords(
+    counts: Sequence[Mapping[str, int]],
+    df: Mapping[str, int],
+    n_docs: int,
+    top_k: int = KEYWORD_TOP_K,
+    max_df: float = KEYWORD_MAX_DF,
+) -> List[List[Tuple[str, float]]]:
+    """
+    Cùng công thức với compute_top_keywords nhưng df lấy từ thống kê có sẵn của lớp
+    (ClassTermStats) -> chỉ cần term count của các chunk cần ghi, không cần cả corpus.
+    """
+    cutoff = max(1.0, max_df * n_docs) if n_docs > 1 else math.inf
+    out: List[List[Tuple[str, float]]] = []
+    for row in counts:
+        scores: Dict[str, float] = {}
+        for term, c in row.items():
+            d = df.get(term, 0)
+            if d > cutoff:
+                continue
+            scores[term] = (1.0 + math.log(c)) * (math.log((1.0 + n_docs) / (1.0 + d)) + 1.0)
+        norm = math.sqrt(sum(v * v for v in scores.values())) or 1.0
+        top = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:top_k]
+        out.append([(t, round(v / norm, 4)) for t, v in top])
+    return out
+
+
+class ClassTermStats:
+    """
+    df của 1 lớp giữ trong RAM process chạy job keyword: lần chạy sau chỉ đọc content + tokenize
+    (gửi sang process pool) các chunk mới/đổi updated_at, df cộng/trừ theo chunk thay vì dựng lại.
+    Process mới khởi động -> lần đầu đọc cả lớp như trước.
+    """
+
+    def __init__(self) -> None:
+        self.versions: Dict[Any, Any] = {}
+        self.counts: Dict[Any, Dict[str, int]] = {}
+        self.df: Counter = Counter()
+        self.lock = asyncio.Lock()
+
+    def remove(self, chunk_id: Any) -> None:
+        self.versions.pop(chunk_id, None)
+        for term in self.counts.pop(chunk_id, ()):
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+
+    def put(self, chunk_id: Any, version: Any, counts: Dict[str, int]) -> None:
+        self.remove(chunk_id)
+        # intern: term lặp lại giữa các chunk dùng chung 1 chuỗi
+        counts = {sys.intern(t): c for t, c in counts.items()}
+        self.versions[chunk_id] = version
+        self.counts[chunk_id] = counts
+        self.df.update(counts.keys())
+
+
+_class_stats: Dict[str, ClassTermStats] = {}
+
+_BATCH = 1000
+
+
+async def _sync_class_stats(stats: ClassTermStats, chunks_coll, active: Dict[Any, Dict[str, Any]]) -> int:
+    """Đưa stats về đúng tập chunk đang active; trả về số chunk phải tokenize lại."""
+    from app.services.ingest_service import get_ingest_pool
+
+    for cid in [cid for cid in stats.versions if cid not in active]:
+        stats.remove(cid)
+
+    changed = [cid for cid, c in active.items() if stats.versions.get(cid, ...) != c.get("updated_at")]
+    loop = asyncio.get_running_loop()
+    for i in range(0, len(changed), _BATCH):
+        docs = await chunks_coll.find(
+            {"_id": {"$in": changed[i:i + _BATCH]}, "status": {"$ne": "deleted"}, "content": {"$type": "string"}},
+            {"content": 1, "updated_at": 1},
+        ).to_list(length=None)
+        counts = await loop.run_in_executor(get_ingest_pool(), count_terms, [d["content"] for d in docs])
+        for d, cnt in zip(docs, counts):
+            stats.put(d["_id"], d.get("updated_at"), cnt)
+            # đọc lại thấy updated_at mới hơn lúc liệt kê -> ghi keyword theo bản vừa đếm
+            active[d["_id"]]["updated_at"] = d.get("updated_at")
+        # bị xoá / mất content giữa 2 lần đọc
+        for cid in set(changed[i:i + _BATCH]) - {d["_id"] for d in docs}:
+            stats.remove(cid)
+            active.pop(cid, None)
+    return len(changed)
+
+
+async def extract_class_keywords(class_id: str, *, top_k: int = KEYWORD_TOP_K, full: bool = False) -> Dict[str, Any]:
+    """
+    Job keyword cho 1 lớp: IDF theo toàn bộ chunk của lớp (df giữ sẵn trong ClassTermStats, chỉ
+    đọc content chunk mới/đổi), chỉ ghi lại keyword cho chunk mới/đổi updated_at (full=True -> ghi
+    lại hết). 1 bulk_write cho collection keywords.
+    """
+    from pymongo import UpdateOne
+
+    from app.db.mongo_client import get_mongo_db
+    from app.services.mongo_metadata_service import COLLECTION_MAP, HIERARCHY, index_documents
+    from app.services.response_cache import response_cache
+    from app.services.search_service import SEARCH_FIELD, build_search_tokens
+
+    t0 = time.perf_counter()
+    db = get_mongo_db()
+    chunks_coll = db[COLLECTION_MAP["chunk"]]
+    kw_coll = db[COLLECTION_MAP["keyword"]]
+    stats = _class_stats.setdefault(class_id, ClassTermStats())
+
+    async with stats.lock:
+        # chỉ _id/updated_at/ancestors, không kéo content của cả lớp
+        active: Dict[Any, Dict[str, Any]] = {
+            c["_id"]: c
+            async for c in chunks_coll.find(
+                {"class_id": class_id, "type_name": "chunk", "status": {"$ne": "deleted"}, "content": {"$type": "string"}},
+                {"updated_at": 1, "ancestors": 1},
+            )
+        }
+        tokenized = await _sync_class_stats(stats, chunks_coll, active)
+
+        done: Dict[Any, Tuple[Any, Any]] = {}
+        async for k in kw_coll.find(
+            {"class_id": class_id, "source": KEYWORD_SOURCE}, {"parent_id": 1, "chunk_updated_at": 1, "status": 1}
+        ):
+            done[k["parent_id"]] = (k.get("chunk_updated_at"), k.get("status"))
+
+        rows = [
+            cid
+            for cid, c in active.items()
+            if full or done.get(cid, (None, None))[0] != c.get("updated_at") or done[cid][1] == "deleted"
+        ]
+        results: List[List[Tuple[str, float]]] = []
+        if rows:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                None,
+                score_top_keywords,
+                [stats.counts[cid] for cid in rows],
+                stats.df,
+                len(stats.versions),
+                top_k,
+            )
+
+    now = datetime.now(timezone.utc)
+    ops = []
+    for cid, top in zip(rows, results):
+        chunk = active[cid]
+        name = ", ".join(t for t, _ in top)
+        ops.append(
+            UpdateOne(
+                {"class_id": class_id, "type_name": "keyword", "source": KEYWORD_SOURCE, "parent_id": cid},
+                {
+                    "$set": {
+                        "keyword_name": name,
+                        "keywords": [{"term": t, "score": s} for t, s in top],
+                        "chunk_updated_at": chunk.get("updated_at"),
+                        "parent_type": "chunk",
+                        "ancestors": list(chunk.get("ancestors") or []) + [cid],
+                        "level": HIERARCHY.index("keyword"),
+                        "status": "active",
+                        "updated_at": now,
+                        "updated_by": "keyword-job",
+                        SEARCH_FIELD: build_search_tokens(name, None),
+                    },
+                    "$setOnInsert": {"created_at": now, "created_by": "keyword-job"},
+                },
+                upsert=True,
+            )
+        )
+
+    upserted = modified = 0
+    if ops:
+        res = await kw_coll.bulk_write(ops, ordered=False)
+        upserted, modified = res.upserted_count, res.modified_count
+        await index_documents("keyword", class_id, list(res.upserted_ids.values()))
+
+    # chunk đã bị xoá -> keyword của nó cũng bỏ; chỉ đúng các parent_id vừa mất ($in theo lô),
+    # không phải $nin cả lớp
+    gone = [pid for pid, (_, status) in done.items() if status != "deleted" and pid not in active]
+    stale_deleted = 0
+    for i in range(0, len(gone), _BATCH):
+        stale = await kw_coll.update_many(
+            {"class_id": class_id, "source": KEYWORD_SOURCE, "parent_id": {"$in": gone[i:i + _BATCH]}, "status": {"$ne": "deleted"}},
+            {"$set": {"status": "deleted", "updated_at": now}},
+        )
+        stale_deleted += stale.modified_count
+    if upserted or modified or stale_deleted:
+        await response_cache.invalidate(class_id, "keyword")
+
+    return {
+        "class_id": class_id,
+        "chunks": len(active),
+        "tokenized": tokenized,
+        "processed": len(rows),
+        "upserted": upserted,
+        "modified": modified,
+        "stale_deleted": stale_deleted,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
@@ -1,4 +1,5 @@
 import re
+from pathlib import PurePosixPath
 from typing import Literal, Dict
 from fastapi import HTTPException
 from app.core.config import MINIO_BUCKET_PREFIX
@@ -28,3 +29,44 @@ def make_object_name(type_name: TypeName, filename: str) -> str:
     if not filename or not SAFE_FILENAME_RE.match(filename):
         raise HTTPException(status_code=400, detail="Invalid filename (must not contain / or \\\")")
     return f"{TYPE_PREFIX[type_name]}{filename}"
+
+
+# object theo nội dung: '<prefix>sha256/<hash>.<đuôi>' -> ghi 1 lần, không bao giờ bị ghi đè/xoá
+# (nhiều document khử trùng lặp trỏ chung an toàn). Tên file upload có "/" bị chặn ở trên
+# nên không đụng được vào thư mục này.
+CONTENT_DIR = "sha256/"
+# object tạm của 1 request/intent (chưa kiểm tra xong), không bao giờ là object của document
+STAGING_PREFIX = "uploads/"
+# bản copy của 1 upload intent đã kiểm tra, chỉ document của intent đó dùng tới khi job hash_object
+# chuyển sang object theo hash (rồi xoá)
+INTENT_DIR = "intents/"
+
+
+def content_object_name(type_name: TypeName, sha256: str, filename: str) -> str:
+    """Giữ đuôi file gốc để url/ingest vẫn nhận ra loại file."""
+    if type_name not in TYPE_PREFIX:
+        raise HTTPException(status_code=400, detail=f"Invalid type_name: {type_name}")
+    return f"{TYPE_PREFIX[type_name]}{CONTENT_DIR}{sha256}{PurePosixPath(filename or '').suffix.lower()}"
+
+
+def is_content_object(object_name: str) -> bool:
+    return any(object_name.startswith(p + CONTENT_DIR) for p in TYPE_PREFIX.values())
+
+
+def staging_object_name(token: str) -> str:
+    return f"{STAGING_PREFIX}{token}"
+
+
+def intent_object_name(type_name: TypeName, intent_id: str, filename: str) -> str:
+    if type_name not in TYPE_PREFIX:
+        raise HTTPException(status_code=400, detail=f"Invalid type_name: {type_name}")
+    return f"{TYPE_PREFIX[type_name]}{INTENT_DIR}{intent_id}{PurePosixPath(filename or '').suffix.lower()}"
+
+
+def is_intent_object(object_name: str) -> bool:
+    return any(object_name.startswith(p + INTENT_DIR) for p in TYPE_PREFIX.values())
+
+
+def chunk_object_name(lesson_id: str, index: int) -> str:
+    """Chunk ingest của 1 lesson: '<prefix chunk><lesson_id>/<index>.txt' (2 lesson trùng tên file không đè nhau)."""
+    return f"{TYPE_PREFIX['chunk']}{lesson_id}/{index:04d}.txt"
@@ -1,32 +1,100 @@
+import hashlib
+from datetime import datetime, timezone
+
 from fastapi import HTTPException
+from minio.commonconfig import CopySource
 from minio.error import S3Error
 
-from app.db.minio_client import minio_client, ensure_bucket, build_public_url
+from app.db.minio_client import minio_client, ensure_bucket, build_public_url, bucket_registry
 from app.services.minio_paths import bucket_from_class_id, make_object_name, TypeName, TYPE_PREFIX
-from app.core.config import PART_SIZE_BYTES
+from app.core.config import PART_SIZE_BYTES, MINIO_UPLOAD_WORKERS
+from app.utils.metrics import BYTES, stage_timer, timed
+from app.utils.pool import BoundedPool
+
+
+# thread pool riêng cho upload MinIO (put_object là sync) -> không chặn event loop
+upload_pool = BoundedPool("minio-upload", MINIO_UPLOAD_WORKERS)
+
+
+class HashingReader:
+    """Bọc fileobj: tính SHA-256 ngay trong lúc put_object đọc dữ liệu để gửi (không đọc file 2 lần)."""
+
+    def __init__(self, fileobj) -> None:
+        self._f = fileobj
+        self._h = hashlib.sha256()
+        self.size = 0
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._f.read(n)
+        self._h.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def sha256_fileobj(fileobj, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 của file seekable (đọc hết rồi seek về đầu)."""
+    h = hashlib.sha256()
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+    fileobj.seek(0)
+    return h.hexdigest()
+
 
-def upload_one(class_id: str, type_name: TypeName, filename: str, fileobj, content_type: str, size_bytes: int):
+@timed("upload_one")
+def upload_one(
+    class_id: str,
+    type_name: TypeName,
+    filename: str,
+    fileobj,
+    content_type: str,
+    size_bytes: int,
+    object_name: str | None = None,
+):
     # 1) bucket theo class_id
     bucket = bucket_from_class_id(class_id)
     ensure_bucket(bucket)
 
-    # 2) object_name theo type_name
-    object_name = make_object_name(type_name, filename)
+    # 2) object_name theo type_name (hoặc key do caller chọn: key theo hash / key tạm)
+    object_name = object_name or make_object_name(type_name, filename)
     prefix = TYPE_PREFIX[type_name]
 
+    reader = HashingReader(fileobj)
+
+    def _put():
+        with stage_timer("minio_put"):
+            return minio_client.put_object(
+                bucket_name=bucket,
+                object_name=object_name,
+                data=reader,
+                length=-1,
+                part_size=PART_SIZE_BYTES,
+                content_type=content_type or "application/octet-stream",
+            )
+
     try:
         # 3) upload streaming (multipart)
-        minio_client.put_object(
-            bucket_name=bucket,
-            object_name=object_name,
-            data=fileobj,
-            length=-1,
-            part_size=PART_SIZE_BYTES,
-            content_type=content_type or "application/octet-stream",
-        )
+        try:
+            put_res = _put()
+        except S3Error as e:
+            # cache bucket cũ (bucket bị xoá ngoài app) -> invalidate, tạo lại, thử 1 lần nữa
+            if e.code != "NoSuchBucket" or not hasattr(fileobj, "seek"):
+                raise
+            bucket_registry.invalidate(bucket)
+            ensure_bucket(bucket)
+            fileobj.seek(0)
+            reader = HashingReader(fileobj)
+            put_res = _put()
     except S3Error as e:
         raise HTTPException(status_code=500, detail=f"MinIO put_object error: {e.code} - {e.message}")
 
+    BYTES.inc(reader.size, direction="upload")
     public_url = build_public_url(bucket, object_name)
 
     return {
@@ -37,9 +105,20 @@ def upload_one(class_id: str, type_name: TypeName, filename: str, fileobj, conte
         "original_filename": filename,
         "content_type": content_type or "application/octet-stream",
         "size_bytes": size_bytes,
+        "etag": getattr(put_res, "etag", None),
+        "last_modified": getattr(put_res, "last_modified", None) or datetime.now(timezone.utc),
+        "sha256": reader.hexdigest(),
         "public_url": public_url,
         "status": "ok",
     }
+
+
+def copy_object(bucket: str, src: str, dst: str):
+    """Copy phía server trong cùng bucket (không tải byte về API)."""
+    with stage_timer("minio_copy"):
+        return minio_client.copy_object(bucket, dst, CopySource(bucket, src))
+
+
 def list_files(
     class_id: str,
     type_name: TypeName,
@@ -56,7 +135,7 @@ def list_files(
 
     # Bucket chưa tồn tại -> coi như danh sách rỗng (đúng activity diagram)
     try:
-        if not minio_client.bucket_exists(bucket):
+        if not bucket_registry.exists(bucket):
             return {"bucket": bucket, "type_name": type_name, "prefix": prefix, "count": 0, "items": []}
     except S3Error as e:
         raise HTTPException(status_code=500, detail=f"MinIO bucket_exists error: {e.code} - {e.message}")
@@ -83,6 +162,9 @@ def list_files(
                 break
 
     except S3Error as e:
+        if e.code == "NoSuchBucket":
+            bucket_registry.invalidate(bucket)
+            return {"bucket": bucket, "type_name": type_name, "prefix": prefix, "count": 0, "items": []}
         raise HTTPException(status_code=500, detail=f"MinIO list_objects error: {e.code} - {e.message}")
 
     return {"bucket": bucket, "type_name": type_name, "prefix": prefix, "count": len(items), "items": items}
@@ -0,0 +1,169 @@
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.mongo_client import get_mongo_db
+from app.core.config import JOB_RETENTION_DAYS
+from app.services.content_index_service import CONTENT_INDEX_COLLECTION
+from app.services.job_service import JOBS_COLLECTION
+from app.services.mongo_metadata_service import COLLECTION_MAP
+from app.services.search_service import SEARCH_FIELD
+from app.services.upload_intent_service import INTENTS_COLLECTION
+
+
+def index_specs(type_name: str) -> List[Dict[str, Any]]:
+    """Index cần cho 1 collection metadata (theo các query thật trong code)."""
+    return [
+        # upsert_entity_metadata: filter {class_id, type_name, source_object}
+        {
+            "name": "class_type_source_object",
+            "keys": [("class_id", ASCENDING), ("type_name", ASCENDING), ("source_object", ASCENDING)],
+        },
+        # upsert_entity_metadata: doc cũ chưa có source_object -> khớp {class_id, type_name, <type>_url}
+        {
+            "name": "class_type_url",
+            "keys": [("class_id", ASCENDING), ("type_name", ASCENDING), (f"{type_name}_url", ASCENDING)],
+        },
+        # list_documents theo 1 lớp: {type_name, class_id} sort (updated_at, _id) giảm dần
+        {
+            "name": "type_class_updated",
+            "keys": [
+                ("type_name", ASCENDING),
+                ("class_id", ASCENDING),
+                ("updated_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+        },
+        # list_documents class_id=all
+        {
+            "name": "type_updated",
+            "keys": [("type_name", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        # GET /admin/tree: cây con theo materialized path
+        {
+            "name": "class_ancestors",
+            "keys": [("class_id", ASCENDING), ("ancestors", ASCENDING)],
+        },
+        # parent -> con (ingest đánh dấu chunk thừa, keyword job theo chunk)
+        {
+            "name": "parent_id",
+            "keys": [("parent_id", ASCENDING)],
+        },
+        # search prefix trên token đã bỏ dấu
+        {
+            "name": "type_name_search_tokens",
+            "keys": [("type_name", ASCENDING), (SEARCH_FIELD, ASCENDING)],
+        },
+    ]
+
+
+# index của các collection phụ (không nằm trong COLLECTION_MAP)
+EXTRA_INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    CONTENT_INDEX_COLLECTION: [
+        {
+            "name": "sha256_bucket",
+            "keys": [("sha256", ASCENDING), ("bucket", ASCENDING)],
+            "options": {"unique": True},
+        },
+        {
+            "name": "bucket_object_name",
+            "keys": [("bucket", ASCENDING), ("object_name", ASCENDING)],
+        },
+    ],
+    INTENTS_COLLECTION: [
+        # job sweep_upload_intents: intent pending quá hạn
+        {
+            "name": "status_expires_at",
+            "keys": [("status", ASCENDING), ("expires_at", ASCENDING)],
+        },
+    ],
+    JOBS_COLLECTION: [
+        # dispatcher: job queued đến hạn / running quá lease, sort run_at
+        {
+            "name": "status_run_at",
+            "keys": [("status", ASCENDING), ("run_at", ASCENDING)],
+        },
+        {
+            "name": "status_locked_until",
+            "keys": [("status", ASCENDING), ("locked_until", ASCENDING)],
+        },
+        # GET /admin/jobs
+        {
+            "name": "created_at",
+            "keys": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        # mỗi dedupe_key chỉ 1 job queued
+        {
+            "name": "dedupe_key_queued",
+            "keys": [("dedupe_key", ASCENDING)],
+            "options": {"unique": True, "partialFilterExpression": {"status": "queued", "dedupe_key": {"$exists": True}}},
+        },
+        # job done tự xoá
+        {
+            "name": "done_ttl",
+            "keys": [("finished_at", ASCENDING)],
+            "options": {
+                "expireAfterSeconds": JOB_RETENTION_DAYS * 86400,
+                "partialFilterExpression": {"status": "done"},
+            },
+        },
+    ],
+}
+
+
+def declared_indexes() -> Dict[str, List[Dict[str, Any]]]:
+    out = {coll_name: index_specs(t) for t, coll_name in COLLECTION_MAP.items()}
+    out.update(EXTRA_INDEXES)
+    return out
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Tạo index còn thiếu (idempotent, gọi lúc startup). Trả về {collection: [index vừa tạo]}."""
+    db = get_mongo_db()
+    created: Dict[str, List[str]] = {}
+
+    for coll_name, specs in declared_indexes().items():
+        coll = db[coll_name]
+        existing = await coll.index_information()
+        missing = [s for s in specs if s["name"] not in existing]
+        if not missing:
+            continue
+        models = [IndexModel(s["keys"], name=s["name"], **s.get("options", {})) for s in missing]
+        created[coll_name] = await coll.create_indexes(models)
+
+    return created
+
+
+async def _index_usage(coll) -> Dict[str, int]:
+    """Số lần dùng mỗi index từ $indexStats (reset khi mongod restart)."""
+    usage: Dict[str, int] = {}
+    try:
+        async for st in coll.aggregate([{"$indexStats": {}}]):
+            usage[st["name"]] = int((st.get("accesses") or {}).get("ops") or 0)
+    except OperationFailure:
+        pass
+    return usage
+
+
+async def index_report() -> Dict[str, Any]:
+    """Index khai báo / đang có / thiếu / thừa / không được dùng cho từng collection."""
+    db = get_mongo_db()
+    report: Dict[str, Any] = {}
+
+    for coll_name, specs in declared_indexes().items():
+        coll = db[coll_name]
+        existing = await coll.index_information()
+        usage = await _index_usage(coll)
+        declared_names = {s["name"] for s in specs}
+
+        report[coll_name] = {
+            "declared": sorted(declared_names),
+            "existing": sorted(existing),
+            "missing": sorted(declared_names - set(existing)),
+            "undeclared": sorted(set(existing) - declared_names - {"_id_"}),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+            "usage": usage,
+        }
+
+    return report
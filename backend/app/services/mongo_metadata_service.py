@@ -1,13 +1,19 @@
 import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+from bson import ObjectId
 from fastapi import HTTPException
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.errors import PyMongoError
 
+from app.db.minio_client import build_public_url
 from app.db.mongo_client import get_mongo_db
+from app.services.fulltext_service import fulltext_index, refresh_chunks
+from app.services.response_cache import response_cache
+from app.services.search_service import SEARCH_FIELD, build_search_tokens
+from app.utils.metrics import stage_timer, timed
 
 COLLECTION_MAP = {
     "subject": "subjects",
@@ -17,6 +23,137 @@ COLLECTION_MAP = {
     "keyword": "keywords",
 }
 
+TYPE_BY_COLLECTION = {v: k for k, v in COLLECTION_MAP.items()}
+
+# cây subject -> topic -> lesson -> chunk -> keyword (thứ tự = level)
+HIERARCHY = list(COLLECTION_MAP.keys())
+
+# _id -> (type_name, collection): tra detail không có type_name bằng 1 lần đọc theo _id
+DOCUMENTS_INDEX_COLLECTION = "documents_index"
+
+
+async def index_documents(type_name: str, class_id: str, ids: List[Any]) -> None:
+    """Ghi/ cập nhật documents_index cho các _id của 1 collection."""
+    if not ids:
+        return
+    coll_name = COLLECTION_MAP[type_name]
+    ops = [
+        UpdateOne(
+            {"_id": oid},
+            {"$set": {"type_name": type_name, "collection": coll_name, "class_id": class_id}},
+            upsert=True,
+        )
+        for oid in ids
+    ]
+    await get_mongo_db()[DOCUMENTS_INDEX_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def lookup_document_type(oid: Any) -> Optional[str]:
+    entry = await get_mongo_db()[DOCUMENTS_INDEX_COLLECTION].find_one({"_id": oid}, {"type_name": 1})
+    if not entry or entry.get("type_name") not in COLLECTION_MAP:
+        return None
+    return entry["type_name"]
+
+
+async def resolve_hierarchy_many(items: List[Tuple[str, Dict[str, Any]]], *, strict: bool = True) -> None:
+    """
+    metadata.parent_id (chuỗi _id của doc cha, thuộc type ngay trên) -> lưu:
+    - parent_id (ObjectId), parent_type
+    - ancestors: [_id tổ tiên từ subject xuống cha] (materialized path, có index)
+    - level: vị trí trong HIERARCHY
+    Không gửi parent_id -> giữ nguyên liên kết cũ (chỉ cập nhật level).
+    Đọc cha theo lô: 1 find($in) mỗi type cha.
+    """
+    wanted: Dict[str, set] = {}
+    for type_name, metadata in items:
+        level = HIERARCHY.index(type_name)
+        metadata["level"] = level
+        raw = metadata.get("parent_id")
+        if raw in (None, ""):
+            metadata.pop("parent_id", None)
+            continue
+        if level == 0 or not ObjectId.is_valid(str(raw)):
+            if strict:
+                raise HTTPException(status_code=400, detail=f"parent_id không hợp lệ: {raw}")
+            metadata.pop("parent_id", None)
+            continue
+        wanted.setdefault(HIERARCHY[level - 1], set()).add(ObjectId(str(raw)))
+
+    db = get_mongo_db()
+    parents: Dict[ObjectId, Dict[str, Any]] = {}
+    for parent_type, ids in wanted.items():
+        async for p in db[COLLECTION_MAP[parent_type]].find({"_id": {"$in": list(ids)}}, {"ancestors": 1}):
+            parents[p["_id"]] = p
+
+    for type_name, metadata in items:
+        if "parent_id" not in metadata:
+            continue
+        oid = ObjectId(str(metadata["parent_id"]))
+        parent = parents.get(oid)
+        if parent is None:
+            if strict:
+                raise HTTPException(status_code=400, detail=f"Không tìm thấy parent_id {oid} trong {HIERARCHY[metadata['level'] - 1]}")
+            metadata.pop("parent_id", None)
+            continue
+        metadata["parent_id"] = oid
+        metadata["parent_type"] = HIERARCHY[metadata["level"] - 1]
+        metadata["ancestors"] = list(parent.get("ancestors") or []) + [oid]
+
+
+async def cascade_ancestors(class_id: str, moved: List[Tuple[str, ObjectId, List[Any]]]) -> int:
+    """
+    moved = [(type_name, _id, ancestors mới)] của các node vừa được gán parent_id.
+    Node đổi cha -> doc con cháu ({"ancestors": _id}) vẫn giữ tiền tố cũ -> viết lại phần trước
+    _id thành ancestors mới của node. 1 find($in, index ancestors) mỗi collection con, chỉ ghi doc bị lệch.
+    """
+    if not moved:
+        return 0
+    # node sâu trước: node nông hơn (cũng đổi trong lô) viết lại tiền tố sau cùng -> thắng
+    moved = sorted(moved, key=lambda m: HIERARCHY.index(m[0]), reverse=True)
+    top_level = min(HIERARCHY.index(t) for t, _, _ in moved)
+    db = get_mongo_db()
+    now = datetime.now(timezone.utc)
+    total = 0
+    for child_level in range(top_level + 1, len(HIERARCHY)):
+        child_type = HIERARCHY[child_level]
+        nodes = [(node_id, list(prefix)) for t, node_id, prefix in moved if HIERARCHY.index(t) < child_level]
+        coll = db[COLLECTION_MAP[child_type]]
+        ops: List[UpdateOne] = []
+        changed: List[ObjectId] = []
+        flt = {"class_id": class_id, "ancestors": {"$in": [node_id for node_id, _ in nodes]}}
+        async for d in coll.find(flt, {"ancestors": 1}):
+            old = list(d.get("ancestors") or [])
+            new = old
+            for node_id, prefix in nodes:
+                if node_id in new:
+                    new = prefix + new[new.index(node_id):]
+            if new != old:
+                ops.append(UpdateOne({"_id": d["_id"]}, {"$set": {"ancestors": new, "updated_at": now}}))
+                changed.append(d["_id"])
+        if not ops:
+            continue
+        with stage_timer("mongo_cascade_ancestors"):
+            await coll.bulk_write(ops, ordered=False)
+        total += len(ops)
+        if child_type == "chunk":
+            # index BM25 lọc theo ancestors -> nạp lại chunk vừa đổi
+            await refresh_chunks({"_id": {"$in": changed}})
+        await response_cache.invalidate(class_id, child_type)
+    return total
+
+
+def build_object_descriptor(minio_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Thông tin object MinIO lưu kèm document để đọc list/detail khỏi phải stat lại."""
+    return {
+        "bucket": minio_info.get("bucket"),
+        "object_name": minio_info.get("object_name"),
+        "size_bytes": minio_info.get("size_bytes"),
+        "etag": minio_info.get("etag"),
+        "content_type": minio_info.get("content_type"),
+        "last_modified": minio_info.get("last_modified"),
+        "sha256": minio_info.get("sha256"),
+    }
+
 
 def parse_metadata(metadata_json: str | None) -> Dict[str, Any]:
     if not metadata_json:
@@ -30,24 +167,16 @@ def parse_metadata(metadata_json: str | None) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=f"metadata_json không hợp lệ: {e}")
 
 
-async def upsert_entity_metadata(
+def build_entity_upsert(
     *,
     class_id: str,
     type_name: str,
     metadata: Dict[str, Any],
     minio_info: Dict[str, Any],
-    created_by: str = "admin",
-) -> Dict[str, Any]:
-    type_name = (type_name or "").strip().lower()
-    if type_name not in COLLECTION_MAP:
-        raise HTTPException(status_code=400, detail=f"type_name không hợp lệ: {type_name}")
-
-    coll_name = COLLECTION_MAP[type_name]
-    db = get_mongo_db()
-    coll = db[coll_name]
-
-    now = datetime.now(timezone.utc)
-
+    created_by: str,
+    now: datetime,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(filter, update) cho upsert 1 document metadata; dùng chung cho upsert lẻ và bulk_write."""
     # ✅ BỎ topic_id (theo yêu cầu của bạn)
     # (dù FE có gửi topic_id thì cũng bỏ)
     if type_name == "topic":
@@ -68,11 +197,25 @@ async def upsert_entity_metadata(
     # ✅ BỎ hẳn field "file" (không lưu nữa)
     metadata.pop("file", None)
 
-    # filter upsert: dùng url (ổn định) thay vì file.object_name
+    # ✅ lưu descriptor của object (size/etag/last_modified) -> list/detail không cần stat MinIO
+    metadata["object"] = build_object_descriptor(minio_info)
+
+    # source_object = object_name "logic" theo tên file upload (TYPE_PREFIX/filename).
+    # Byte nằm ở object theo hash (url/object trỏ tới đó) nên không dùng url làm khoá được.
+    source_object = minio_info.get("source_object") or minio_info.get("object_name")
+    metadata["source_object"] = source_object
+
+    # filter upsert: theo source_object; doc cũ (chưa có source_object) vẫn khớp theo url như trước
     flt = {
         "class_id": class_id,
         "type_name": type_name,
-        url_key: public_url,
+        "$or": [
+            {"source_object": source_object},
+            {
+                url_key: build_public_url(minio_info.get("bucket") or "", source_object or ""),
+                "source_object": {"$exists": False},
+            },
+        ],
     }
 
     doc_set = dict(metadata)
@@ -83,20 +226,143 @@ async def upsert_entity_metadata(
             "updated_at": now,
             "status": "active",
             "updated_by": created_by,
+            # ✅ token đã bỏ dấu để search prefix dùng index (tên file upload, không phải key theo hash trong url)
+            SEARCH_FIELD: build_search_tokens(metadata.get(name_key), source_object),
         }
     )
 
+    return flt, {"$set": doc_set, "$setOnInsert": {"created_at": now, "created_by": created_by}}
+
+
+@timed("upsert_entity_metadata")
+async def upsert_entity_metadata(
+    *,
+    class_id: str,
+    type_name: str,
+    metadata: Dict[str, Any],
+    minio_info: Dict[str, Any],
+    created_by: str = "admin",
+) -> Dict[str, Any]:
+    type_name = (type_name or "").strip().lower()
+    if type_name not in COLLECTION_MAP:
+        raise HTTPException(status_code=400, detail=f"type_name không hợp lệ: {type_name}")
+
+    coll_name = COLLECTION_MAP[type_name]
+    db = get_mongo_db()
+    coll = db[coll_name]
+
+    now = datetime.now(timezone.utc)
+
+    await resolve_hierarchy_many([(type_name, metadata)])
+
+    flt, update = build_entity_upsert(
+        class_id=class_id,
+        type_name=type_name,
+        metadata=metadata,
+        minio_info=minio_info,
+        created_by=created_by,
+        now=now,
+    )
+
     try:
-        after = await coll.find_one_and_update(
-            flt,
-            {"$set": doc_set, "$setOnInsert": {"created_at": now, "created_by": created_by}},
-            upsert=True,
-            return_document=ReturnDocument.AFTER,
-        )
+        with stage_timer("mongo_upsert"):
+            after = await coll.find_one_and_update(
+                flt,
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        if after and "_id" in after:
+            await index_documents(type_name, class_id, [after["_id"]])
+            if type_name == "chunk":
+                fulltext_index.add_doc(after)
+            if "ancestors" in metadata:
+                await cascade_ancestors(class_id, [(type_name, after["_id"], after["ancestors"])])
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=f"MongoDB error: {e}")
 
+    # ✅ list/detail đã cache của class/type này không còn đúng
+    await response_cache.invalidate(class_id, type_name)
+
     if after and "_id" in after:
         after["_id"] = str(after["_id"])
 
     return {"collection": coll_name, "document": after}
+
+
+async def bulk_upsert_entity_metadata(
+    *,
+    class_id: str,
+    entries: List[Dict[str, Any]],
+    created_by: str = "admin",
+) -> Dict[str, Dict[str, int]]:
+    """
+    Upsert nhiều document: mỗi entry = {type_name, metadata, minio_info}.
+    Gom theo collection -> 1 bulk_write (unordered) mỗi collection.
+    """
+    now = datetime.now(timezone.utc)
+    ops: Dict[str, List[UpdateOne]] = {}
+    sources: Dict[str, List[str]] = {}
+    # source_object của doc có gán parent_id -> cascade ancestors xuống con cháu sau khi ghi
+    linked: Dict[str, List[str]] = {}
+
+    prepared: List[Tuple[str, Dict[str, Any]]] = []
+    for entry in entries:
+        type_name = (entry.get("type_name") or "").strip().lower()
+        if type_name not in COLLECTION_MAP:
+            raise HTTPException(status_code=400, detail=f"type_name không hợp lệ: {type_name}")
+        prepared.append((type_name, dict(entry.get("metadata") or {})))
+
+    # parent_id sai trong 1 file không làm hỏng cả lô (đã upload MinIO xong) -> bỏ liên kết
+    await resolve_hierarchy_many(prepared, strict=False)
+
+    for entry, (type_name, metadata) in zip(entries, prepared):
+        flt, update = build_entity_upsert(
+            class_id=class_id,
+            type_name=type_name,
+            metadata=metadata,
+            minio_info=entry["minio_info"],
+            created_by=created_by,
+            now=now,
+        )
+        ops.setdefault(COLLECTION_MAP[type_name], []).append(UpdateOne(flt, update, upsert=True))
+        sources.setdefault(COLLECTION_MAP[type_name], []).append(metadata["source_object"])
+        if "ancestors" in metadata and type_name != HIERARCHY[-1]:
+            linked.setdefault(COLLECTION_MAP[type_name], []).append(metadata["source_object"])
+
+    db = get_mongo_db()
+    result: Dict[str, Dict[str, int]] = {}
+    for coll_name, coll_ops in ops.items():
+        try:
+            with stage_timer("mongo_bulk_write"):
+                res = await db[coll_name].bulk_write(coll_ops, ordered=False)
+            # doc mới -> thêm vào documents_index (doc đã có thì đã được index từ trước)
+            await index_documents(TYPE_BY_COLLECTION[coll_name], class_id, list(res.upserted_ids.values()))
+            if coll_name == COLLECTION_MAP["chunk"]:
+                await refresh_chunks(
+                    {
+                        "class_id": class_id,
+                        "type_name": "chunk",
+                        "source_object": {"$in": sources[coll_name]},
+                    }
+                )
+            if coll_name in linked:
+                type_name = TYPE_BY_COLLECTION[coll_name]
+                moved = [
+                    (type_name, d["_id"], d.get("ancestors") or [])
+                    async for d in db[coll_name].find(
+                        {"class_id": class_id, "type_name": type_name, "source_object": {"$in": linked[coll_name]}},
+                        {"ancestors": 1},
+                    )
+                ]
+                await cascade_ancestors(class_id, moved)
+        except PyMongoError as e:
+            raise HTTPException(status_code=500, detail=f"MongoDB error: {e}")
+        await response_cache.invalidate(class_id, TYPE_BY_COLLECTION[coll_name])
+        result[coll_name] = {
+            "matched": res.matched_count,
+            "modified": res.modified_count,
+            "upserted": res.upserted_count,
+        }
+
+    return result
@@ -0,0 +1,216 @@
+"""
+Cache response JSON của GET /admin/documents (list + detail), TTL + LRU theo số entry.
+
+- Khoá = tham số query đã chuẩn hoá; giữ sẵn body đã serialize + ETag -> hit không phải
+  query Mongo, stat MinIO hay encode JSON lại; client gửi If-None-Match trùng -> 304.
+- Invalidation theo (class_id, type_name): mỗi scope có 1 "generation", ghi metadata thì tăng
+  generation của scope đó (và các scope "all" chứa nó) -> mọi entry đọc từ scope cũ tự hết hạn.
+- RESPONSE_CACHE_SHARED=true: generation còn được $inc trong Mongo (collection cache_generations),
+  mỗi worker đọc lại sau RESPONSE_CACHE_SYNC_SECONDS -> các worker uvicorn không trả dữ liệu cũ lâu hơn thế.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SHARED,
+    RESPONSE_CACHE_SYNC_SECONDS,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from app.services.content_service import etag_matches
+from app.utils.metrics import register_cache
+
+CACHE_GENERATIONS_COLLECTION = "cache_generations"
+ALL = "*"
+
+# (body, etag, expires_at, scope, generation lúc build)
+Entry = Tuple[bytes, str, float, str, int]
+
+
+def scope_key(class_id: Optional[str], type_name: Optional[str]) -> str:
+    """'10|lesson'; class/type rỗng hoặc 'all' -> '*'."""
+    c = str(class_id or "").strip().lower()
+    t = str(type_name or "").strip().lower()
+    return f"{c if c and c != 'all' else ALL}|{t if t and t != 'all' else ALL}"
+
+
+def _affected_scopes(class_id: Optional[str], type_name: Optional[str]) -> List[str]:
+    c, t = scope_key(class_id, type_name).split("|")
+    return list(dict.fromkeys([f"{c}|{t}", f"{c}|{ALL}", f"{ALL}|{t}", f"{ALL}|{ALL}"]))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, *, shared: bool = False) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.shared = shared
+        self._data: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._gens: Dict[str, int] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._remote_seen: Dict[str, int] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _get(self, key: Hashable) -> Optional[Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        _, _, expires_at, scope, gen = entry
+        if expires_at < time.monotonic() or self._gens.get(scope, 0) != gen:
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _put(self, key: Hashable, entry: Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def _load(self, key: Hashable, build: Callable[[], Awaitable[Tuple[Any, str]]]) -> Entry:
+        # nhiều request cùng khoá lúc cache trống -> chỉ 1 lần build, chạy trong task riêng không thuộc
+        # request nào: request đầu bị huỷ (client ngắt) không kéo theo các request đang chờ chung
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(key, build))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._build_done(key, t))
+        return await asyncio.shield(task)
+
+    async def _build(self, key: Hashable, build: Callable[[], Awaitable[Tuple[Any, str]]]) -> Entry:
+        # chụp generation trước khi đọc Mongo: có ghi xen giữa thì entry này coi như cũ ngay
+        gens = dict(self._gens)
+        value, scope = await build()
+        body = JSONResponse(jsonable_encoder(value)).body
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry: Entry = (body, etag, time.monotonic() + self.ttl, scope, gens.get(scope, 0))
+        if self.enabled:
+            self._put(key, entry)
+        return entry
+
+    def _build_done(self, key: Hashable, task: "asyncio.Task[Entry]") -> None:
+        # bỏ khỏi inflight chỉ khi build xong (không phải khi request đầu thoát)
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # mọi request chờ đều đã huỷ -> vẫn lấy exception để asyncio không log "never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def respond(
+        self, request: Request, key: Hashable, build: Callable[[], Awaitable[Tuple[Any, str]]]
+    ) -> Response:
+        """build() -> (dữ liệu JSON, scope_key); trả 304 nếu If-None-Match khớp ETag."""
+        entry = self._get(key) if self.enabled else None
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = await self._load(key, build)
+
+        body, etag = entry[0], entry[1]
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+        inm = request.headers.get("if-none-match")
+        if inm and etag_matches(inm, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def _bump(self, scope: str) -> None:
+        self._gens[scope] = self._gens.get(scope, 0) + 1
+
+    async def invalidate(self, class_id: Optional[str], type_name: Optional[str]) -> None:
+        """Gọi sau khi ghi metadata của (class_id, type_name)."""
+        scopes = _affected_scopes(class_id, type_name)
+        for s in scopes:
+            self._bump(s)
+        self.invalidations += 1
+
+        if self.shared:
+            from app.db.mongo_client import get_mongo_db
+
+            try:
+                await get_mongo_db()[CACHE_GENERATIONS_COLLECTION].bulk_write(
+                    [UpdateOne({"_id": s}, {"$inc": {"gen": 1}}, upsert=True) for s in scopes], ordered=False
+                )
+            except PyMongoError as e:
+                # worker khác vẫn hết hạn theo TTL
+                print("response_cache shared invalidate failed:", e)
+
+    async def sync(self) -> int:
+        """Đọc generation chung trong Mongo; scope nào worker khác đã tăng -> bỏ entry local của scope đó."""
+        from app.db.mongo_client import get_mongo_db
+
+        changed = 0
+        async for doc in get_mongo_db()[CACHE_GENERATIONS_COLLECTION].find({}, {"gen": 1}):
+            scope, gen = str(doc["_id"]), int(doc.get("gen") or 0)
+            if self._remote_seen.get(scope) != gen:
+                self._remote_seen[scope] = gen
+                self._bump(scope)
+                changed += 1
+        return changed
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("response_cache sync failed:", e)
+            await asyncio.sleep(RESPONSE_CACHE_SYNC_SECONDS)
+
+    def start(self) -> None:
+        if self.shared and self.enabled and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self) -> None:
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "shared": self.shared,
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_MAX_ENTRIES if RESPONSE_CACHE_ENABLED else 0,
+    RESPONSE_CACHE_TTL_SECONDS,
+    shared=RESPONSE_CACHE_SHARED,
+)
+register_cache("response", response_cache.stats)
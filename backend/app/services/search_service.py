@@ -0,0 +1,46 @@
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+SEARCH_FIELD = "search_tokens"
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# dấu thanh/dấu phụ sau khi tách NFD (khối Combining Diacritical Marks)
+_MARKS_RE = re.compile("[\u0300-\u036f]")
+
+
+def normalize_text(text: str) -> str:
+    """Bỏ dấu tiếng Việt + lowercase: 'Đại số 10' -> 'dai so 10'."""
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    # regex 1 lượt nhanh hơn duyệt từng ký tự (index full-text tokenize toàn bộ content chunks)
+    return _MARKS_RE.sub("", unicodedata.normalize("NFD", text)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def build_search_tokens(name: Optional[str], url: Optional[str]) -> List[str]:
+    """Token (đã bỏ dấu) của name + tên file trong url (hoặc object_name), lưu vào field search_tokens."""
+    tokens: List[str] = tokenize(name or "")
+    if url:
+        tokens += tokenize(Path(unquote(urlparse(url).path)).stem)
+    # giữ thứ tự, bỏ trùng
+    return list(dict.fromkeys(tokens))
+
+
+def build_search_filter(q: str) -> Dict[str, Any]:
+    """
+    Mỗi từ trong q phải là prefix của 1 token -> regex neo đầu chuỗi (^...) trên field
+    đã chuẩn hoá, Mongo dùng được index multikey thay vì quét cả collection.
+    q không ra token nào (vd "%%", "!!") -> filter không khớp doc nào, không phải "không lọc".
+    """
+    words = tokenize(q)
+    if not words:
+        # $in rỗng: không khớp gì, vẫn đi qua index (bound rỗng) -> không quét collection
+        return {SEARCH_FIELD: {"$in": []}}
+    return {"$and": [{SEARCH_FIELD: {"$regex": f"^{re.escape(w)}"}} for w in words]}
+
@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.core.config import TREE_MAX_NODES
+from app.db.mongo_client import get_mongo_db
+from app.services.document_view_service import _dt_to_iso
+from app.services.mongo_metadata_service import COLLECTION_MAP, HIERARCHY
+
+
+def _level_pipeline(type_name: str, base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # sort trước limit -> cắt ổn định giữa các lần gọi (không thì Mongo trả tập tuỳ ý khi vượt giới hạn)
+    return [
+        {"$match": {**base, "type_name": type_name}},
+        {"$sort": {"level": 1, "_id": 1}},
+        {"$limit": TREE_MAX_NODES},
+        {
+            "$project": {
+                "_id": 1,
+                "type_name": 1,
+                "parent_id": 1,
+                "name": f"${type_name}_name",
+                "url": f"${type_name}_url",
+                "updated_at": 1,
+            }
+        },
+    ]
+
+
+def _count_pipeline(type_name: str, base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Chỉ đếm con của level cuối (để FE biết node nào mở rộng tiếp được), không trả node."""
+    return [
+        {"$match": {**base, "type_name": type_name, "parent_id": {"$ne": None}}},
+        {"$group": {"_id": "$parent_id", "n": {"$sum": 1}}},
+        {"$project": {"_id": 0, "count_for": "$_id", "n": 1}},
+    ]
+
+
+async def build_tree(
+    *,
+    class_id: str,
+    root_id: Optional[ObjectId],
+    root_type: Optional[str],
+    depth: int,
+) -> Dict[str, Any]:
+    """
+    Lấy cả cây con trong 1 aggregation ($unionWith qua các collection theo level),
+    lọc bằng ancestors (materialized path, có index) thay vì duyệt từng node.
+    - root_id rỗng: gốc là các subject của lớp
+    - depth: số level trả về; level kế tiếp chỉ trả child_count (mở rộng lazy bằng root_id)
+    - orphans: node không gắn được vào cây (cha không nằm trong kết quả)
+    """
+    start = 0 if root_type is None else HIERARCHY.index(root_type) + 1
+    levels = HIERARCHY[start:start + depth]
+    count_level = HIERARCHY[start + depth] if start + depth < len(HIERARCHY) else None
+
+    if not levels:
+        return {"root_id": str(root_id) if root_id else None, "count": 0, "items": []}
+
+    base: Dict[str, Any] = {"status": {"$ne": "deleted"}}
+    if class_id.strip().lower() != "all":
+        base["class_id"] = str(class_id)
+    if root_id is not None:
+        base["ancestors"] = root_id
+
+    pipeline: List[Dict[str, Any]] = _level_pipeline(levels[0], base)
+    for t in levels[1:]:
+        pipeline.append({"$unionWith": {"coll": COLLECTION_MAP[t], "pipeline": _level_pipeline(t, base)}})
+    if count_level:
+        pipeline.append({"$unionWith": {"coll": COLLECTION_MAP[count_level], "pipeline": _count_pipeline(count_level, base)}})
+
+    db = get_mongo_db()
+    nodes: Dict[ObjectId, Dict[str, Any]] = {}
+    order: List[ObjectId] = []
+    leaf_counts: Dict[ObjectId, int] = {}
+
+    async for row in db[COLLECTION_MAP[levels[0]]].aggregate(pipeline):
+        if "count_for" in row:
+            leaf_counts[row["count_for"]] = int(row["n"])
+            continue
+        nodes[row["_id"]] = {
+            "id": str(row["_id"]),
+            "type_name": row.get("type_name"),
+            "name": row.get("name") or "",
+            "url": row.get("url"),
+            "last_updated": _dt_to_iso(row.get("updated_at")),
+            "parent_id": row.get("parent_id"),
+            "children": [],
+        }
+        order.append(row["_id"])
+
+    roots: List[Dict[str, Any]] = []
+    # cha không có trong kết quả (đã xoá, chưa gán parent_id, hoặc bị cắt bởi TREE_MAX_NODES)
+    # -> trả riêng thay vì bỏ mất node
+    orphans: List[Dict[str, Any]] = []
+    for oid in order:
+        node = nodes[oid]
+        parent = nodes.get(node["parent_id"])
+        if parent is not None:
+            parent["children"].append(node)
+        elif node["type_name"] == levels[0]:
+            roots.append(node)
+        else:
+            orphans.append(node)
+
+    per_level: Dict[str, int] = {}
+    for oid, node in nodes.items():
+        per_level[node["type_name"]] = per_level.get(node["type_name"], 0) + 1
+        if node["type_name"] == levels[-1]:
+            node["child_count"] = leaf_counts.get(oid, 0)
+            node["children"] = None  # chưa tải -> FE gọi lại với root_id=node.id
+        else:
+            node["child_count"] = len(node["children"])
+        node["has_children"] = node["child_count"] > 0
+        node["parent_id"] = str(node["parent_id"]) if node["parent_id"] else None
+
+    roots.sort(key=lambda n: n["name"])
+    return {
+        "root_id": str(root_id) if root_id else None,
+        "levels": levels,
+        "count": len(nodes),
+        "truncated": any(n >= TREE_MAX_NODES for n in per_level.values()),
+        "items": roots,
+        "orphan_count": len(orphans),
+        "orphans": orphans,
+    }
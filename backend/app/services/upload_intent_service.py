@@ -0,0 +1,344 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import anyio
+from bson import ObjectId
+from fastapi import HTTPException
+from minio.datatypes import Part
+from minio.error import S3Error
+from pymongo import ReturnDocument
+
+from app.core.config import (
+    MAX_FILE_SIZE_BYTES,
+    PART_SIZE_BYTES,
+    UPLOAD_INTENT_COMPLETING_TIMEOUT_MINUTES,
+    UPLOAD_INTENT_EXPIRE_MINUTES,
+    UPLOAD_INTENT_SWEEP_LIMIT,
+)
+from app.db.minio_client import minio_client, multipart_uploads, ensure_bucket, build_public_url
+from app.db.mongo_client import get_mongo_db
+from app.services.minio_paths import (
+    bucket_from_class_id,
+    intent_object_name,
+    make_object_name,
+    staging_object_name,
+    TYPE_PREFIX,
+)
+from app.services.minio_service import copy_object
+from app.services.job_service import enqueue_job
+from app.services.mongo_metadata_service import COLLECTION_MAP, upsert_entity_metadata
+
+INTENTS_COLLECTION = "upload_intents"
+
+
+def _presign_put(bucket: str, object_name: str, extra: Optional[Dict[str, str]] = None) -> str:
+    return minio_client.get_presigned_url(
+        "PUT",
+        bucket,
+        object_name,
+        expires=timedelta(minutes=UPLOAD_INTENT_EXPIRE_MINUTES),
+        extra_query_params=extra,
+    )
+
+
+def _prepare_upload(bucket: str, object_name: str, size_bytes: int, content_type: str) -> Dict[str, Any]:
+    """
+    object_name = key tạm của intent (không phải object của document nào).
+    File <= PART_SIZE -> 1 URL PUT.
+    File lớn -> tạo multipart upload, ký URL cho từng part (client PUT song song được).
+    """
+    ensure_bucket(bucket)
+
+    if size_bytes <= PART_SIZE_BYTES or not multipart_uploads.available:
+        return {"multipart": False, "upload_id": None, "url": _presign_put(bucket, object_name)}
+
+    upload_id = multipart_uploads.create(bucket, object_name, content_type)
+    n_parts = math.ceil(size_bytes / PART_SIZE_BYTES)
+    parts = [
+        {
+            "part_number": i,
+            "size_bytes": min(PART_SIZE_BYTES, size_bytes - (i - 1) * PART_SIZE_BYTES),
+            "url": _presign_put(bucket, object_name, {"partNumber": str(i), "uploadId": upload_id}),
+        }
+        for i in range(1, n_parts + 1)
+    ]
+    return {"multipart": True, "upload_id": upload_id, "part_size": PART_SIZE_BYTES, "parts": parts}
+
+
+async def create_upload_intent(
+    *,
+    class_id: str,
+    type_name: str,
+    filename: str,
+    size_bytes: int,
+    content_type: str,
+    metadata: Dict[str, Any],
+    created_by: str,
+) -> Dict[str, Any]:
+    bucket = bucket_from_class_id(class_id)
+    # kiểm tra filename như upload thường (object thật của document chỉ được chọn lúc complete)
+    source_object = make_object_name(type_name, filename)
+    content_type = content_type or "application/octet-stream"
+
+    # browser PUT vào key tạm riêng của intent -> không ghi đè được file nào đang có
+    oid = ObjectId()
+    staging = staging_object_name(str(oid))
+    try:
+        prepared = await anyio.to_thread.run_sync(_prepare_upload, bucket, staging, size_bytes, content_type)
+    except S3Error as e:
+        raise HTTPException(status_code=500, detail=f"MinIO presign error: {e.code} - {e.message}")
+
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=UPLOAD_INTENT_EXPIRE_MINUTES)
+
+    await get_mongo_db()[INTENTS_COLLECTION].insert_one(
+        {
+            "_id": oid,
+            "class_id": class_id,
+            "type_name": type_name,
+            "bucket": bucket,
+            "staging_object": staging,
+            "source_object": source_object,
+            "original_filename": filename,
+            "content_type": content_type,
+            "size_bytes": size_bytes,
+            "metadata": metadata,
+            "upload_id": prepared["upload_id"],
+            "status": "pending",
+            "created_by": created_by,
+            "created_at": now,
+            "expires_at": expires_at,
+        }
+    )
+
+    return {
+        "intent_id": str(oid),
+        "bucket": bucket,
+        "object_name": staging,
+        "expires_at": expires_at,
+        **prepared,
+    }
+
+
+async def _claim_intent(intent_id: str, status: str) -> Dict[str, Any]:
+    """Chuyển intent pending -> status (atomic, tránh complete 2 lần)."""
+    try:
+        oid = ObjectId(intent_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="intent_id không hợp lệ")
+
+    intent = await get_mongo_db()[INTENTS_COLLECTION].find_one_and_update(
+        {"_id": oid, "status": "pending"},
+        {"$set": {"status": status, "claimed_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not intent:
+        raise HTTPException(status_code=404, detail="Không tìm thấy upload intent (hoặc đã xử lý)")
+
+    expires_at = intent["expires_at"]
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        await _set_status(oid, "expired")
+        await _discard_upload(intent)
+        raise HTTPException(status_code=410, detail="Upload intent đã hết hạn")
+    return intent
+
+
+async def _set_status(oid: ObjectId, status: str, **extra: Any) -> None:
+    await get_mongo_db()[INTENTS_COLLECTION].update_one({"_id": oid}, {"$set": {"status": status, **extra}})
+
+
+def _staging(intent: Dict[str, Any]) -> str:
+    # intent tạo trước khi có key tạm ghi thẳng vào object_name
+    return intent.get("staging_object") or intent["object_name"]
+
+
+def _finish_object(intent: Dict[str, Any], parts: Optional[List[Part]]):
+    bucket, staging = intent["bucket"], _staging(intent)
+    if intent.get("upload_id"):
+        try:
+            multipart_uploads.complete(bucket, staging, intent["upload_id"], parts or [])
+        except S3Error as e:
+            # complete lần trước đã chốt multipart rồi lỗi ở bước sau -> object tạm đã có, dùng luôn
+            if e.code != "NoSuchUpload":
+                raise
+    return minio_client.stat_object(bucket, staging)
+
+
+def _discard_sync(intent: Dict[str, Any]) -> None:
+    """Huỷ multipart dở + xoá key tạm (chỉ intent này ghi vào, không phải object của document)."""
+    bucket = intent["bucket"]
+    if intent.get("upload_id"):
+        try:
+            multipart_uploads.abort(bucket, _staging(intent), intent["upload_id"])
+        except S3Error:
+            pass
+    if intent.get("staging_object"):
+        minio_client.remove_object(bucket, intent["staging_object"])
+
+
+async def _discard_upload(intent: Dict[str, Any]) -> None:
+    try:
+        await anyio.to_thread.run_sync(_discard_sync, intent)
+    except S3Error as e:
+        print("upload intent cleanup failed:", intent["_id"], e)
+
+
+def _copy_name(intent: Dict[str, Any]) -> str:
+    return intent_object_name(intent["type_name"], str(intent["_id"]), intent["original_filename"])
+
+
+async def _drop_copy(intent: Dict[str, Any]) -> None:
+    """Xoá bản copy intents/<id> nếu chưa document nào trỏ tới (upsert lỗi / process chết giữa chừng)."""
+    object_name = _copy_name(intent)
+    coll = get_mongo_db()[COLLECTION_MAP[intent["type_name"]]]
+    flt = {"class_id": intent["class_id"], "type_name": intent["type_name"], "object.object_name": object_name}
+    if intent.get("source_object"):
+        # index class_type_source_object
+        flt["source_object"] = intent["source_object"]
+    if await coll.find_one(flt, {"_id": 1}):
+        return
+    try:
+        await anyio.to_thread.run_sync(minio_client.remove_object, intent["bucket"], object_name)
+    except S3Error as e:
+        print("upload intent copy cleanup failed:", intent["_id"], e)
+
+
+async def complete_upload_intent(
+    intent_id: str,
+    *,
+    parts: Optional[List[Dict[str, Any]]],
+    completed_by: str,
+) -> Dict[str, Any]:
+    """
+    Client đã PUT xong lên key tạm -> chốt multipart, kiểm tra size, copy phía server sang object
+    riêng của intent (URL presigned không ghi vào đó được nữa), upsert metadata Mongo.
+    Lỗi bất kỳ sau khi claim -> intent về lại pending (key tạm còn nguyên), client gọi complete lại được.
+    """
+    intent = await _claim_intent(intent_id, "completing")
+    try:
+        return await _complete_claimed(intent, parts, completed_by)
+    except BaseException:
+        # nhánh đã tự chuyển rejected/completed thì không đè (filter theo completing)
+        await get_mongo_db()[INTENTS_COLLECTION].update_one(
+            {"_id": intent["_id"], "status": "completing"}, {"$set": {"status": "pending"}}
+        )
+        raise
+
+
+async def _complete_claimed(
+    intent: Dict[str, Any], parts: Optional[List[Dict[str, Any]]], completed_by: str
+) -> Dict[str, Any]:
+    oid = intent["_id"]
+    bucket = intent["bucket"]
+
+    minio_parts = None
+    if intent.get("upload_id"):
+        if not parts:
+            raise HTTPException(status_code=400, detail="Thiếu danh sách parts cho multipart upload")
+        minio_parts = [
+            Part(int(p["part_number"]), str(p["etag"]).strip('"'))
+            for p in sorted(parts, key=lambda p: int(p["part_number"]))
+        ]
+
+    try:
+        stat = await anyio.to_thread.run_sync(_finish_object, intent, minio_parts)
+    except S3Error as e:
+        raise HTTPException(status_code=400, detail=f"Object chưa upload xong: {e.code} - {e.message}")
+
+    size_bytes = int(stat.size or 0)
+    if size_bytes != int(intent["size_bytes"]) or size_bytes > MAX_FILE_SIZE_BYTES:
+        await _set_status(oid, "rejected")
+        await _discard_upload(intent)
+        raise HTTPException(status_code=400, detail="Kích thước file upload không khớp với intent")
+
+    object_name = _copy_name(intent)
+    try:
+        res = await anyio.to_thread.run_sync(copy_object, bucket, _staging(intent), object_name)
+    except S3Error as e:
+        raise HTTPException(status_code=500, detail=f"MinIO copy error: {e.code} - {e.message}")
+
+    minio_info = {
+        "bucket": bucket,
+        "type_name": intent["type_name"],
+        "prefix": TYPE_PREFIX[intent["type_name"]],
+        "object_name": object_name,
+        "source_object": intent.get("source_object") or make_object_name(intent["type_name"], intent["original_filename"]),
+        "original_filename": intent["original_filename"],
+        "content_type": stat.content_type or intent["content_type"],
+        "size_bytes": size_bytes,
+        "etag": getattr(res, "etag", None) or stat.etag,
+        "last_modified": getattr(res, "last_modified", None) or stat.last_modified,
+        "public_url": build_public_url(bucket, object_name),
+        "status": "ok",
+    }
+
+    try:
+        mongo_res = await upsert_entity_metadata(
+            class_id=intent["class_id"],
+            type_name=intent["type_name"],
+            metadata=dict(intent.get("metadata") or {}),
+            minio_info=minio_info,
+            created_by=completed_by,
+        )
+    except BaseException:
+        # chưa document nào trỏ tới bản copy -> xoá; key tạm giữ lại cho lần complete sau
+        await _drop_copy(intent)
+        raise
+
+    await _set_status(oid, "completed", completed_at=datetime.now(timezone.utc), object_name=object_name)
+    # document đã trỏ sang bản copy -> giờ mới bỏ key tạm
+    await _discard_upload({**intent, "upload_id": None})
+
+    # object không đi qua API nên chưa băm -> job hash_object (chuyển sang object theo hash + content_index)
+    doc = mongo_res.get("document") or {}
+    jobs: Dict[str, Any] = {}
+    if doc.get("_id"):
+        try:
+            jobs["hash_object"] = await enqueue_job(
+                "hash_object",
+                {"type_name": intent["type_name"], "doc_id": str(doc["_id"]), "bucket": bucket, "object_name": object_name},
+            )
+        except Exception as e:
+            # upload đã xong, document dùng được (trỏ bản copy) -> chỉ mất bước khử trùng lặp
+            print("enqueue hash_object failed:", doc["_id"], e)
+            jobs["hash_object"] = None
+    return {"minio": minio_info, "mongo": mongo_res, "jobs": jobs}
+
+
+async def abort_upload_intent(intent_id: str) -> None:
+    intent = await _claim_intent(intent_id, "aborted")
+    await _discard_upload(intent)
+
+
+async def sweep_expired_intents(limit: int = UPLOAD_INTENT_SWEEP_LIMIT) -> Dict[str, int]:
+    """
+    Intent pending quá hạn (client bỏ dở, không complete/abort) -> expired + huỷ multipart,
+    xoá key tạm (+ bản copy chưa document nào dùng); không thì part đã PUT nằm lại MinIO mãi.
+    Claim từng intent (an toàn nhiều process).
+    """
+    coll = get_mongo_db()[INTENTS_COLLECTION]
+    now = datetime.now(timezone.utc)
+
+    # kẹt ở completing (process chết giữa lúc complete) -> về pending: client complete lại được,
+    # hoặc hết hạn ở vòng dưới như intent bỏ dở
+    stuck = await coll.update_many(
+        {"status": "completing", "claimed_at": {"$lt": now - timedelta(minutes=UPLOAD_INTENT_COMPLETING_TIMEOUT_MINUTES)}},
+        {"$set": {"status": "pending"}},
+    )
+
+    swept = 0
+    while swept < limit:
+        intent = await coll.find_one_and_update(
+            {"status": "pending", "expires_at": {"$lt": now}},
+            {"$set": {"status": "expired"}},
+            sort=[("expires_at", 1)],
+        )
+        if intent is None:
+            break
+        await _discard_upload(intent)
+        await _drop_copy(intent)
+        swept += 1
+    return {"swept": swept, "released": stuck.modified_count}
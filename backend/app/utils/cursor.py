@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+def encode_cursor(updated_at: Any, doc_id: ObjectId) -> str:
+    """
+    Cursor mờ (opaque) cho keyset pagination theo (updated_at, _id).
+    updated_at: Date (chuẩn) / số / chuỗi (dữ liệu cũ chưa backfill) / None; kiểu khác coi như None.
+    """
+    if isinstance(updated_at, datetime):
+        data = {"u": updated_at.isoformat(), "i": str(doc_id)}
+    elif isinstance(updated_at, (int, float, str)) and not isinstance(updated_at, bool):
+        data = {"u": None, "v": updated_at, "i": str(doc_id)}
+    else:
+        data = {"u": None, "i": str(doc_id)}
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if data.get("u"):
+            updated_at = datetime.fromisoformat(data["u"])
+            # Mongo trả datetime naive (UTC) -> đưa cursor về cùng dạng để so sánh
+            if updated_at.tzinfo is not None:
+                updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+        else:
+            updated_at = data.get("v")
+            if isinstance(updated_at, bool) or not isinstance(updated_at, (int, float, str, type(None))):
+                raise ValueError("cursor value")
+        return updated_at, ObjectId(data["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor không hợp lệ")
@@ -0,0 +1,281 @@
+"""
+Metrics kiểu Prometheus (text exposition format 0.0.4), không thêm dependency:
+Counter / Gauge / Histogram có label, CallbackMetric đọc số liệu sẵn có (pool.stats(), cache...) lúc scrape.
+Thread-safe: được cập nhật cả từ thread pool (put_object, bcrypt) lẫn event loop.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# giây: từ 1ms (cache hit, jwt) tới 60s (upload file lớn)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def samples(self) -> Iterable[Tuple[str, LabelKey, Optional[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_fmt_labels(key, extra)} {_fmt_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield self.name, key, None, v
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [count theo bucket (không cộng dồn) ..., +Inf], sum
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[i] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: Any):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        for key, counts, total in items:
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                yield f"{self.name}_bucket", key, ("le", _fmt_value(le)), acc
+            yield f"{self.name}_sum", key, None, total
+            yield f"{self.name}_count", key, None, acc
+
+
+class CallbackMetric(_Metric):
+    """Giá trị lấy lúc scrape: fn() -> [(labels, value)] (gauge hoặc counter đã có sẵn ở chỗ khác)."""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Iterable[Tuple[Dict[str, Any], float]]], type_name: str = "gauge") -> None:
+        super().__init__(name, help_text)
+        self.type_name = type_name
+        self._fn = fn
+
+    def samples(self):
+        try:
+            rows = list(self._fn())
+        except Exception:
+            rows = []
+        for labels, v in rows:
+            if v is not None:
+                yield self.name, _key(labels), None, v
+
+
+def render_metrics() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===== metric dùng chung =====
+
+HTTP_REQUESTS = Counter("kltn_http_requests_total", "HTTP requests theo route/method/status")
+HTTP_SECONDS = Histogram("kltn_http_request_duration_seconds", "Thời gian xử lý HTTP request theo route")
+HTTP_IN_FLIGHT = Gauge("kltn_http_requests_in_flight", "Request đang xử lý")
+
+# từng bước trong hot path: minio_put, minio_stat, mongo_upsert, pg_acquire, jwt_decode, ...
+STAGE_SECONDS = Histogram("kltn_stage_duration_seconds", "Thời gian từng bước (MinIO/Mongo/Postgres/JWT...) theo stage")
+BYTES = Counter("kltn_bytes_total", "Số byte theo hướng: upload (ghi MinIO), dedup (bỏ qua ghi), served (trả client), export (NDJSON)")
+
+
+def stage_timer(stage: str):
+    """with stage_timer("minio_put"): ... -> ghi vào kltn_stage_duration_seconds{stage=...}."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def timed(stage: str):
+    """Decorator bấm giờ cả hàm (sync hoặc async)."""
+
+    def deco(fn):
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with stage_timer(stage):
+                    return await fn(*args, **kwargs)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+_pools: List[Any] = []
+
+
+def register_pool(pool: Any) -> None:
+    """Theo dõi 1 BoundedPool (độ bão hoà: queued/active so với workers) trong kltn_pool_*."""
+    _pools.append(pool)
+
+
+def _pool_rows(field: str):
+    return lambda: [({"pool": p.name}, p.stats()[field]) for p in list(_pools)]
+
+
+for _field, _kind, _help in (
+    ("workers", "gauge", "Số worker của pool"),
+    ("queued", "gauge", "Job đang chờ worker"),
+    ("active", "gauge", "Job đang chạy"),
+    ("max_queued", "gauge", "Hàng đợi dài nhất từng thấy"),
+    ("completed", "counter", "Job xong"),
+    ("failed", "counter", "Job lỗi"),
+):
+    CallbackMetric(
+        f"kltn_pool_{_field}" + ("_total" if _kind == "counter" else ""), _help, _pool_rows(_field), type_name=_kind
+    )
+
+
+_caches: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+
+def register_cache(name: str, stats_fn: Callable[[], Dict[str, Any]]) -> None:
+    """Cache in-process (token, object, ...): stats_fn() -> {hits, misses, size} cho kltn_cache_*."""
+    _caches.append((name, stats_fn))
+
+
+def _cache_rows(field: str):
+    return lambda: [({"cache": name}, fn().get(field)) for name, fn in list(_caches)]
+
+
+CallbackMetric("kltn_cache_hits_total", "Số lần trúng cache", _cache_rows("hits"), type_name="counter")
+CallbackMetric("kltn_cache_misses_total", "Số lần trượt cache", _cache_rows("misses"), type_name="counter")
+CallbackMetric("kltn_cache_size", "Số entry đang giữ", _cache_rows("size"))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: đếm request + bấm giờ theo route template (vd /admin/documents/{doc_id})
+    thay vì path thật -> số series không phình theo id.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._route_by_endpoint: Optional[Dict[Any, str]] = None
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_by_endpoint is None or endpoint not in self._route_by_endpoint:
+            app = scope.get("app")
+            self._route_by_endpoint = {
+                getattr(r, "endpoint", None): getattr(r, "path", "") for r in getattr(app, "routes", [])
+            }
+        return self._route_by_endpoint.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(1)
+            route = self._route_label(scope)
+            method = scope.get("method", "")
+            HTTP_SECONDS.observe(time.perf_counter() - t0, route=route, method=method)
+            HTTP_REQUESTS.inc(1, route=route, method=method, status=status["code"])
@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.utils.metrics import register_pool
+
+
+class BoundedPool:
+    """
+    Thread pool có giới hạn cho việc sync/nặng CPU (put_object, bcrypt...) -> không chặn event loop.
+    Đếm job đang chờ / đang chạy và thời gian chờ trong hàng đợi.
+    """
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.wait_seconds_total = 0.0
+        register_pool(self)
+
+    def _run(self, submitted_at: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_seconds_total += time.perf_counter() - submitted_at
+        ok = False
+        try:
+            res = fn(*args, **kwargs)
+            ok = True
+            return res
+        finally:
+            with self._lock:
+                self.active -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._run, time.perf_counter(), fn, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queued": self.max_queued,
+                "avg_wait_ms": round(self.wait_seconds_total / done * 1000, 3) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,82 @@
+"""
+Benchmark inverted index full-text (BM25): thời gian nạp + latency truy vấn trên corpus
+chunk sinh tại chỗ (từ vựng phân bố Zipf như văn bản thật). Không cần Mongo.
+
+    cd backend
+    python -m benchmarks.bench_fulltext --docs 300000 --words 250 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from app.services.fulltext_service import InvertedIndex
+
+ONSETS = ["", "b", "c", "ch", "d", "g", "gi", "h", "k", "kh", "l", "m", "n", "ng", "nh", "ph", "qu", "r", "s", "t",
+          "th", "tr", "v", "x"]
+RIMES = ["a", "ai", "am", "an", "ang", "anh", "ao", "au", "ay", "ac", "ach", "at", "e", "em", "en", "eo", "et", "i",
+         "ich", "iem", "ien", "iet", "im", "in", "inh", "it", "o", "oa", "oai", "oan", "oang", "oc", "oi", "om", "on",
+         "ong", "op", "ot", "u", "ua", "uan", "uat", "uc", "ui", "um", "un", "ung", "uoc", "uong", "uot", "uy", "uyen"]
+
+
+def make_vocab():
+    """Âm tiết (đã bỏ dấu, như index lưu) -> vài nghìn term, gần với tiếng Việt thật."""
+    return [o + r for o in ONSETS for r in RIMES]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=300_000)
+    ap.add_argument("--words", type=int, default=250, help="số từ mỗi chunk")
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocab = make_vocab()
+    rnd.shuffle(vocab)
+    # Zipf: từ hạng r có xác suất ~ 1/r
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    np_rnd = np.random.default_rng(args.seed)
+    classes = ["10", "11", "12"]
+
+    idx = InvertedIndex()
+    load_s = 0.0
+    for start in range(0, args.docs, args.batch):
+        n = min(args.batch, args.docs - start)
+        words = np_rnd.choice(len(vocab), size=(n, args.words), p=weights / weights.sum())
+        batch = [(ObjectId(), rnd.choice(classes), " ".join(vocab[w] for w in row), ()) for row in words]
+        t0 = time.perf_counter()
+        idx.add_many(batch)
+        load_s += time.perf_counter() - t0
+    print(f"load: {args.docs} chunks in {load_s:.1f}s", idx.stats())
+
+    # truy vấn 1-3 từ, bỏ ~10 âm tiết phổ biến nhất (gần như từ dừng)
+    lat = []
+    for _ in range(args.queries):
+        q = " ".join(vocab[rnd.randint(10, len(vocab) - 1)] for _ in range(rnd.randint(1, 3)))
+        class_id = rnd.choice(classes + [None])
+        t = time.perf_counter()
+        idx.search(q, class_id=class_id, limit=20)
+        lat.append((time.perf_counter() - t) * 1000)
+
+    lat.sort()
+    print(
+        f"query ms: p50={statistics.median(lat):.2f} p95={lat[int(len(lat) * 0.95)]:.2f} "
+        f"p99={lat[int(len(lat) * 0.99)]:.2f} max={lat[-1]:.2f}"
+    )
+
+    # cập nhật tăng dần (upsert lại 1 chunk)
+    ids = list(idx._docno_by_id)[:2000]
+    t = time.perf_counter()
+    for oid in ids:
+        idx.add(oid, "10", " ".join(rnd.choice(vocab) for _ in range(args.words)))
+    print(f"update: {(time.perf_counter() - t) * 1000 / len(ids):.3f} ms/chunk")
+
+
+if __name__ == "__main__":
+    main()
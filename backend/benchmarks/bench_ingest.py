@@ -0,0 +1,94 @@
+"""
+Benchmark ingest: tách text + chia chunk (phần CPU của pipeline) trên process pool,
+với file mẫu sinh tại chỗ (txt, docx; pdf nếu truyền --pdf-dir). Không cần MinIO/Mongo.
+
+    cd backend
+    python -m benchmarks.bench_ingest --files 200 --paragraphs 300 --workers 4
+"""
+import argparse
+import io
+import multiprocessing
+import random
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.core.config import INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP
+from app.services.ingest_service import extract_text, split_text
+
+SENTENCES = [
+    "Đạo hàm của hàm số tại một điểm cho biết tốc độ biến thiên của hàm số tại điểm đó.",
+    "Tích phân xác định được dùng để tính diện tích hình phẳng giới hạn bởi các đường cong.",
+    "Dao động điều hoà là dao động trong đó li độ của vật là một hàm côsin theo thời gian.",
+    "Điện trường là môi trường bao quanh điện tích và tác dụng lực điện lên điện tích khác.",
+    "Phương trình bậc hai có nghiệm khi biệt thức delta lớn hơn hoặc bằng không.",
+    "Di truyền học nghiên cứu sự di truyền và biến dị của các sinh vật.",
+]
+
+_DOCX_HEAD = '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+_DOCX_TAIL = "</w:body></w:document>"
+
+
+def _paragraphs(rnd: random.Random, n: int):
+    return [" ".join(rnd.choice(SENTENCES) for _ in range(rnd.randint(2, 8))) for _ in range(n)]
+
+
+def make_txt(rnd: random.Random, n: int) -> bytes:
+    return "\n\n".join(_paragraphs(rnd, n)).encode("utf-8")
+
+
+def make_docx(rnd: random.Random, n: int) -> bytes:
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in _paragraphs(rnd, n))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("word/document.xml", _DOCX_HEAD + body + _DOCX_TAIL)
+    return buf.getvalue()
+
+
+def work(item):
+    ext, data = item
+    text = extract_text(io.BytesIO(data), ext)
+    return len(split_text(text, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--paragraphs", type=int, default=300)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--pdf-dir", default="", help="thư mục chứa file .pdf thật để đưa vào mẫu")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    items = []
+    for i in range(args.files):
+        if i % 2:
+            items.append(("docx", make_docx(rnd, args.paragraphs)))
+        else:
+            items.append(("txt", make_txt(rnd, args.paragraphs)))
+    if args.pdf_dir:
+        items += [("pdf", p.read_bytes()) for p in Path(args.pdf_dir).glob("*.pdf")]
+
+    total_mb = sum(len(d) for _, d in items) / 1024 / 1024
+
+    t0 = time.perf_counter()
+    serial_chunks = sum(work(it) for it in items)
+    serial = time.perf_counter() - t0
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+        list(pool.map(work, items[: args.workers]))  # warm-up spawn
+        t0 = time.perf_counter()
+        pool_chunks = sum(pool.map(work, items, chunksize=4))
+        pooled = time.perf_counter() - t0
+
+    assert serial_chunks == pool_chunks
+    print(f"{len(items)} file, {total_mb:.1f} MB, {pool_chunks} chunk")
+    print(f"1 process : {total_mb / serial:7.2f} MB/s  {pool_chunks / serial:9.0f} chunk/s")
+    print(f"{args.workers} process : {total_mb / pooled:7.2f} MB/s  {pool_chunks / pooled:9.0f} chunk/s")
+
+
+if __name__ == "__main__":
+    main()
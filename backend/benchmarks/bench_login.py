@@ -0,0 +1,95 @@
+"""
+Load test login: bắn N login đồng thời (đợt đầu tiết học) và đo cùng lúc latency của
+endpoint khác (GET /) để xem bcrypt có chặn event loop không.
+
+Cần server đang chạy + user có mật khẩu bcrypt (python -m app.scripts.seed_users), và httpx:
+
+    pip install httpx
+    cd backend
+    python -m benchmarks.bench_login --base-url http://127.0.0.1:8000 --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _pct(ms: list, p: float) -> float:
+    if not ms:
+        return 0.0
+    ms = sorted(ms)
+    return ms[min(len(ms) - 1, int(len(ms) * p))]
+
+
+def _summary(ms: list) -> str:
+    if not ms:
+        return "n=0"
+    return (
+        f"n={len(ms)} p50={statistics.median(ms):7.2f}ms "
+        f"p95={_pct(ms, 0.95):7.2f}ms p99={_pct(ms, 0.99):7.2f}ms max={max(ms):7.2f}ms"
+    )
+
+
+async def _login_burst(client: httpx.AsyncClient, args) -> list:
+    sem = asyncio.Semaphore(args.concurrency)
+    out = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/auth/login", json={"username": args.username, "password": args.password})
+            out.append((time.perf_counter() - t0) * 1000)
+            r.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(args.logins)))
+    return out
+
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list:
+    out = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/")
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(interval)
+    return out
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--username", default="admin")
+    ap.add_argument("--password", default="123")
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--probe-interval", type=float, default=0.01)
+    args = ap.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        baseline = [await _probe_once(client) for _ in range(50)]
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(_probe(client, stop, args.probe_interval))
+        t0 = time.perf_counter()
+        login_ms = await _login_burst(client, args)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        probe_ms = await probe_task
+
+    print(f"login throughput : {len(login_ms) / elapsed:8.1f} login/s ({len(login_ms)} trong {elapsed:.2f}s)")
+    print(f"login latency    : {_summary(login_ms)}")
+    print(f"GET / (idle)     : {_summary(baseline)}")
+    print(f"GET / (burst)    : {_summary(probe_ms)}")
+
+
+async def _probe_once(client: httpx.AsyncClient) -> float:
+    t0 = time.perf_counter()
+    await client.get("/")
+    return (time.perf_counter() - t0) * 1000
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark search documents: $regex không neo (cũ) vs prefix trên search_tokens (mới).
+
+Cần Mongo local (MONGO_URI trong .env). Dữ liệu sinh vào DB tạm `<MONGO_DB>_bench_search`
+rồi xoá khi chạy xong.
+
+    cd backend
+    python -m benchmarks.bench_search --sizes 1000 10000 100000 --queries 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import MONGO_URI, MONGO_DB
+from app.services.search_service import SEARCH_FIELD, build_search_filter, build_search_tokens
+
+WORDS = [
+    "Đại số", "Hình học", "Giải tích", "Vật lý", "Hoá học", "Sinh học", "Ngữ văn", "Lịch sử",
+    "Địa lý", "Tiếng Anh", "Hàm số", "Phương trình", "Bất đẳng thức", "Đạo hàm", "Tích phân",
+    "Dao động", "Điện trường", "Từ trường", "Quang học", "Cơ học", "Nhiệt học", "Di truyền",
+]
+
+
+def _fake_name(rnd: random.Random) -> str:
+    return " ".join(rnd.sample(WORDS, 3)) + f" bài {rnd.randint(1, 60)}"
+
+
+async def _seed(coll, n: int, rnd: random.Random) -> None:
+    await coll.drop()
+    batch = []
+    for i in range(n):
+        name = _fake_name(rnd)
+        url = f"http://127.0.0.1:9000/class-10/subjects/topics/lessons/lesson_{i}.pdf"
+        batch.append(
+            {
+                "type_name": "lesson",
+                "class_id": "10",
+                "lesson_name": name,
+                "lesson_url": url,
+                "status": "active",
+                SEARCH_FIELD: build_search_tokens(name, url),
+            }
+        )
+        if len(batch) >= 5000:
+            await coll.insert_many(batch)
+            batch = []
+    if batch:
+        await coll.insert_many(batch)
+    await coll.create_index([("type_name", 1), (SEARCH_FIELD, 1)], name="type_name_search_tokens")
+
+
+async def _time_queries(coll, filters) -> list:
+    out = []
+    for flt in filters:
+        t0 = time.perf_counter()
+        await coll.find(flt).limit(500).to_list(length=500)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _summary(ms: list) -> str:
+    ms = sorted(ms)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"p50={statistics.median(ms):7.2f}ms p95={p95:7.2f}ms"
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[f"{MONGO_DB}_bench_search"]
+    coll = db["lessons"]
+    rnd = random.Random(args.seed)
+
+    try:
+        for n in args.sizes:
+            await _seed(coll, n, rnd)
+            # query kiểu gõ dần trong ô search: 3-4 ký tự đầu của 1 từ
+            terms = [rnd.choice(WORDS).split()[0][: rnd.randint(3, 4)] for _ in range(args.queries)]
+
+            old = [
+                {"type_name": "lesson", "$or": [
+                    {"lesson_name": {"$regex": t, "$options": "i"}},
+                    {"lesson_url": {"$regex": t, "$options": "i"}},
+                ]}
+                for t in terms
+            ]
+            new = [{"type_name": "lesson", **build_search_filter(t)} for t in terms]
+
+            print(f"n={n:>8}  regex  {_summary(await _time_queries(coll, old))}")
+            print(f"n={n:>8}  prefix {_summary(await _time_queries(coll, new))}")
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,553 @@
+"""
+Benchmark end-to-end có thể chạy lại: dựng app FastAPI (uvicorn thật, thread riêng) trên stand-in
+local (benchmarks/standins.py) rồi bắn tải qua HTTP:
+
+- upload: upload đồng thời file 1–50 MB (POST /admin/minio/file, đi qua MinIO client thật tới S3 giả)
+- list:   GET /admin/documents?type_name=all trên ~10k doc (trang đầu lặp lại + duyệt hết theo cursor)
+- search: tìm theo tên (GET /admin/documents?q=) và full-text BM25 (GET /admin/search)
+- login:  login dồn dập (bcrypt) + đo GET / cùng lúc để xem event loop có bị chặn
+
+Kết quả (throughput, p50/p95/p99, RSS) ghi ra JSON; --compare so với lần chạy trước và đánh dấu
+hồi quy. Mặc định: Mongo = mongomock-motor, Postgres = pool giả, MinIO = S3 giả trong process.
+
+    pip install httpx mongomock-motor
+    cd backend
+    python -m benchmarks.bench_suite --out bench_results.json
+    python -m benchmarks.bench_suite --scenarios list search --compare bench_results.json
+
+mongomock lọc/sort bằng Python nên list/search chậm hơn mongod nhiều: số đo chỉ để so giữa các lần chạy
+cùng cấu hình. Cần số gần thực tế thì dùng mongod local: --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.standins import FakePgPool, FakeS3Server, install_mongo
+
+SCENARIOS = ("upload", "list", "search", "login")
+
+BENCH_USER = "bench_admin"
+BENCH_PASSWORD = "bench-password"
+
+WORDS = [
+    "dai so", "hinh hoc", "giai tich", "vat ly", "hoa hoc", "sinh hoc", "ngu van", "lich su",
+    "dia ly", "tieng anh", "ham so", "phuong trinh", "bat dang thuc", "dao ham", "tich phan",
+    "dao dong", "dien truong", "tu truong", "quang hoc", "co hoc", "nhiet hoc", "di truyen",
+]
+SEED_TYPES = ("subject", "topic", "lesson", "chunk")
+
+
+# ===== đo đạc =====
+
+
+def _pct(ms: List[float], p: float) -> float:
+    if not ms:
+        return 0.0
+    ms = sorted(ms)
+    return ms[min(len(ms) - 1, int(len(ms) * p))]
+
+
+def _latency(ms: List[float]) -> Dict[str, float]:
+    if not ms:
+        return {"n": 0}
+    return {
+        "n": len(ms),
+        "mean": round(statistics.fmean(ms), 2),
+        "p50": round(statistics.median(ms), 2),
+        "p95": round(_pct(ms, 0.95), 2),
+        "p99": round(_pct(ms, 0.99), 2),
+        "max": round(max(ms), 2),
+    }
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    """Lấy mẫu RSS của process (app + client) mỗi `interval` giây trong lúc chạy 1 kịch bản."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.before = self.peak = self.after = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, _rss_mb())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "RssSampler":
+        self.before = self.peak = _rss_mb()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        self.after = _rss_mb()
+        self.peak = max(self.peak, self.after)
+
+    def result(self) -> Dict[str, float]:
+        return {"before": round(self.before, 1), "peak": round(self.peak, 1), "after": round(self.after, 1)}
+
+
+async def run_load(
+    n: int, concurrency: int, one: Callable[[int], Awaitable[httpx.Response]]
+) -> Dict[str, Any]:
+    """Gọi one(i) n lần, tối đa `concurrency` cùng lúc; trả latency + throughput + số lỗi."""
+    sem = asyncio.Semaphore(concurrency)
+    ms: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def task(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await one(i)
+                ok = r.status_code < 400
+                err = str(r.status_code)
+            except httpx.HTTPError as e:
+                ok, err = False, type(e).__name__
+            ms.append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[err] = errors.get(err, 0) + 1
+
+    t0 = time.perf_counter()
+    async with RssSampler() as rss:
+        await asyncio.gather(*(task(i) for i in range(n)))
+    seconds = time.perf_counter() - t0
+    return {
+        "requests": n,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(n / seconds, 2) if seconds else 0.0,
+        "latency_ms": _latency(ms),
+        "rss_mb": rss.result(),
+    }
+
+
+# ===== app chạy trên thread riêng =====
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AppServer:
+    """uvicorn chạy app trong thread + event loop riêng; call() chạy coroutine trên loop của app."""
+
+    def __init__(self, app, before_start: Callable[[], Awaitable[None]]) -> None:
+        import uvicorn
+
+        self.port = _free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        )
+        self._before_start = before_start
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="bench-app", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._before_start())
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 30.0) -> None:
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise SystemExit("App không khởi động được (xem log ở trên)")
+            time.sleep(0.05)
+
+    def call(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+# ===== dữ liệu =====
+
+
+async def seed_documents(n: int, class_id: str, rnd: random.Random) -> Dict[str, int]:
+    """n doc chia đều subject/topic/lesson/chunk (có `object` -> list không phải stat MinIO)."""
+    from app.db.mongo_client import get_mongo_db
+    from app.services.mongo_metadata_service import COLLECTION_MAP
+    from app.services.search_service import SEARCH_FIELD, build_search_tokens
+
+    db = get_mongo_db()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    counts: Dict[str, int] = {}
+    for k, t in enumerate(SEED_TYPES):
+        docs = []
+        for i in range(k, n, len(SEED_TYPES)):
+            name = " ".join(rnd.sample(WORDS, 3)) + f" bai {i}"
+            object_name = f"{t}s/{t}_{i}.pdf"
+            url = f"http://127.0.0.1:9000/class-{class_id}/{object_name}"
+            ts = now - timedelta(seconds=i)
+            doc = {
+                "type_name": t,
+                "class_id": class_id,
+                f"{t}_name": name,
+                f"{t}_url": url,
+                "status": "active",
+                SEARCH_FIELD: build_search_tokens(name, url),
+                "object": {
+                    "bucket": f"class-{class_id}",
+                    "object_name": object_name,
+                    "size_bytes": rnd.randint(10_000, 5_000_000),
+                    "etag": f"{i:032x}",
+                    "last_modified": ts,
+                    "content_type": "application/pdf",
+                },
+                "created_at": ts,
+                "updated_at": ts,
+            }
+            if t == "chunk":
+                doc["content"] = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(40, 120)))
+                doc["chunk_index"] = i
+            docs.append(doc)
+        for j in range(0, len(docs), 5000):
+            await db[COLLECTION_MAP[t]].insert_many(docs[j : j + 5000])
+        counts[t] = len(docs)
+    return counts
+
+
+async def relax_mock_indexes() -> None:
+    """mongomock bỏ qua partialFilterExpression -> unique dedupe_key chặn cả job không có key; mongod thật không cần."""
+    from app.db.mongo_client import get_mongo_db
+    from app.services.job_service import JOBS_COLLECTION
+
+    await get_mongo_db()[JOBS_COLLECTION].drop_index("dedupe_key_queued")
+
+
+async def drop_bench_db() -> None:
+    import app.db.mongo_client as mongo_client
+
+    await mongo_client._client.drop_database(mongo_client._db.name)
+
+
+# ===== kịch bản =====
+
+
+async def scenario_upload(client: httpx.AsyncClient, args, headers: Dict[str, str]) -> Dict[str, Any]:
+    rnd = random.Random(args.seed)
+    sizes = [rnd.randint(args.upload_min_mb * 2**20, args.upload_max_mb * 2**20) for _ in range(args.uploads)]
+    types = ("subject", "topic", "lesson")
+
+    async def one(i: int) -> httpx.Response:
+        t = types[i % len(types)]
+        data = os.urandom(sizes[i])  # nội dung khác nhau -> không dính dedup
+        return await client.post(
+            "/admin/minio/file",
+            headers=headers,
+            data={"class": "10", "type": t, "metadata": json.dumps({f"{t}_name": f"bench upload {i}"})},
+            files={"file": (f"bench_{i}.pdf", data, "application/pdf")},
+            timeout=300,
+        )
+
+    res = await run_load(args.uploads, args.upload_concurrency, one)
+    total_mb = sum(sizes) / 2**20
+    res["total_mb"] = round(total_mb, 1)
+    res["mb_per_s"] = round(total_mb / res["seconds"], 2) if res["seconds"] else 0.0
+    return {"upload": res}
+
+
+async def scenario_list(client: httpx.AsyncClient, args, headers: Dict[str, str]) -> Dict[str, Any]:
+    params = {"class_id": "10", "type_name": "all", "limit": args.page_size}
+
+    async def first_page(i: int) -> httpx.Response:
+        return await client.get("/admin/documents", params=params, headers=headers)
+
+    out = {"list_first_page": await run_load(args.list_requests, args.concurrency, first_page)}
+
+    # duyệt hết theo next_cursor: thời gian để FE tải đủ danh sách
+    pages, items, ms = 0, 0, []
+    cursor = ""
+    t0 = time.perf_counter()
+    async with RssSampler() as rss:
+        while True:
+            t1 = time.perf_counter()
+            r = await client.get("/admin/documents", params={**params, "cursor": cursor}, headers=headers)
+            ms.append((time.perf_counter() - t1) * 1000)
+            r.raise_for_status()
+            body = r.json()
+            pages += 1
+            items += body["count"]
+            cursor = body.get("next_cursor") or ""
+            if not cursor:
+                break
+    seconds = time.perf_counter() - t0
+    out["list_all_pages"] = {
+        "requests": pages,
+        "items": items,
+        "seconds": round(seconds, 3),
+        "items_per_s": round(items / seconds, 1) if seconds else 0.0,
+        "latency_ms": _latency(ms),
+        "rss_mb": rss.result(),
+    }
+    return out
+
+
+async def scenario_search(client: httpx.AsyncClient, args, headers: Dict[str, str]) -> Dict[str, Any]:
+    rnd = random.Random(args.seed)
+    queries = [" ".join(rnd.sample(WORDS, rnd.randint(1, 2))) for _ in range(args.search_requests)]
+
+    async def by_name(i: int) -> httpx.Response:
+        params = {"class_id": "10", "type_name": "all", "q": queries[i].split()[0], "limit": 50}
+        return await client.get("/admin/documents", params=params, headers=headers)
+
+    async def fulltext(i: int) -> httpx.Response:
+        return await client.get("/admin/search", params={"q": queries[i], "class_id": "10"}, headers=headers)
+
+    return {
+        "search_documents": await run_load(args.search_requests, args.concurrency, by_name),
+        "search_fulltext": await run_load(args.search_requests, args.concurrency, fulltext),
+    }
+
+
+async def scenario_login(client: httpx.AsyncClient, args, headers: Dict[str, str]) -> Dict[str, Any]:
+    async def one(i: int) -> httpx.Response:
+        return await client.post("/auth/login", json={"username": BENCH_USER, "password": BENCH_PASSWORD})
+
+    # GET / chạy song song với đợt login: latency tăng vọt = bcrypt đang chặn event loop
+    stop = asyncio.Event()
+    probe_ms: List[float] = []
+
+    async def probe() -> None:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await client.get("/")
+            probe_ms.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.01)
+
+    probe_task = asyncio.create_task(probe())
+    try:
+        res = await run_load(args.logins, args.login_concurrency, one)
+    finally:
+        stop.set()
+        await probe_task
+    return {"login": res, "login_probe": {"latency_ms": _latency(probe_ms)}}
+
+
+RUNNERS = {
+    "upload": scenario_upload,
+    "list": scenario_list,
+    "search": scenario_search,
+    "login": scenario_login,
+}
+
+
+# ===== so sánh =====
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """In bảng p95/throughput so với baseline; trả danh sách kịch bản hồi quy quá threshold (tỉ lệ)."""
+    regressions: List[str] = []
+    print(f"\n{'scenario':<20} {'p95 base':>10} {'p95 now':>10} {'Δ':>8}   {'rps base':>9} {'rps now':>9} {'Δ':>8}")
+    for name, cur in current["results"].items():
+        if "error" in cur:
+            # kịch bản không chạy được -> luôn tính là hồi quy, không bỏ qua im lặng
+            regressions.append(name)
+            print(f"{name:<20} ERROR: {cur['error']}   <-- REGRESSION")
+            continue
+        base = baseline.get("results", {}).get(name)
+        if not base or "error" in base:
+            continue
+        p95_b, p95_c = base.get("latency_ms", {}).get("p95"), cur.get("latency_ms", {}).get("p95")
+        rps_b, rps_c = base.get("throughput_rps"), cur.get("throughput_rps")
+        d_p95 = (p95_c / p95_b - 1) if p95_b and p95_c is not None else None
+        d_rps = (rps_c / rps_b - 1) if rps_b and rps_c is not None else None
+        bad = (d_p95 is not None and d_p95 > threshold) or (d_rps is not None and d_rps < -threshold)
+        if bad:
+            regressions.append(name)
+
+        def fmt(v, pct=False):
+            if v is None:
+                return "-"
+            return f"{v * 100:+.1f}%" if pct else f"{v:.2f}"
+
+        print(
+            f"{name:<20} {fmt(p95_b):>10} {fmt(p95_c):>10} {fmt(d_p95, True):>8}   "
+            f"{fmt(rps_b):>9} {fmt(rps_c):>9} {fmt(d_rps, True):>8}" + ("   <-- REGRESSION" if bad else "")
+        )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===== main =====
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--out", default="bench_results.json", help="file JSON kết quả")
+    ap.add_argument("--compare", default="", help="JSON của lần chạy trước để so sánh")
+    ap.add_argument("--threshold", type=float, default=0.10, help="hồi quy khi p95 tăng / rps giảm quá tỉ lệ này")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit code 1 nếu có hồi quy")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--concurrency", type=int, default=16, help="cho list/search")
+    ap.add_argument("--docs", type=int, default=10000, help="số doc seed cho list/search")
+    ap.add_argument("--page-size", type=int, default=500)
+    ap.add_argument("--list-requests", type=int, default=50)
+    ap.add_argument("--search-requests", type=int, default=200)
+    ap.add_argument("--uploads", type=int, default=12)
+    ap.add_argument("--upload-concurrency", type=int, default=4)
+    ap.add_argument("--upload-min-mb", type=int, default=1)
+    ap.add_argument("--upload-max-mb", type=int, default=50)
+    ap.add_argument("--logins", type=int, default=50)
+    ap.add_argument("--login-concurrency", type=int, default=50)
+    ap.add_argument("--mongo-uri", default="", help="mongod local thay vì mongomock-motor (dùng DB tạm rồi xoá)")
+    ap.add_argument("--pg-latency-ms", type=float, default=0.5, help="độ trễ mỗi query của pool Postgres giả")
+    ap.add_argument("--pg-pool-size", type=int, default=10)
+    args = ap.parse_args()
+
+    # stand-in phải có trước khi import app (config đọc env lúc import)
+    s3 = FakeS3Server().start()
+    os.environ.update(
+        {
+            "MINIO_ENDPOINT": s3.endpoint,
+            "MINIO_SECURE": "false",
+            "MINIO_PUBLIC_BASE_URL": f"http://{s3.endpoint}",
+            "JOBS_ENABLED": "false",  # job nền (ingest/keyword) không tranh CPU với phép đo
+        }
+    )
+    db_name = f"kltn_bench_{os.getpid()}"
+    install_mongo(args.mongo_uri or None, db_name)
+
+    from app.db.postgres import pg
+    from app.main import app
+    from app.security import create_access_token, hash_password
+    from app.services.fulltext_service import load_fulltext_index
+
+    # kịch bản không chạy được -> ghi lỗi vào kết quả (JSON + --compare thấy) và exit code 1
+    errors: Dict[str, str] = {}
+    try:
+        password_hash = hash_password(BENCH_PASSWORD)
+    except ValueError as e:
+        # passlib 1.7.4 + bcrypt >= 4.1 không hash được -> không đo login (toàn 500) nhưng không im lặng
+        print("hash_password failed, kịch bản login lỗi:", e)
+        password_hash = None
+        if "login" in args.scenarios:
+            errors["login"] = f"hash_password failed: {e}"
+            args.scenarios = [s for s in args.scenarios if s != "login"]
+    users = {
+        BENCH_USER: {
+            "user_id": 1,
+            "username": BENCH_USER,
+            "full_name": "Bench Admin",
+            "role": "admin",
+            "password_hash": password_hash,
+        }
+    }
+
+    async def before_start() -> None:
+        # pool giả tạo trên loop của app; pg.connect() thấy pool có sẵn thì bỏ qua
+        pg.pool = FakePgPool(users, max_size=args.pg_pool_size, latency=args.pg_latency_ms / 1000)
+
+    server = AppServer(app, before_start)
+    server.start()
+
+    meta: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "mongo": "mongod" if args.mongo_uri else "mongomock-motor",
+        "postgres": f"fake pool (size={args.pg_pool_size}, latency={args.pg_latency_ms}ms)",
+        "minio": "in-process fake S3",
+        "args": vars(args),
+    }
+    results: Dict[str, Any] = {}
+    try:
+        if not args.mongo_uri:
+            server.call(relax_mock_indexes())
+        if {"list", "search"} & set(args.scenarios):
+            t0 = time.perf_counter()
+            meta["seeded"] = server.call(seed_documents(args.docs, "10", random.Random(args.seed)))
+            meta["fulltext"] = server.call(load_fulltext_index())
+            meta["seed_seconds"] = round(time.perf_counter() - t0, 2)
+
+        headers = {"Authorization": "Bearer " + create_access_token({"sub": BENCH_USER, "role": "admin"})}
+
+        async def drive() -> None:
+            limits = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+            async with httpx.AsyncClient(base_url=server.base_url, timeout=120, limits=limits) as client:
+                for name in args.scenarios:
+                    print(f"== {name}", flush=True)
+                    res = await RUNNERS[name](client, args, headers)
+                    for k, v in res.items():
+                        lat = v.get("latency_ms", {})
+                        print(
+                            f"  {k:<18} rps={v.get('throughput_rps', '-')!s:>8} "
+                            f"p50={lat.get('p50', '-')} p95={lat.get('p95', '-')} p99={lat.get('p99', '-')} "
+                            f"errors={v.get('errors', {})}",
+                            flush=True,
+                        )
+                    results.update(res)
+
+        asyncio.run(drive())
+        meta["fake_s3"] = s3.stats()
+    finally:
+        try:
+            server.call(drop_bench_db(), timeout=60)
+        except Exception as e:
+            print("drop bench db failed:", e)
+        server.stop()
+        s3.stop()
+
+    for name, err in errors.items():
+        results[name] = {"error": err}
+    report = {"meta": meta, "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    print(f"\nĐã ghi {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+    if errors:
+        print("Kịch bản lỗi:", ", ".join(errors))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
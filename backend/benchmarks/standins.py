@@ -0,0 +1,438 @@
+"""
+Stand-in cho MinIO / Mongo / Postgres để chạy benchmark không cần dịch vụ thật (dùng bởi bench_suite):
+
+- FakeS3Server: S3 tối giản chạy trong process (ThreadingHTTPServer), object ghi ra thư mục tạm.
+  Đủ API mà minio-py dùng trong app: bucket (HEAD/PUT/?location), list buckets, ListObjectsV2,
+  put (1 lần + multipart), copy (x-amz-copy-source), HEAD/GET (có Range), DELETE. Client minio thật -> vẫn đo cả HTTP + ký request.
+- install_mongo(uri): None -> mongomock-motor (pip install mongomock-motor), còn lại -> mongod thật.
+- FakePgPool: pool asyncpg giả (acquire/release/fetchrow) với bảng users trong RAM, độ trễ query giả lập.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class _S3Store:
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, datetime] = {}
+        # (bucket, key) -> {path, size, etag, content_type, last_modified}
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # upload_id -> {bucket, key, content_type, parts: {n: (path, etag)}}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+
+    def new_path(self) -> str:
+        return os.path.join(self.root, uuid.uuid4().hex)
+
+    def commit(self, bucket: str, key: str, path: str, size: int, etag: str, content_type: str) -> None:
+        with self.lock:
+            old = self.objects.get((bucket, key))
+            self.objects[(bucket, key)] = {
+                "path": path,
+                "size": size,
+                "etag": etag,
+                "content_type": content_type,
+                "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+            }
+        if old:
+            _unlink(old["path"])
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: _S3Store
+
+    def log_message(self, *args) -> None:  # im lặng, benchmark không cần access log
+        pass
+
+    # ----- helpers -----
+
+    def _parts(self) -> Tuple[str, str, Dict[str, str]]:
+        u = urlsplit(self.path)
+        path = unquote(u.path).lstrip("/")
+        bucket, _, key = path.partition("/")
+        query = {k: v[0] for k, v in parse_qs(u.query, keep_blank_values=True).items()}
+        return bucket, key, query
+
+    def _body(self) -> bytes:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _xml(self, status: int, xml: str) -> None:
+        self._send(status, xml.encode(), {"Content-Type": "application/xml"})
+
+    def _error(self, status: int, code: str, bucket: str = "", key: str = "") -> None:
+        self._xml(
+            status,
+            f"<Error><Code>{code}</Code><Message>{code}</Message><Resource>/{escape(bucket)}/{escape(key)}</Resource>"
+            f"<RequestId>bench</RequestId><HostId>bench</HostId><BucketName>{escape(bucket)}</BucketName>"
+            f"<Key>{escape(key)}</Key></Error>",
+        )
+
+    def _object(self, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        if bucket not in self.store.buckets:
+            self._error(404, "NoSuchBucket", bucket, key)
+            return None
+        obj = self.store.objects.get((bucket, key))
+        if obj is None:
+            self._error(404, "NoSuchKey", bucket, key)
+        return obj
+
+    def _obj_headers(self, obj: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            "ETag": f'"{obj["etag"]}"',
+            "Last-Modified": format_datetime(obj["last_modified"], usegmt=True),
+            "Content-Type": obj["content_type"],
+            "Accept-Ranges": "bytes",
+        }
+
+    # ----- verbs -----
+
+    def do_HEAD(self) -> None:
+        bucket, key, _ = self._parts()
+        if not key:
+            self._send(200 if bucket in self.store.buckets else 404)
+            return
+        obj = self.store.objects.get((bucket, key))
+        if obj is None:
+            self._send(404)
+            return
+        self.send_response(200)
+        for k, v in self._obj_headers(obj).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(obj["size"]))
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        bucket, key, query = self._parts()
+        if not bucket:
+            items = "".join(
+                f"<Bucket><Name>{escape(b)}</Name><CreationDate>{_iso(ts)}</CreationDate></Bucket>"
+                for b, ts in sorted(self.store.buckets.items())
+            )
+            self._xml(200, f'<ListAllMyBucketsResult xmlns="{_NS}"><Buckets>{items}</Buckets></ListAllMyBucketsResult>')
+            return
+        if not key and "location" in query:
+            self._xml(200, f'<LocationConstraint xmlns="{_NS}"></LocationConstraint>')
+            return
+        if not key:
+            self._list(bucket, query)
+            return
+
+        obj = self._object(bucket, key)
+        if obj is None:
+            return
+        start, end, status = 0, obj["size"] - 1, 200
+        rng = self.headers.get("Range")
+        if rng and rng.startswith("bytes="):
+            a, _, b = rng[6:].partition("-")
+            start = int(a) if a else max(0, obj["size"] - int(b))
+            end = min(int(b), obj["size"] - 1) if a and b else obj["size"] - 1
+            status = 206
+        headers = self._obj_headers(obj)
+        if status == 206:
+            headers["Content-Range"] = f"bytes {start}-{end}/{obj['size']}"
+        length = max(0, end - start + 1)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        with open(obj["path"], "rb") as f:
+            f.seek(start)
+            left = length
+            while left > 0:
+                data = f.read(min(left, 1024 * 1024))
+                if not data:
+                    break
+                self.wfile.write(data)
+                left -= len(data)
+
+    def _list(self, bucket: str, query: Dict[str, str]) -> None:
+        if bucket not in self.store.buckets:
+            self._error(404, "NoSuchBucket", bucket)
+            return
+        prefix = query.get("prefix", "")
+        delimiter = query.get("delimiter", "")
+        url_encode = query.get("encoding-type") == "url"
+        enc = (lambda s: quote(s, safe="/")) if url_encode else escape
+
+        keys = sorted(k for (b, k) in list(self.store.objects) if b == bucket and k.startswith(prefix))
+        contents: List[str] = []
+        prefixes: List[str] = []
+        for k in keys:
+            rest = k[len(prefix):]
+            if delimiter and delimiter in rest:
+                p = prefix + rest.split(delimiter, 1)[0] + delimiter
+                if p not in prefixes:
+                    prefixes.append(p)
+                continue
+            obj = self.store.objects.get((bucket, k))
+            if obj is None:
+                continue
+            contents.append(
+                f"<Contents><Key>{enc(k)}</Key><LastModified>{_iso(obj['last_modified'])}</LastModified>"
+                f"<ETag>&quot;{obj['etag']}&quot;</ETag><Size>{obj['size']}</Size>"
+                "<StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        common = "".join(f"<CommonPrefixes><Prefix>{enc(p)}</Prefix></CommonPrefixes>" for p in prefixes)
+        self._xml(
+            200,
+            f'<ListBucketResult xmlns="{_NS}"><Name>{escape(bucket)}</Name><Prefix>{enc(prefix)}</Prefix>'
+            f"<KeyCount>{len(contents) + len(prefixes)}</KeyCount><MaxKeys>1000</MaxKeys>"
+            f"<Delimiter>{escape(delimiter)}</Delimiter><IsTruncated>false</IsTruncated>"
+            + ("<EncodingType>url</EncodingType>" if url_encode else "")
+            + "".join(contents)
+            + common
+            + "</ListBucketResult>",
+        )
+
+    def do_PUT(self) -> None:
+        bucket, key, query = self._parts()
+        body = self._body()
+        if not key:
+            self.store.buckets.setdefault(bucket, datetime.now(timezone.utc))
+            self._send(200, headers={"Location": f"/{bucket}"})
+            return
+        if bucket not in self.store.buckets:
+            self._error(404, "NoSuchBucket", bucket, key)
+            return
+        if self.headers.get("x-amz-copy-source"):
+            self._copy(bucket, key)
+            return
+
+        etag = hashlib.md5(body).hexdigest()
+        path = self.store.new_path()
+        with open(path, "wb") as f:
+            f.write(body)
+
+        upload_id = query.get("uploadId")
+        if upload_id:
+            up = self.store.uploads.get(upload_id)
+            if up is None:
+                _unlink(path)
+                self._error(404, "NoSuchUpload", bucket, key)
+                return
+            up["parts"][int(query["partNumber"])] = (path, etag, len(body))
+        else:
+            ctype = self.headers.get("Content-Type") or "application/octet-stream"
+            self.store.commit(bucket, key, path, len(body), etag, ctype)
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def _copy(self, bucket: str, key: str) -> None:
+        src_bucket, _, src_key = unquote(self.headers["x-amz-copy-source"]).lstrip("/").partition("/")
+        src = self.store.objects.get((src_bucket, src_key))
+        if src is None:
+            self._error(404, "NoSuchKey", src_bucket, src_key)
+            return
+        path = self.store.new_path()
+        shutil.copyfile(src["path"], path)
+        self.store.commit(bucket, key, path, src["size"], src["etag"], src["content_type"])
+        obj = self.store.objects[(bucket, key)]
+        self._xml(
+            200,
+            f'<CopyObjectResult xmlns="{_NS}"><LastModified>{_iso(obj["last_modified"])}</LastModified>'
+            f"<ETag>&quot;{obj['etag']}&quot;</ETag></CopyObjectResult>",
+        )
+
+    def do_POST(self) -> None:
+        bucket, key, query = self._parts()
+        self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.store.uploads[upload_id] = {
+                "bucket": bucket,
+                "key": key,
+                "content_type": self.headers.get("Content-Type") or "application/octet-stream",
+                "parts": {},
+            }
+            self._xml(
+                200,
+                f'<InitiateMultipartUploadResult xmlns="{_NS}"><Bucket>{escape(bucket)}</Bucket>'
+                f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>",
+            )
+            return
+
+        up = self.store.uploads.pop(query.get("uploadId", ""), None)
+        if up is None:
+            self._error(404, "NoSuchUpload", bucket, key)
+            return
+        # ghép part theo thứ tự; etag kiểu S3: md5(md5 từng part)-số part
+        path = self.store.new_path()
+        size, digests = 0, b""
+        with open(path, "wb") as out:
+            for n in sorted(up["parts"]):
+                part_path, part_etag, part_size = up["parts"][n]
+                with open(part_path, "rb") as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+                _unlink(part_path)
+                size += part_size
+                digests += bytes.fromhex(part_etag)
+        etag = f"{hashlib.md5(digests).hexdigest()}-{len(up['parts'])}"
+        self.store.commit(bucket, key, path, size, etag, up["content_type"])
+        self._xml(
+            200,
+            f'<CompleteMultipartUploadResult xmlns="{_NS}"><Location>/{escape(bucket)}/{escape(key)}</Location>'
+            f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><ETag>&quot;{etag}&quot;</ETag>"
+            "</CompleteMultipartUploadResult>",
+        )
+
+    def do_DELETE(self) -> None:
+        bucket, key, query = self._parts()
+        upload_id = query.get("uploadId")
+        if upload_id:
+            up = self.store.uploads.pop(upload_id, None) or {"parts": {}}
+            for part_path, _, _ in up["parts"].values():
+                _unlink(part_path)
+        else:
+            with self.store.lock:
+                obj = self.store.objects.pop((bucket, key), None)
+            if obj:
+                _unlink(obj["path"])
+        self._send(204)
+
+
+class FakeS3Server:
+    """S3 giả trên 127.0.0.1:<port ngẫu nhiên>; `endpoint` dùng cho MINIO_ENDPOINT."""
+
+    def __init__(self) -> None:
+        self._dir = tempfile.mkdtemp(prefix="kltn_bench_s3_")
+        self.store = _S3Store(self._dir)
+        handler = type("Handler", (_S3Handler,), {"store": self.store})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-s3", daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self) -> "FakeS3Server":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": len(self.store.buckets),
+            "objects": len(self.store.objects),
+            "bytes": sum(o["size"] for o in list(self.store.objects.values())),
+        }
+
+
+def install_mongo(uri: Optional[str], db_name: str) -> None:
+    """
+    Gọi trước khi import app. uri -> mongod thật: app tự tạo client (pool theo config) lúc startup;
+    uri=None -> mongomock-motor trong RAM, gắn thẳng vào app.db.mongo_client.
+    """
+    if uri:
+        os.environ.update({"MONGO_URI": uri, "MONGO_DB": db_name})
+        return
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Cần mongomock-motor (pip install mongomock-motor) hoặc --mongo-uri tới mongod local")
+
+    import app.db.mongo_client as mongo_client
+
+    client = AsyncMongoMockClient()
+    mongo_client._client = client
+    mongo_client._db = client[db_name]
+
+
+class FakePgConnection:
+    def __init__(self, pool: "FakePgPool") -> None:
+        self._pool = pool
+
+    async def fetchrow(self, query: str, *args):
+        await asyncio.sleep(self._pool.latency)
+        if "from users" in " ".join(query.lower().split()):
+            return self._pool.users.get(args[0])
+        return None
+
+    async def execute(self, query: str, *args):
+        await asyncio.sleep(self._pool.latency)
+        # UPGRADE_PASSWORD_HASH_SQL: (user_id, hash mới, giá trị cũ)
+        if "update users set password_hash" in " ".join(query.lower().split()):
+            for user in self._pool.users.values():
+                if user["user_id"] == args[0] and user["password_hash"] == args[2]:
+                    user["password_hash"] = args[1]
+                    return "UPDATE 1"
+        return "UPDATE 0"
+
+    async def fetch(self, query: str, *args):
+        row = await self.fetchrow(query, *args)
+        return [row] if row else []
+
+
+class FakePgPool:
+    """Thay asyncpg.Pool trong app.db.postgres.pg: giới hạn max_size connection, mỗi query ngủ `latency` giây."""
+
+    def __init__(self, users: Dict[str, Dict[str, Any]], *, max_size: int = 10, latency: float = 0.0005) -> None:
+        self.users = users
+        self.latency = latency
+        self._max = max_size
+        self._sem = asyncio.Semaphore(max_size)
+        self._in_use = 0
+
+    async def acquire(self, *, timeout: Optional[float] = None) -> FakePgConnection:
+        await asyncio.wait_for(self._sem.acquire(), timeout)
+        self._in_use += 1
+        return FakePgConnection(self)
+
+    async def release(self, conn: FakePgConnection) -> None:
+        self._in_use -= 1
+        self._sem.release()
+
+    def get_size(self) -> int:
+        return self._max
+
+    def get_idle_size(self) -> int:
+        return self._max - self._in_use
+
+    def get_min_size(self) -> int:
+        return self._max
+
+    def get_max_size(self) -> int:
+        return self._max
+
+    async def close(self) -> None:
+        pass
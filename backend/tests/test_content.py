@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services.content_service import is_not_modified, parse_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=5-1", None),  # sai cú pháp -> trả cả file
+        ("bytes=0-1,5-9", None),  # nhiều range -> trả cả file
+        ("items=0-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as e:
+        parse_range(header, 1000)
+    assert e.value.status_code == 416
+    assert e.value.headers["Content-Range"] == "bytes */1000"
+
+
+def _request(**headers):
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+LAST_MODIFIED = datetime(2024, 1, 2, 3, 4, 5, 600000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, False),
+        ({"if_none_match": '"abc"'}, True),
+        ({"if_none_match": 'W/"abc", "def"'}, True),
+        ({"if_none_match": "*"}, True),
+        ({"if_none_match": '"other"'}, False),
+        # If-None-Match có mặt thì bỏ qua If-Modified-Since
+        ({"if_none_match": '"other"', "if_modified_since": "Tue, 02 Jan 2024 03:04:05 GMT"}, False),
+        ({"if_modified_since": "Tue, 02 Jan 2024 03:04:05 GMT"}, True),
+        ({"if_modified_since": "Tue, 02 Jan 2024 03:04:04 GMT"}, False),
+        ({"if_modified_since": "không phải ngày"}, False),
+    ],
+)
+def test_is_not_modified(headers, expected):
+    assert is_not_modified(_request(**headers), "abc", LAST_MODIFIED) is expected
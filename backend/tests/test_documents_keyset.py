@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+from datetime import datetime
+from itertools import islice
+
+import pytest
+from bson import ObjectId
+
+from app.routers.admin_documents import _after_filter, _find_one_type, _sort_key
+from app.services.mongo_metadata_service import COLLECTION_MAP
+from app.utils.cursor import decode_cursor, encode_cursor
+
+# updated_at lẫn kiểu như dữ liệu cũ chưa backfill: Date / số / chuỗi / null / thiếu field
+VALUES = [datetime(2024, 1, d) for d in range(1, 6)] + [None, 3, 7.5, "2024-01-02", "x"]
+
+
+def _entry(updated_at):
+    return {"_id": ObjectId(), "updated_at": updated_at}, "lesson"
+
+
+def test_sort_key_follows_bson_type_order():
+    entries = [_entry(v) for v in [None, 5, "a", datetime(2024, 1, 1), 1.5, "b"]]
+    ordered = [e[0]["updated_at"] for e in sorted(entries, key=_sort_key, reverse=True)]
+    assert ordered == [datetime(2024, 1, 1), "b", "a", 5, 1.5, None]
+
+
+def test_after_filter_lists_lower_types():
+    oid = ObjectId()
+    assert _after_filter(None, oid) == {"updated_at": None, "_id": {"$lt": oid}}
+    after_str = _after_filter("b", oid)["$or"]
+    assert {"updated_at": {"$type": "number"}} in after_str
+    assert {"updated_at": None} in after_str
+    assert {"updated_at": {"$type": "string"}} in _after_filter(datetime(2024, 1, 1), oid)["$or"]
+
+
+def test_cursor_roundtrip():
+    oid = ObjectId()
+    for v in [datetime(2024, 1, 1, 8, 30), 7.5, "2024-01-02", None]:
+        assert decode_cursor(encode_cursor(v, oid)) == (v, oid)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import app.db.mongo_client as mongo_client
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(mongo_client, "_client", client)
+    monkeypatch.setattr(mongo_client, "_db", client["test_keyset"])
+    return client["test_keyset"]
+
+
+def test_keyset_merge_pages_without_gaps_or_duplicates(db):
+    types = ["lesson", "topic"]
+
+    async def run():
+        for i, v in enumerate(VALUES * 2):
+            t = types[i % 2]
+            doc = {"_id": ObjectId(), "type_name": t, "class_id": "10"}
+            if v is not None or i % 4:  # vài doc thiếu hẳn updated_at
+                doc["updated_at"] = v
+            await db[COLLECTION_MAP[t]].insert_one(doc)
+
+        sem = asyncio.Semaphore(2)
+        after, pages = None, []
+        while True:
+            streams = await asyncio.gather(
+                *(_find_one_type(t, class_id="10", kw="", limit=4, after=after, sem=sem) for t in types)
+            )
+            page = list(islice(heapq.merge(*streams, key=_sort_key, reverse=True), 4))
+            if not page:
+                return pages
+            pages.extend(page)
+            last = page[-1][0]
+            after = decode_cursor(encode_cursor(last.get("updated_at"), last["_id"]))
+
+    pages = asyncio.run(run())
+    ids = [doc["_id"] for doc, _ in pages]
+    assert len(ids) == len(set(ids)) == len(VALUES) * 2
+    assert [_sort_key(e) for e in pages] == sorted((_sort_key(e) for e in pages), reverse=True)
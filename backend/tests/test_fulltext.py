@@ -0,0 +1,19 @@
+from bson import ObjectId
+
+from app.services.fulltext_service import InvertedIndex
+
+
+def test_index_handles_more_than_255_classes():
+    index = InvertedIndex()
+    ids = {}
+    for i in range(300):
+        ids[str(i)] = ObjectId()
+        index.add(ids[str(i)], str(i), f"đạo hàm lớp {i}")
+
+    hits = index.search("dao ham", class_id="299")
+    assert [h["chunk_id"] for h in hits] == [ids["299"]]
+
+    index.remove(ids["0"])
+    index.compact()
+    hits = index.search("dao ham", class_id="280")
+    assert [h["chunk_id"] for h in hits] == [ids["280"]]
@@ -0,0 +1,213 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+
+from app.services import ingest_service
+from app.services.ingest_service import extract_text, split_text
+from app.services.minio_paths import TYPE_PREFIX, chunk_object_name
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+# ===== tách text =====
+
+@pytest.mark.parametrize(
+    "ext, expected",
+    [
+        ("txt", ["Bài 1. Hàm số bậc nhất.", "Hàm số y = ax + b đồng biến khi a > 0.", "Nghịch biến khi a < 0."]),
+        ("docx", ["Bài 2. Phương trình bậc hai.", "Công thức nghiệm dùng delta."]),
+        ("pdf", ["Lesson 3. Linear equations.", "Solve ax + b = 0."]),
+    ],
+)
+def test_extract_text(ext, expected):
+    with open(FIXTURES / f"lesson.{ext}", "rb") as f:
+        text = extract_text(f, ext)
+    assert [line.strip() for line in text.splitlines() if line.strip()] == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "Hàm số bậc nhất".encode("utf-8"),
+        "Hàm số bậc nhất".encode("utf-8-sig"),
+        "Hàm số bậc nhất".encode("utf-16"),
+        b"\xfe\xff" + "Hàm số bậc nhất".encode("utf-16-be"),
+    ],
+)
+def test_read_txt_encodings(data):
+    assert extract_text(io.BytesIO(data), "txt") == "Hàm số bậc nhất"
+
+
+@pytest.mark.parametrize("text", ["Hàm sô\u0301 đê\u0300u", "Hàm sô\u0301 đê\u0300u."])
+def test_read_txt_legacy_cp1258(text):
+    # file tiếng Việt cũ (cp1258, dấu thanh tổ hợp), không BOM; cả độ dài chẵn lẫn lẻ
+    assert extract_text(io.BytesIO(text.encode("cp1258")), "txt") == text
+
+
+def test_extract_text_rejects_unknown_ext():
+    with pytest.raises(ValueError):
+        extract_text(io.BytesIO(b""), "pptx")
+
+
+def test_split_text_respects_chunk_size_and_keeps_every_paragraph():
+    paragraphs = [f"Đoạn {i}: " + "nội dung bài học " * 5 for i in range(20)]
+    chunks = split_text("\n\n".join(paragraphs), chunk_size=200, overlap=40)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+    joined = "\n".join(chunks)
+    assert all(p.strip() in joined for p in paragraphs)
+
+
+def test_split_text_overlaps_previous_chunk():
+    text = "\n".join(f"Câu số {i} của bài." for i in range(30))
+    chunks = split_text(text, chunk_size=120, overlap=30)
+    for prev, cur in zip(chunks, chunks[1:]):
+        # đầu chunk sau lặp lại 1 đoạn cuối chunk trước
+        assert cur.split(" ", 1)[0] in prev[-30:]
+
+
+def test_split_text_cuts_long_sentence():
+    chunks = split_text("x" * 250, chunk_size=100, overlap=0)
+    assert [len(c) for c in chunks] == [100, 100, 50]
+
+
+def test_split_text_empty():
+    assert split_text("", chunk_size=100, overlap=10) == []
+
+
+# ===== tên object chunk =====
+
+def test_chunk_object_name_is_per_lesson():
+    a, b = str(ObjectId()), str(ObjectId())
+    assert chunk_object_name(a, 3) == f"{TYPE_PREFIX['chunk']}{a}/0003.txt"
+    assert chunk_object_name(a, 1) != chunk_object_name(b, 1)
+
+
+# ===== ingest_lesson (MinIO giả + mongomock) =====
+
+class _Obj:
+    def __init__(self, data: bytes):
+        self._data = data
+        self.etag = "etag"
+
+    def stream(self, n):
+        for i in range(0, len(self._data), n):
+            yield self._data[i:i + n]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, bucket, name):
+        return _Obj(self.objects[(bucket, name)])
+
+    def put_object(self, bucket, name, data, length, content_type=None):
+        self.objects[(bucket, name)] = data.read(length)
+        return _Obj(b"")
+
+
+@pytest.fixture
+def env(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import app.db.mongo_client as mongo_client
+    import app.db.minio_client as minio_client
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(mongo_client, "_client", client)
+    monkeypatch.setattr(mongo_client, "_db", client["test_ingest"])
+
+    fake = FakeMinio()
+    monkeypatch.setattr(minio_client, "minio_client", fake)
+
+    # process pool (spawn) không thấy MinIO giả -> chạy worker trong thread
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(ingest_service, "get_ingest_pool", lambda: pool)
+    yield client["test_ingest"], fake
+    pool.shutdown()
+
+
+def _put_lesson(db, fake, text: str, object_name: str = "subjects/topics/lessons/bai1.txt"):
+    fake.objects[("class-10", object_name)] = text.encode("utf-8")
+    oid = ObjectId()
+    doc = {
+        "_id": oid,
+        "class_id": "10",
+        "type_name": "lesson",
+        "lesson_name": "Bài 1",
+        "object": {"bucket": "class-10", "object_name": object_name},
+    }
+    asyncio.run(db.lessons.insert_one(doc))
+    return str(oid), doc["object"]
+
+
+def _ingest(lesson_id, obj):
+    return asyncio.run(
+        ingest_service.ingest_lesson(
+            class_id="10", lesson_id=lesson_id, lesson_name="Bài 1", minio_info=obj, created_by="test"
+        )
+    )
+
+
+def _chunks(db, status="active"):
+    return asyncio.run(db.chunks.find({"status": status}).sort("chunk_index", 1).to_list(length=None))
+
+
+def test_ingest_writes_chunks_under_lesson_id(env, monkeypatch):
+    db, fake = env
+    monkeypatch.setattr(ingest_service, "INGEST_CHUNK_SIZE", 60)
+    monkeypatch.setattr(ingest_service, "INGEST_CHUNK_OVERLAP", 0)
+    lesson_id, obj = _put_lesson(db, fake, "\n".join(f"Đoạn {i} của bài học số một." for i in range(6)))
+
+    res = _ingest(lesson_id, obj)
+
+    chunks = _chunks(db)
+    assert res["status"] == "done" and res["chunks"] == len(chunks) > 1
+    assert [c["source_object"] for c in chunks] == [chunk_object_name(lesson_id, i) for i in range(1, len(chunks) + 1)]
+    assert all(c["parent_id"] == ObjectId(lesson_id) for c in chunks)
+    assert all(("class-10", c["source_object"]) in fake.objects for c in chunks)
+
+
+def test_lessons_with_same_filename_do_not_share_chunks(env):
+    db, fake = env
+    a, obj_a = _put_lesson(db, fake, "Nội dung lesson A.", "subjects/topics/lessons/a/bai1.txt")
+    b, obj_b = _put_lesson(db, fake, "Nội dung lesson B.", "subjects/topics/lessons/b/bai1.txt")
+
+    _ingest(a, obj_a)
+    _ingest(b, obj_b)
+
+    by_parent = {str(c["parent_id"]): c for c in _chunks(db)}
+    assert by_parent[a]["content"] == "Nội dung lesson A."
+    assert by_parent[b]["content"] == "Nội dung lesson B."
+    assert by_parent[a]["source_object"] != by_parent[b]["source_object"]
+
+
+def test_reingest_marks_extra_chunks_deleted(env, monkeypatch):
+    db, fake = env
+    monkeypatch.setattr(ingest_service, "INGEST_CHUNK_SIZE", 60)
+    monkeypatch.setattr(ingest_service, "INGEST_CHUNK_OVERLAP", 0)
+    lesson_id, obj = _put_lesson(db, fake, "\n".join(f"Đoạn {i} của bài học số một." for i in range(6)))
+    _ingest(lesson_id, obj)
+    before = len(_chunks(db))
+
+    # lesson ngắn lại -> còn 1 chunk, các chunk sau bị đánh dấu deleted
+    fake.objects[("class-10", obj["object_name"])] = "Bài đã rút gọn.".encode("utf-8")
+    res = _ingest(lesson_id, obj)
+
+    active = _chunks(db)
+    deleted = _chunks(db, "deleted")
+    assert res["chunks"] == 1
+    assert [c["source_object"] for c in active] == [chunk_object_name(lesson_id, 1)]
+    assert active[0]["content"] == "Bài đã rút gọn."
+    assert len(deleted) == before - 1
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.keyword_service import ClassTermStats, compute_top_keywords, count_terms, score_top_keywords
+
+TEXTS = [
+    "Hàm số bậc nhất đồng biến khi a dương",
+    "Hàm số bậc hai có đồ thị là parabol",
+    "Phương trình bậc hai và công thức nghiệm",
+    "Đồ thị hàm số bậc nhất là đường thẳng",
+]
+
+
+def _stats(texts):
+    stats = ClassTermStats()
+    for i, counts in enumerate(count_terms(texts)):
+        stats.put(i, 0, counts)
+    return stats
+
+
+def test_score_matches_full_corpus_tfidf():
+    stats = _stats(TEXTS)
+    rows = [0, 2]
+    full = compute_top_keywords(TEXTS, rows, top_k=100, max_df=0.6)
+    inc = score_top_keywords([stats.counts[i] for i in rows], stats.df, len(TEXTS), top_k=100, max_df=0.6)
+    for a, b in zip(full, inc):
+        assert dict(b) == pytest.approx(dict(a), abs=1e-3)
+
+
+def test_class_stats_df_follows_updates_and_removals():
+    stats = _stats(TEXTS)
+    stats.put(1, 1, count_terms(["Phương trình bậc hai"])[0])
+    stats.remove(3)
+    assert stats.df == _stats([TEXTS[0], "Phương trình bậc hai", TEXTS[2]]).df
+    assert set(stats.versions) == {0, 1, 2}
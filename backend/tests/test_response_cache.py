@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.services.response_cache import ResponseCache, _affected_scopes, scope_key
+
+
+@pytest.mark.parametrize(
+    "class_id, type_name, expected",
+    [
+        ("10", "lesson", "10|lesson"),
+        (" 10 ", "LESSON", "10|lesson"),
+        ("all", "lesson", "*|lesson"),
+        ("10", "all", "10|*"),
+        (None, "", "*|*"),
+    ],
+)
+def test_scope_key(class_id, type_name, expected):
+    assert scope_key(class_id, type_name) == expected
+
+
+def test_affected_scopes_include_all_views_of_the_write():
+    assert _affected_scopes("10", "lesson") == ["10|lesson", "10|*", "*|lesson", "*|*"]
+    assert _affected_scopes("all", "all") == ["*|*"]
+
+
+def test_invalidate_only_expires_overlapping_scopes():
+    cache = ResponseCache(max_entries=100, ttl_seconds=60)
+    scopes = ["10|lesson", "10|*", "*|lesson", "*|*", "11|lesson", "10|topic", "*|topic"]
+
+    async def run():
+        for s in scopes:
+            async def build(s=s):
+                return {"scope": s}, s
+
+            await cache._load(s, build)
+        await cache.invalidate("10", "lesson")
+        return {s for s in scopes if cache._get(s) is not None}
+
+    assert asyncio.run(run()) == {"11|lesson", "10|topic", "*|topic"}
@@ -1,12 +1,13 @@
 import { http } from "./http";
 
-export async function listDocuments({ classId, typeName, q = "", limit = 500 }) {
+export async function listDocuments({ classId, typeName, q = "", limit = 500, cursor = "" }) {
   const qs = new URLSearchParams({
     class_id: String(classId),
     type_name: String(typeName),
     q: String(q || ""),
     limit: String(limit),
   });
+  if (cursor) qs.set("cursor", String(cursor));
 
   return await http(`/admin/documents?${qs.toString()}`);
 }